@@ -0,0 +1,327 @@
+"""
+Streaming position analysis.
+
+Reads positions one per line from a file or stdin and writes one JSON line per
+position, in input order, with the game-theoretic value for the side to move,
+every optimal move and, for finished games, the winner and winning line. A line
+is either a board string, the cells row by row with x, o and . (or - or _) for
+empty, optionally split into rows with / or |:
+
+    x.o.x....
+    xo./.x./..o
+
+or a JSON object with the board as "board" (or as "x" and "o" bit masks), and
+optionally "size", "win_length" and an "id" that is copied to the output:
+
+    {"id": 17, "board": "x.o.x....", "win_length": 3}
+
+Positions are checked with the same bitboard rules the game uses
+(engine.Board), and values come from the solved table on 3x3 or a generated
+tablebase file for other variants. Lines are analysed in chunks across worker
+processes with a bounded number of chunks in flight, so memory stays flat no
+matter how long the input is, and each worker caches the analysis of positions
+it has already seen.
+
+Example:
+    python analyze.py positions.txt --output analysis.jsonl
+    zcat positions.jsonl.gz | python analyze.py --workers 8 > analysis.jsonl
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+from multiprocessing import Pool
+
+import engine
+import solver
+import tablebase
+
+CHUNK_LINES = 2000  # Lines per worker task
+CHUNKS_IN_FLIGHT = 4  # Chunks queued per worker; bounds memory and keeps workers busy
+CACHE_SIZE = 1 << 17  # Positions whose analysis each process keeps
+MAX_SIZE = 32  # Largest board accepted, so hostile input cannot build huge line tables
+
+PIECES = {'x': 'x', 'X': 'x', 'o': 'o', 'O': 'o', '.': None, '-': None, '_': None}
+SEPARATORS = '/|'
+
+_engines = {}  # (size, win_length) -> solver.Solver or tablebase.Tablebase, per process
+
+
+def parse_board(text, size=None, win_length=None):
+    """
+    Return an engine.Board from a board string such as "x.o.x....". The size is
+    taken from the string's length unless given.
+    """
+    cells = [char for char in text.strip() if char not in SEPARATORS]
+    if size is None:
+        size = math.isqrt(len(cells))
+        if size * size != len(cells):
+            raise ValueError(f"a board needs a square number of cells, got {len(cells)}")
+    if not 1 <= size <= MAX_SIZE:
+        raise ValueError(f"board size must be between 1 and {MAX_SIZE}")
+    if len(cells) != size * size:
+        raise ValueError(f"a {size}x{size} board needs {size * size} cells, got {len(cells)}")
+    x = o = 0
+    for cell, char in enumerate(cells):
+        if char not in PIECES:
+            raise ValueError(f"unexpected character {char!r} in board")
+        if PIECES[char] == 'x':
+            x |= 1 << cell
+        elif PIECES[char] == 'o':
+            o |= 1 << cell
+    return engine.Board(x, o, size, win_length)
+
+
+def parse_record(record, win_length=None):
+    """
+    Return the engine.Board described by a board string or a decoded JSON object.
+    Raises ValueError (or TypeError for fields of the wrong type) for anything else.
+    """
+    if isinstance(record, str):
+        return parse_board(record, win_length=win_length)
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    size = record.get('size')
+    win_length = record.get('win_length', win_length)
+    if 'board' in record:
+        if not isinstance(record['board'], str):
+            raise ValueError('"board" must be a string')
+        return parse_board(record['board'], size, win_length)
+    if 'x' in record and 'o' in record:
+        size = size or engine.SIZE
+        if not 1 <= size <= MAX_SIZE:
+            raise ValueError(f"board size must be between 1 and {MAX_SIZE}")
+        x, o = int(record['x']), int(record['o'])
+        if (x | o) >> (size * size) or x < 0 or o < 0:
+            raise ValueError(f"masks have bits outside the {size}x{size} board")
+        return engine.Board(x, o, size, win_length)
+    raise ValueError('expected "board" or "x" and "o"')
+
+
+def board_string(board):
+    """
+    Return the canonical board string of a position.
+    """
+    return ''.join(board.cell(cell) or '.' for cell in range(board.geometry.cells))
+
+
+def check_legal(board):
+    """
+    Raise ValueError unless the position can arise in a game with x moving first.
+    """
+    if board.x & board.o:
+        raise ValueError("a cell is taken by both players")
+    x_count, o_count = bin(board.x).count('1'), bin(board.o).count('1')
+    if x_count - o_count not in (0, 1):
+        raise ValueError(f"{x_count} x and {o_count} o pieces cannot arise with x moving first")
+    geometry = board.geometry
+    x_won, o_won = geometry.find_win(board.x) is not None, geometry.find_win(board.o) is not None
+    if x_won and o_won:
+        raise ValueError("both players have a winning line")
+    # The winner must have made the last move
+    if (x_won and x_count == o_count) or (o_won and x_count != o_count):
+        raise ValueError("play continued after the game was won")
+
+
+def exact_engine(size, win_length):
+    """
+    Return this process's solver or tablebase for a variant, or None if it has no exact values.
+    """
+    key = (size, win_length)
+    if key not in _engines:
+        if size == engine.SIZE and win_length == engine.SIZE:
+            _engines[key] = solver.Solver.load_or_solve()
+        elif os.path.exists(tablebase.default_path(size, win_length)):
+            _engines[key] = tablebase.Tablebase(tablebase.default_path(size, win_length))
+        else:
+            _engines[key] = None
+    return _engines[key]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def analyze_position(size, win_length, x, o):
+    """
+    Return the analysis of a legal position as a dict: the side to move, its
+    value ('win', 'draw' or 'loss') and distance in plies with best play, the
+    optimal moves, and the winner and winning line if the game is over.
+    The result is cached and shared, so callers must not modify it.
+    """
+    board = engine.Board(x, o, size, win_length)
+    result = {'turn': board.turn, 'over': board.is_over(), 'winner': board.winner,
+              'win_line': list(board.win_cells()) if board.winner else None}
+    if board.winner:
+        result.update(turn=None, value='loss', plies=0, best_moves=[])  # The side to move has lost
+        return result
+    if board.is_over():
+        result.update(turn=None, value='draw', plies=0, best_moves=[])
+        return result
+
+    exact = exact_engine(size, win_length)
+    if exact is None:
+        raise ValueError(f"no exact values for {size}x{size} with {win_length} in a row "
+                         "(3x3, or generate a tablebase with tablebase.py)")
+    if isinstance(exact, solver.Solver):
+        # Scores are 1 + empty cells left at the end for a win, negated for a loss
+        empty = bin(board.legal_moves()).count('1')
+        mine, theirs = (x, o) if board.turn == 'x' else (o, x)
+        score = exact.score(mine, theirs)
+        value = 'win' if score > 0 else 'loss' if score < 0 else 'draw'
+        plies = empty - (abs(score) - 1) if score else None
+    else:
+        value, plies = exact.lookup(board)
+    result.update(value=value, plies=plies, best_moves=exact.best_moves(board))
+    return result
+
+
+def describe(board):
+    """
+    Return the JSON analysis of a board, or raise ValueError if it is not a legal position.
+    """
+    check_legal(board)
+    analysis = analyze_position(board.size, board.win_length, board.x, board.o)
+    return json.dumps({'board': board_string(board), 'size': board.size, 'win_length': board.win_length,
+                       **analysis}, separators=(',', ':'))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def analyze_board(text, size=None, win_length=None):
+    """
+    Return the JSON analysis of a board string. Cached by the text itself, so a
+    line seen before skips parsing and serializing as well as the search.
+    """
+    return describe(parse_board(text, size, win_length))
+
+
+def analyze_lines(job):
+    """
+    Analyse a chunk of input lines in a worker process. job is (number of the
+    first line, lines, default win length); returns the output lines, how many
+    of them are errors and how many analyses came from the caches.
+    """
+    first, lines, win_length = job
+    hits = analyze_board.cache_info().hits + analyze_position.cache_info().hits
+    output = []
+    errors = 0
+    for number, line in enumerate(lines, first):
+        line = line.strip()
+        if not line:
+            continue
+        record_id = None
+        try:
+            if not line.startswith('{'):
+                result = analyze_board(line, None, win_length)
+            else:
+                record = json.loads(line)  # json.JSONDecodeError is a ValueError
+                if isinstance(record, dict):
+                    record_id = record.get('id')
+                if isinstance(record, dict) and isinstance(record.get('board'), str):
+                    result = analyze_board(record['board'], record.get('size'),
+                                           record.get('win_length', win_length))
+                else:
+                    result = describe(parse_record(record, win_length))
+        except (ValueError, TypeError) as error:
+            result = json.dumps({'line': number, 'error': str(error)}, separators=(',', ':'))
+            errors += 1
+        if record_id is not None:
+            result = '{"id":' + json.dumps(record_id) + ',' + result[1:]
+        output.append(result)
+    hits = analyze_board.cache_info().hits + analyze_position.cache_info().hits - hits
+    return output, errors, hits
+
+
+def chunks(lines, win_length, chunk_lines=CHUNK_LINES):
+    """
+    Yield worker jobs of up to chunk_lines lines from an iterable of lines.
+    """
+    chunk = []
+    first = 1
+    for number, line in enumerate(lines, 1):
+        chunk.append(line)
+        if len(chunk) == chunk_lines:
+            yield first, chunk, win_length
+            chunk = []
+            first = number + 1
+    if chunk:
+        yield first, chunk, win_length
+
+
+def analyze_stream(lines, out, win_length=None, workers=None, chunk_lines=CHUNK_LINES):
+    """
+    Analyse every line of an iterable and write the results to out in input order.
+    Returns a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    positions = errors = hits = 0
+    start = time.perf_counter()
+
+    def emit(result):
+        nonlocal positions, errors, hits
+        output, chunk_errors, chunk_hits = result
+        hits += chunk_hits
+        positions += len(output)
+        errors += chunk_errors
+        if output:
+            out.write('\n'.join(output) + '\n')
+
+    jobs = chunks(lines, win_length, chunk_lines)
+    if workers == 1:
+        for job in jobs:
+            emit(analyze_lines(job))
+    else:
+        with Pool(workers) as pool:
+            # Pool.imap would read the whole input ahead; a bounded window keeps memory flat
+            pending = deque()
+            for job in jobs:
+                pending.append(pool.apply_async(analyze_lines, (job,)))
+                if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                    emit(pending.popleft().get())
+            while pending:
+                emit(pending.popleft().get())
+    elapsed = time.perf_counter() - start
+    return {
+        'positions': positions,
+        'errors': errors,
+        'cache_hits': hits,
+        'workers': workers,
+        'seconds': elapsed,
+        'positions_per_second': positions / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    """
+    Analyse positions from a file or stdin and write JSON lines to a file or stdout.
+    """
+    parser = argparse.ArgumentParser(description="Analyse Tic-Tac-Toe positions with perfect play")
+    parser.add_argument("input", nargs="?", help="file of positions, one per line (default: stdin)")
+    parser.add_argument("--output", metavar="PATH", help="write the results here (default: stdout)")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: board size)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="lines per worker task")
+    parser.add_argument("--quiet", action="store_true", help="do not print the summary to stderr")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    source = open(args.input) if args.input else sys.stdin
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        summary = analyze_stream(source, out, args.win_length, args.workers, args.chunk_lines)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            out.close()
+    if not args.quiet:
+        print(f"{summary['positions']} positions ({summary['errors']} errors) on {summary['workers']} workers "
+              f"in {summary['seconds']:.2f}s: {summary['positions_per_second']:,.0f} positions/s, "
+              f"{summary['cache_hits']} cache hits", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
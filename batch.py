@@ -0,0 +1,142 @@
+"""
+Vectorized evaluation of many positions at once.
+
+Boards are rows of an (N, size*size) int8 array holding EMPTY (0), X (1) or
+O (-1) per cell, in the same row-major cell order as engine.Board. evaluate()
+works on whole blocks of rows with NumPy, using the line-index table of the
+board's geometry: summing the k columns of every line gives k for a line owned
+by X and -k for a line owned by O, so a win test is one compare per line.
+Requires NumPy, which the game itself does not need.
+
+Example:
+    boards = batch.from_masks(x_masks, o_masks)
+    result = batch.evaluate(boards)
+    x_won = result.status == batch.X_WINS
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+import engine
+from records import DRAW, O_WINS, UNFINISHED, X_WINS
+
+EMPTY, X, O = 0, 1, -1  # Cell values of a board row
+CHUNK_CELLS = 1 << 19  # Cells evaluated per block, which bounds the temporaries
+NO_LINE = -1  # win_line value for boards nobody has won
+
+# status uses the result codes of the records module: DRAW, X_WINS, O_WINS or UNFINISHED
+BatchResult = namedtuple('BatchResult', 'status win_line legal')
+
+
+@lru_cache(maxsize=None)
+def line_table(size=engine.SIZE, win_length=None):
+    """
+    Return the winning lines of a board variant as a read-only (lines, k) index array.
+    """
+    table = np.array(engine.geometry(size, win_length).lines, dtype=np.intp)
+    table.flags.writeable = False
+    return table
+
+
+def board_size(boards):
+    """
+    Return the side length of the square boards stored in the rows of an array.
+    """
+    size = math.isqrt(boards.shape[1])
+    if size * size != boards.shape[1]:
+        raise ValueError(f"rows of {boards.shape[1]} cells do not form a square board")
+    return size
+
+
+def encode(boards):
+    """
+    Return an int8 array with one row per engine.Board.
+    """
+    boards = list(boards)
+    cells = boards[0].geometry.cells if boards else engine.CELLS
+    if cells <= 64:
+        return from_masks(np.array([board.x for board in boards], dtype=np.uint64),
+                          np.array([board.o for board in boards], dtype=np.uint64), cells)
+    rows = np.zeros((len(boards), cells), dtype=np.int8)
+    for row, board in zip(rows, boards):
+        row[list(engine.iter_cells(board.x))] = X
+        row[list(engine.iter_cells(board.o))] = O
+    return rows
+
+
+def from_masks(x, o, cells=engine.CELLS):
+    """
+    Return an int8 board array from arrays of X and O bitmasks (up to 64 cells).
+    """
+    bits = np.arange(cells, dtype=np.uint64)
+    x = np.asarray(x, dtype=np.uint64)[:, None] >> bits & np.uint64(1)
+    o = np.asarray(o, dtype=np.uint64)[:, None] >> bits & np.uint64(1)
+    return x.astype(np.int8) - o.astype(np.int8)
+
+
+def evaluate(boards, size=None, win_length=None, chunk_cells=CHUNK_CELLS):
+    """
+    Evaluate every row of an (N, size*size) board array.
+
+    Returns a BatchResult of three arrays: status (N,) with a result code per
+    board, win_line (N,) with the index into the geometry's lines of the winning
+    line or NO_LINE, and legal (N, cells), True for the playable cells of each
+    board (none once it is over). As with engine.Board, a board on which both
+    players own a line is reported as won by O, and a player's lowest-numbered
+    line is the one reported.
+    """
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim != 2:
+        raise ValueError("boards must be a 2-D array with one board per row")
+    size = size or board_size(boards)
+    lines = line_table(size, win_length)
+    count, cells = boards.shape
+    if cells != size * size:
+        raise ValueError(f"rows of {cells} cells do not match a {size}x{size} board")
+    k = lines.shape[1]
+    # Line sums run from -k to k, which fits int8 for any practical win length
+    sum_type = np.int8 if k < 128 else np.int16
+    rows = max(1, chunk_cells // cells)
+
+    status = np.empty(count, dtype=np.int8)
+    win_line = np.empty(count, dtype=np.int16)
+    legal = np.empty((count, cells), dtype=bool)
+    for start in range(0, count, rows):
+        block = boards[start:start + rows]
+        n = len(block)
+        # One contiguous row per cell, so every step below is a flat vector operation
+        columns = np.ascontiguousarray(block.T)
+        sums = np.empty(n, dtype=sum_type)
+        hit = np.empty(n, dtype=bool)
+        x_won = np.zeros(n, dtype=bool)
+        o_won = np.zeros(n, dtype=bool)
+        x_line = np.full(n, NO_LINE, dtype=np.int16)
+        o_line = np.full(n, NO_LINE, dtype=np.int16)
+        # Walk the lines backwards so the lowest winning line is written last
+        for i in range(len(lines) - 1, -1, -1):
+            line = lines[i]
+            np.copyto(sums, columns[line[0]])
+            for cell in line[1:]:
+                sums += columns[cell]
+            np.equal(sums, k, out=hit)
+            x_won |= hit
+            np.copyto(x_line, i, where=hit)
+            np.equal(sums, -k, out=hit)
+            o_won |= hit
+            np.copyto(o_line, i, where=hit)
+
+        won = x_won | o_won
+        full = np.logical_and.reduce(columns != EMPTY, axis=0)
+        end = start + n
+        result = status[start:end]
+        result.fill(UNFINISHED)
+        np.copyto(result, DRAW, where=full & ~won)
+        np.copyto(result, X_WINS, where=x_won)
+        np.copyto(result, O_WINS, where=o_won)
+        np.copyto(win_line[start:end], np.where(o_won, o_line, x_line))
+        # Repeating the flag per cell is much faster than broadcasting over short rows
+        np.logical_and(block == EMPTY, np.repeat(~won, cells).reshape(n, cells), out=legal[start:end])
+    return BatchResult(status, win_line, legal)
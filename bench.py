@@ -0,0 +1,325 @@
+"""
+Benchmark suite for the rules, the AI and the renderer.
+
+Times win detection (the original list-of-lists check_win scan against the
+bitboard engine), move generation, full-game simulation, AI move selection and
+the main drawing paths under SDL's dummy video driver. Results are written as
+JSON and can be compared against a saved baseline with per-benchmark regression
+thresholds; the exit status is 1 when anything regressed.
+
+Examples:
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json --output bench_results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import engine
+import history
+import policies
+import solver
+
+DEFAULT_THRESHOLD = 0.25  # Allowed slowdown (25%) before a result counts as a regression
+SEED = 20240101  # Fixed seed so every run times the same positions
+
+
+def legacy_check_win(board):
+    """
+    The original TicTacToe.check_win scan over a 3x3 list of lists, minus the drawing.
+    Returns 'x', 'o', 'draw' or None.
+    """
+    for i in range(3):
+        if board[i][0] == board[i][1] == board[i][2] and board[i][0] is not None:
+            return board[i][0]
+        elif board[0][i] == board[1][i] == board[2][i] and board[0][i] is not None:
+            return board[0][i]
+    if board[0][0] == board[1][1] == board[2][2] and board[0][0] is not None:
+        return board[0][0]
+    if board[0][2] == board[1][1] == board[2][0] and board[0][2] is not None:
+        return board[0][2]
+    if all([all(row) for row in board]):
+        return 'draw'
+    return None
+
+
+def random_positions(count, rng, size=engine.SIZE, win_length=None):
+    """
+    Return boards reached by random play, each stopped after a random number of moves.
+    """
+    boards = []
+    for _ in range(count):
+        board = engine.Board(size=size, win_length=win_length)
+        for _ in range(rng.randrange(size * size)):
+            if board.is_over():
+                break
+            board.make(rng.choice(list(engine.iter_cells(board.legal_moves()))))
+        boards.append(board)
+    return boards
+
+
+def measure(fn, ops_per_call=1, min_time=0.2, repeat=5):
+    """
+    Time fn() and return the best and median nanoseconds per operation.
+    The call count is calibrated so each repetition runs for about min_time seconds.
+    """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 4:
+            break
+        calls *= 2
+    calls = max(1, int(calls * min_time / max(elapsed, 1e-9)))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        timings.append((time.perf_counter() - start) / (calls * ops_per_call) * 1e9)
+    timings.sort()
+    return {'ns_per_op': timings[0], 'median_ns_per_op': timings[len(timings) // 2],
+            'ops': calls * ops_per_call * repeat}
+
+
+def rules_benchmarks(rng):
+    """
+    Yield (name, fn, ops_per_call) for the headless rules and AI benchmarks.
+    """
+    boards = random_positions(1000, rng)
+    grids = [[[board.cell(r*3 + c) for c in range(3)] for r in range(3)] for board in boards]
+    masks = [(board.x, board.o) for board in boards]
+
+    def win_legacy():
+        for grid in grids:
+            legacy_check_win(grid)
+    yield 'win_check_legacy', win_legacy, len(grids)
+
+    def win_bitboard():
+        full = engine.FULL
+        for x, o in masks:
+            engine.find_win(x) is not None or engine.find_win(o) is not None or (x | o) == full
+    yield 'win_check_bitboard', win_bitboard, len(masks)
+
+    # Incremental check of only the lines through the last move, as Board.make does
+    geometry = engine.STANDARD
+    last_moves = [(board.x if board.turn == 'o' else board.o, board.moves[-1])
+                  for board in boards if board.moves]
+    def win_incremental():
+        for mask, cell in last_moves:
+            geometry.find_win_at(mask, cell)
+    yield 'win_check_incremental', win_incremental, len(last_moves)
+
+    big = random_positions(200, rng, size=15, win_length=5)
+    big_moves = [(board.x if board.turn == 'o' else board.o, board.moves[-1], board.geometry)
+                 for board in big if board.moves]
+    def win_incremental_15x15():
+        for mask, cell, geo in big_moves:
+            geo.find_win_at(mask, cell)
+    yield 'win_check_incremental_15x15', win_incremental_15x15, len(big_moves)
+
+    try:
+        import batch
+    except ImportError:  # The vectorized evaluator needs NumPy
+        batch = None
+    if batch:
+        array = batch.encode(boards * 1000)
+        yield 'win_check_numpy_batch', lambda: batch.evaluate(array), len(array)
+
+    def movegen():
+        for board in boards:
+            for _ in engine.iter_cells(board.legal_moves()):
+                pass
+    yield 'move_generation', movegen, len(boards)
+
+    def make_unmake():
+        board = engine.Board()
+        for cell in (4, 0, 8, 2, 6):
+            board.make(cell)
+        for _ in range(5):
+            board.unmake()
+    yield 'make_unmake', make_unmake, 10
+
+    tree = history.History(engine.Board())
+    for cell in (4, 0, 8, 2, 6):
+        tree.play(cell)
+    def history_undo_redo():
+        for _ in range(5):
+            tree.undo()
+        for _ in range(5):
+            tree.redo()
+    yield 'history_undo_redo', history_undo_redo, 10
+
+    random_x = policies.RandomPolicy(SEED)
+    random_o = policies.RandomPolicy(SEED + 1)
+    yield 'game_random_vs_random', lambda: policies.play_game(random_x, random_o), 1
+
+    table = solver.Solver().solve()
+    live = [board for board in boards if not board.is_over()]
+    def solver_moves():
+        for board in live:
+            table.best_move(board)
+    yield 'ai_solver_move', solver_moves, len(live)
+
+    heuristic = policies.HeuristicPolicy(SEED)
+    def heuristic_moves():
+        for board in live:
+            heuristic.choose(board)
+    yield 'ai_heuristic_move', heuristic_moves, len(live)
+
+
+def render_benchmarks(rng):
+    """
+    Yield (name, fn, ops_per_call) for the drawing paths, each followed by a present.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import tic_tac_toe
+    game = tic_tac_toe.TicTacToe()
+    game.start()
+    game.start_game()
+
+    def frame(draw):
+        def run():
+            draw()
+            game.renderer.flush()
+        return run
+
+    yield 'render_init_game_board', frame(game.init_game_board), 1
+    yield 'render_status', frame(game.status), 1
+
+    # A random order of all nine cells that ends in a draw, since no move may follow a win
+    order = list(range(9))
+    while True:
+        rng.shuffle(order)
+        board = engine.Board()
+        for cell in order:
+            if board.winner:
+                break
+            board.make(cell)
+        if board.is_draw():
+            break
+    def fill_board():
+        game.board = engine.Board()
+        game.history = history.History(game.board)
+        game.xo = 'x'
+        for cell in order:
+            game.draw_xo(cell // 3 + 1, cell % 3 + 1)
+            game.renderer.flush()
+    yield 'render_draw_xo', fill_board, 9
+
+    # Taking back a move and replaying it redraws only that cell and the status bar
+    game.init_game_board()
+    game.board = engine.Board()
+    game.history = history.History(game.board)
+    game.xo = 'x'
+    for cell in (4, 0, 8, 2, 6):
+        game.draw_xo(cell // 3 + 1, cell % 3 + 1)
+    def takeback():
+        game.navigate(tic_tac_toe.K_LEFT)
+        game.renderer.flush()
+        game.navigate(tic_tac_toe.K_RIGHT)
+        game.renderer.flush()
+    yield 'render_takeback', takeback, 2
+
+
+def run_benchmarks(include_render=True, min_time=0.2, repeat=5, only=None):
+    """
+    Run the suite and return {name: timing dict}.
+    """
+    rng = random.Random(SEED)
+    suites = [rules_benchmarks(rng)]
+    if include_render:
+        suites.append(render_benchmarks(rng))
+    results = {}
+    for suite in suites:
+        for name, fn, ops in suite:
+            if only and not any(pattern in name for pattern in only):
+                continue
+            results[name] = measure(fn, ops, min_time, repeat)
+            print(f"{name:<30} {results[name]['ns_per_op']:>12.1f} ns/op", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline):
+    """
+    Return the regressions of results against a baseline as a list of dicts.
+    """
+    thresholds = baseline.get('thresholds', {})
+    default = thresholds.get('default', DEFAULT_THRESHOLD)
+    regressions = []
+    for name, base in baseline.get('results', {}).items():
+        if name not in results:
+            continue
+        ratio = results[name]['ns_per_op'] / base['ns_per_op']
+        limit = thresholds.get(name, default)
+        if ratio > 1 + limit:
+            regressions.append({'name': name, 'ratio': ratio, 'threshold': limit,
+                                'baseline_ns': base['ns_per_op'], 'ns': results[name]['ns_per_op']})
+    return regressions
+
+
+def environment():
+    """
+    Describe the machine and library versions the numbers were taken on.
+    """
+    info = {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor(), 'video_driver': os.environ.get('SDL_VIDEODRIVER')}
+    try:
+        import pygame
+        info['pygame'] = pygame.version.ver
+    except ImportError:
+        pass
+    return info
+
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the Tic-Tac-Toe rules, AI and renderer")
+    parser.add_argument("--output", metavar="PATH", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--save-baseline", metavar="PATH", help="save these results as a new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="default allowed slowdown when saving a baseline (0.25 = 25%%)")
+    parser.add_argument("--no-render", action="store_true", help="skip the pygame rendering benchmarks")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run benchmarks whose name contains NAME")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repetition")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per benchmark")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(not args.no_render, args.min_time, args.repeat, args.only)
+    report = {'environment': environment(), 'results': results}
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(results, baseline)
+        for regression in report['regressions']:
+            print(f"REGRESSION {regression['name']}: {regression['ratio']:.2f}x baseline "
+                  f"(allowed {1 + regression['threshold']:.2f}x)", file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'environment': report['environment'], 'thresholds': {'default': args.threshold},
+                       'results': results}, f, indent=2)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
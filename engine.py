@@ -0,0 +1,231 @@
+"""
+Headless Tic-Tac-Toe rules engine.
+
+A position is stored as two integer masks, one per player, where bit
+``row*size + col`` is set when that player owns the cell. The classic game is a
+3x3 board with 3 in a row, but any N x N board with k in a row is supported.
+Nothing in this module imports pygame, so the rules can be driven by the GUI,
+bots and analysis jobs alike.
+"""
+
+from functools import lru_cache
+
+SIZE = 3  # Cells per side of the classic board
+CELLS = SIZE * SIZE  # Number of cells on the classic board
+FULL = (1 << CELLS) - 1  # Mask with every classic cell set
+
+# Directions a line can run in: right, down, down-right, down-left
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class Geometry():
+    """
+    Precomputed winning lines for an N x N board with k in a row.
+    """
+
+    def __init__(self, size, win_length):
+        """
+        Build every winning line and, for each cell, the lines passing through it.
+        """
+        if not 1 <= win_length <= size:
+            raise ValueError(f"win length {win_length} does not fit a {size}x{size} board")
+        self.size = size
+        self.win_length = win_length
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+
+        # Every winning line as a tuple of cell indices
+        lines = []
+        for dr, dc in DIRECTIONS:
+            for r in range(size):
+                for c in range(size):
+                    end_r, end_c = r + dr*(win_length - 1), c + dc*(win_length - 1)
+                    if 0 <= end_r < size and 0 <= end_c < size:
+                        lines.append(tuple((r + dr*i)*size + c + dc*i for i in range(win_length)))
+        self.lines = tuple(lines)
+
+        # The same lines as bitmasks, so a win test is a single AND and compare
+        self.masks = tuple(sum(1 << cell for cell in line) for line in self.lines)
+
+        # Line indices through each cell: at most 4*k, independent of the board size
+        through = [[] for _ in range(self.cells)]
+        for i, line in enumerate(self.lines):
+            for cell in line:
+                through[cell].append(i)
+        self.lines_through = tuple(tuple(ids) for ids in through)
+
+    def find_win_at(self, mask, cell):
+        """
+        Return the index of a line through cell fully covered by mask, or None.
+        """
+        masks = self.masks
+        for i in self.lines_through[cell]:
+            if mask & masks[i] == masks[i]:
+                return i
+        return None
+
+    def find_win(self, mask):
+        """
+        Return the index of any line fully covered by mask, or None.
+        """
+        for i, win in enumerate(self.masks):
+            if mask & win == win:
+                return i
+        return None
+
+
+@lru_cache(maxsize=None)
+def geometry(size=SIZE, win_length=None):
+    """
+    Return the shared Geometry for a board size and win length (defaults to size).
+    """
+    return Geometry(size, win_length or size)
+
+
+STANDARD = geometry()  # The classic 3x3, three-in-a-row board
+WIN_LINES = STANDARD.lines  # Winning lines of the classic board
+WIN_MASKS = STANDARD.masks  # Winning masks of the classic board
+
+
+def other(player):
+    """
+    Return the opponent of the given player ('x' or 'o').
+    """
+    return 'o' if player == 'x' else 'x'
+
+
+def find_win(mask):
+    """
+    Return the index into WIN_LINES of a classic line fully covered by mask, or None.
+    """
+    for i, win in enumerate(WIN_MASKS):
+        if mask & win == win:
+            return i
+    return None
+
+
+def legal_mask(x, o, full=FULL):
+    """
+    Return a mask of the empty cells for the position (x, o).
+    """
+    return ~(x | o) & full
+
+
+def iter_cells(mask):
+    """
+    Yield the cell index of every set bit in mask, lowest first.
+    """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class Board():
+    """
+    Mutable game position with make/unmake and incremental win/draw detection.
+    """
+
+    def __init__(self, x=0, o=0, size=SIZE, win_length=None):
+        """
+        Create a board from the two player masks (empty by default).
+        The side to move is derived from the number of pieces on the board.
+        """
+        self.geometry = geometry(size, win_length)
+        self.size = self.geometry.size  # Cells per side
+        self.win_length = self.geometry.win_length  # Pieces in a row needed to win
+        self.x = x  # Cells owned by 'x'
+        self.o = o  # Cells owned by 'o'
+        self.turn = 'x' if bin(x).count('1') == bin(o).count('1') else 'o'
+        self.moves = []  # Move stack used by unmake
+        self.win_line = None  # Index into geometry.lines once a player has won
+        self.winner = None  # 'x' or 'o' once a player has won
+        for player, mask in (('x', x), ('o', o)):
+            line = self.geometry.find_win(mask)
+            if line is not None:
+                self.win_line, self.winner = line, player
+
+    def copy(self):
+        """
+        Return an independent copy of this board, including its move stack.
+        """
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.moves = list(self.moves)
+        return board
+
+    def cell(self, index):
+        """
+        Return the owner of the cell ('x', 'o') or None if it is empty.
+        """
+        bit = 1 << index
+        if self.x & bit:
+            return 'x'
+        if self.o & bit:
+            return 'o'
+        return None
+
+    def win_cells(self):
+        """
+        Return the cells of the winning line, or None if nobody has won.
+        """
+        if self.win_line is None:
+            return None
+        return self.geometry.lines[self.win_line]
+
+    def legal_moves(self):
+        """
+        Return a mask of the playable cells (empty once the game is over).
+        """
+        if self.winner:
+            return 0
+        return ~(self.x | self.o) & self.geometry.full
+
+    def is_draw(self):
+        """
+        Return True when the board is full and nobody has won.
+        """
+        return self.winner is None and (self.x | self.o) == self.geometry.full
+
+    def is_over(self):
+        """
+        Return True when the game has been won or drawn.
+        """
+        return self.winner is not None or (self.x | self.o) == self.geometry.full
+
+    def make(self, index):
+        """
+        Place the current player's piece on an empty cell and pass the turn.
+        Only the lines through the new piece are checked for a win.
+        """
+        if not 0 <= index < self.geometry.cells:
+            raise ValueError(f"cell {index} is not on the {self.size}x{self.size} board")
+        if self.winner:
+            raise ValueError(f"the game is over, {self.winner} has won")
+        bit = 1 << index
+        if (self.x | self.o) & bit:
+            raise ValueError(f"cell {index} is already taken")
+        if self.turn == 'x':
+            self.x |= bit
+            line = self.geometry.find_win_at(self.x, index)
+        else:
+            self.o |= bit
+            line = self.geometry.find_win_at(self.o, index)
+        if line is not None:
+            self.win_line, self.winner = line, self.turn
+        self.moves.append(index)
+        self.turn = other(self.turn)
+
+    def unmake(self):
+        """
+        Take back the last move and return its cell index.
+        """
+        index = self.moves.pop()
+        self.turn = other(self.turn)
+        if self.turn == 'x':
+            self.x ^= 1 << index
+        else:
+            self.o ^= 1 << index
+        # Only the move that completed a line can have produced the win
+        self.win_line = self.winner = None
+        return index
@@ -0,0 +1,134 @@
+"""
+Move history with undo, redo and variations.
+
+History drives an engine.Board and records every move played on it in a tree
+of variations. A node stores only its move and links to its parent and
+children, so variations share their common prefix and no position is ever
+copied: the board itself is the current position, and stepping through the
+tree is one Board.make or Board.unmake per move. Each node remembers the child
+it was last left by, so redo follows the variation that was being looked at.
+Nothing in this module imports pygame.
+
+Example:
+    history = History(engine.Board())
+    history.play(4)
+    history.play(0)
+    history.undo()      # 0
+    history.play(8)     # A second variation after 4
+    history.switch(-1)  # (8, 0): back to the first one
+"""
+
+
+class Node():
+    """
+    A move in the variation tree.
+    """
+
+    __slots__ = ('move', 'parent', 'children', 'last')
+
+    def __init__(self, move=None, parent=None):
+        self.move = move  # Cell played, None for the starting position
+        self.parent = parent
+        self.children = {}  # Cell -> Node, in the order the variations were first played
+        self.last = None  # Cell of the child last visited, which redo replays
+
+
+class History():
+    """
+    The variation tree of the moves played on a board, positioned at the board's current move.
+    """
+
+    def __init__(self, board):
+        """
+        Start an empty tree at board's current position.
+        """
+        self.board = board
+        self.root = Node()
+        self.node = self.root  # Node of the board's current position
+        self.nodes = 1  # Positions in the tree
+        self.start = len(board.moves)  # Moves already on the board at the starting position
+
+    def play(self, cell):
+        """
+        Play a move, following its variation if it was played here before and
+        starting a new one otherwise. Raises ValueError if the cell is taken.
+        """
+        self.board.make(cell)
+        child = self.node.children.get(cell)
+        if child is None:
+            child = self.node.children[cell] = Node(cell, self.node)
+            self.nodes += 1
+        self.node.last = cell
+        self.node = child
+        return child
+
+    def undo(self):
+        """
+        Take back the current move and return its cell, or None at the start.
+        """
+        if self.node.parent is None:
+            return None
+        cell = self.board.unmake()
+        self.node = self.node.parent
+        return cell
+
+    def redo(self):
+        """
+        Replay the move last taken back from here and return its cell, or None at the end of the variation.
+        """
+        cell = self.node.last
+        if cell is None:
+            return None
+        self.board.make(cell)
+        self.node = self.node.children[cell]
+        return cell
+
+    def can_undo(self):
+        """
+        Return True unless the board is at the starting position.
+        """
+        return self.node.parent is not None
+
+    def can_redo(self):
+        """
+        Return True if a move was played from the current position before.
+        """
+        return self.node.last is not None
+
+    def switch(self, step):
+        """
+        Replace the current move with another variation played from the same
+        position, step places later (or earlier if negative) in the order they
+        were first played, wrapping around. Returns (old cell, new cell), or
+        None if there is no other variation.
+        """
+        parent = self.node.parent
+        if parent is None or len(parent.children) < 2:
+            return None
+        moves = list(parent.children)
+        old = self.undo()
+        new = moves[(moves.index(old) + step) % len(moves)]
+        self.play(new)
+        return old, new
+
+    def variation(self):
+        """
+        Return the number of the current move's variation among its siblings
+        (from 1) and how many there are.
+        """
+        parent = self.node.parent
+        if parent is None:
+            return 1, 1
+        return list(parent.children).index(self.node.move) + 1, len(parent.children)
+
+    def depth(self):
+        """
+        Return the number of moves from the start to the current position.
+        """
+        return len(self.board.moves) - self.start
+
+    def line(self):
+        """
+        Return the cells played from the start to the current position.
+        """
+        return self.board.moves[self.start:]
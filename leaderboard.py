@@ -0,0 +1,163 @@
+"""
+Persistent per-player statistics in a local SQLite database.
+
+Each player name (compared case-insensitively) has a row with wins, losses,
+draws, tiebreakers won and the current and best win streaks. Results are
+queued by the game and written by a background thread, which applies
+everything queued so far in one transaction, so the frame loop never waits on
+the disk. The database runs in WAL mode, so the game can keep reading (the
+top-N table, name autocompletion) while the writer commits; both reads are
+served from indexes with a LIMIT and stay fast with hundreds of thousands of
+players.
+"""
+
+import queue
+import sqlite3
+import threading
+from collections import namedtuple
+
+BATCH_SIZE = 512  # Most results applied in one transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    draws INTEGER NOT NULL DEFAULT 0,
+    tiebreakers INTEGER NOT NULL DEFAULT 0,
+    streak INTEGER NOT NULL DEFAULT 0,
+    best_streak INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS players_rank ON players (wins DESC, losses, name);
+"""
+
+# One upsert per player and result
+WIN = ("INSERT INTO players (name, wins, tiebreakers, streak, best_streak) VALUES (?, 1, ?, 1, 1) "
+       "ON CONFLICT (name) DO UPDATE SET wins = wins + 1, tiebreakers = tiebreakers + excluded.tiebreakers, "
+       "streak = streak + 1, best_streak = MAX(best_streak, streak + 1)")
+LOSS = ("INSERT INTO players (name, losses) VALUES (?, 1) "
+        "ON CONFLICT (name) DO UPDATE SET losses = losses + 1, streak = 0")
+DRAW = ("INSERT INTO players (name, draws) VALUES (?, 1) "
+        "ON CONFLICT (name) DO UPDATE SET draws = draws + 1, streak = 0")
+
+PlayerStats = namedtuple('PlayerStats', 'name wins losses draws tiebreakers streak best_streak')
+
+_COLUMNS = ', '.join(PlayerStats._fields)
+
+
+class Leaderboard():
+    """
+    SQLite-backed player statistics with batched writes on a background thread.
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        """
+        Open (or create) the database at path and start the writer thread.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.queue = queue.Queue()  # Results waiting for the writer, None to stop
+        self.error = None  # Last sqlite3.Error the writer hit, whose batch was dropped
+        with sqlite3.connect(path) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        connection.close()
+        # Reads happen on the thread that created the leaderboard
+        self.reader = sqlite3.connect(path)
+        self.writer = threading.Thread(target=self._write_loop, name="leaderboard-writer", daemon=True)
+        self.writer.start()
+
+    def record(self, x_name, o_name, winner, tiebreaker=False):
+        """
+        Queue the result of a round: winner is 'x', 'o' or None for a draw. A side
+        whose name is None is not recorded. Returns at once.
+        """
+        self.queue.put((x_name, o_name, winner, tiebreaker))
+
+    def _write_loop(self):
+        # Apply queued results in batches until close() queues None
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable enough in WAL mode, far fewer fsyncs
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with connection:
+                    for result in batch:
+                        if result is None:
+                            running = False
+                        else:
+                            self._apply(connection, *result)
+            except sqlite3.Error as error:
+                # The batch was rolled back; keep serving the queue so flush() and close() return
+                self.error = error
+                running = None not in batch
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+        connection.close()
+
+    def _apply(self, connection, x_name, o_name, winner, tiebreaker):
+        # Update both players' rows for one result
+        for side, name in (('x', x_name), ('o', o_name)):
+            if name is None:
+                continue
+            if winner is None:
+                connection.execute(DRAW, (name,))
+            elif winner == side:
+                connection.execute(WIN, (name, int(tiebreaker)))
+            else:
+                connection.execute(LOSS, (name,))
+
+    def flush(self):
+        """
+        Block until every queued result has been written, or dropped with its
+        batch if the database failed (see error).
+        """
+        self.queue.join()
+
+    def top(self, count=10):
+        """
+        Return the PlayerStats of the count best players: most wins, then fewest losses.
+        """
+        rows = self.reader.execute(
+            f"SELECT {_COLUMNS} FROM players ORDER BY wins DESC, losses, name LIMIT ?", (count,))
+        return [PlayerStats(*row) for row in rows]
+
+    def player(self, name):
+        """
+        Return the PlayerStats of a name, or None if it has never played.
+        """
+        row = self.reader.execute(f"SELECT {_COLUMNS} FROM players WHERE name = ?", (name,)).fetchone()
+        return PlayerStats(*row) if row else None
+
+    def complete(self, prefix, count=1):
+        """
+        Return up to count known names starting with prefix, in alphabetical order.
+        """
+        if not prefix:
+            return []
+        # A range scan of the primary key index; U+10FFFF sorts after any continuation
+        rows = self.reader.execute(
+            "SELECT name FROM players WHERE name >= ? AND name < ? ORDER BY name LIMIT ?",
+            (prefix, prefix + '\U0010ffff', count))
+        return [name for (name,) in rows]
+
+    def close(self):
+        """
+        Write everything still queued, then stop the writer and close the database.
+        """
+        self.queue.put(None)
+        self.writer.join()
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
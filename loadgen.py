@@ -0,0 +1,133 @@
+"""
+Load generator for the multiplayer server.
+
+Opens many concurrent client connections that queue for matches and play random
+legal moves as fast as the server answers. Reports finished matches per second
+and the round-trip latency of a move (MOVE sent until its MOVED echo arrives).
+
+Example:
+    python netplay.py --port 7777 &
+    python loadgen.py --port 7777 --clients 2000 --matches 20
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import engine
+import netplay
+from stats import percentile
+
+
+class LoadStats():
+    """
+    Counters shared by every simulated client.
+    """
+
+    def __init__(self, target):
+        self.target = target  # Stop once this many results have been seen
+        self.matches = 0  # Matches finished, counted once per client
+        self.rtts = []  # Move round-trip times in seconds
+        self.errors = 0
+
+
+async def play_client(host, port, size, win_length, stats, rng):
+    """
+    Connect one client and play matches with random moves until the target is reached.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    name = f"bot{rng.getrandbits(32):08x}"
+
+    def send(line):
+        writer.write(line.encode() + b"\n")
+
+    def play(board):
+        # Choose a random empty cell and remember when it was sent
+        cell = rng.choice(list(engine.iter_cells(board.legal_moves())))
+        send(f"MOVE {cell}")
+        return time.perf_counter()
+
+    try:
+        while stats.matches < stats.target:
+            send(f"JOIN {size} {win_length} {name}")
+            board = side = sent = None
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                kind, *args = line.decode().split()
+                if kind == 'START':
+                    side = args[0]
+                    board = engine.Board(size=size, win_length=win_length)
+                    if side == 'x':
+                        sent = play(board)
+                elif kind == 'MOVED':
+                    board.make(int(args[1]))
+                    if args[0] == side:
+                        stats.rtts.append(time.perf_counter() - sent)
+                    elif not board.is_over():
+                        sent = play(board)
+                elif kind == 'OVER':
+                    stats.matches += 1
+                    break
+                elif kind == 'ERROR':
+                    stats.errors += 1
+            await writer.drain()
+        send("QUIT")
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, matches, size, win_length, seed=None):
+    """
+    Run clients concurrently until about clients * matches results have been seen
+    and return (stats, elapsed seconds). Opponents are paired by the server, so a
+    client may be left queued at the end; it is cancelled once the target is met.
+    """
+    rng = random.Random(seed)
+    stats = LoadStats(clients * matches)
+    start = time.perf_counter()
+    pending = {
+        asyncio.create_task(play_client(host, port, size, win_length, stats, random.Random(rng.getrandbits(64))))
+        for _ in range(clients)
+    }
+    while pending:
+        done, pending = await asyncio.wait(pending, timeout=0.05)
+        for task in done:
+            task.result()  # Surface connection errors
+        if stats.matches >= stats.target:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            break
+    return stats, time.perf_counter() - start
+
+
+def main(argv=None):
+    """
+    Run the load generator from the command line and print the report.
+    """
+    parser = argparse.ArgumentParser(description="Load generator for the Tic-Tac-Toe server")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=netplay.DEFAULT_PORT, help="server port")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent connections (use an even number)")
+    parser.add_argument("--matches", type=int, default=10, help="matches played by each client")
+    parser.add_argument("--size", type=int, default=engine.SIZE, help="cells per side of the board")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    args = parser.parse_args(argv)
+
+    stats, elapsed = asyncio.run(run_load(args.host, args.port, args.clients, args.matches,
+                                          args.size, args.win_length or args.size, args.seed))
+    matches = stats.matches // 2  # Both players count every match
+    rtts = sorted(stats.rtts)
+    print(f"{matches} matches by {args.clients} clients in {elapsed:.2f}s: "
+          f"{matches / elapsed:.0f} matches/s, {len(rtts) / elapsed:.0f} moves/s, {stats.errors} errors")
+    print(f"Move round trip: p50 {percentile(rtts, 0.50)*1000:.2f}ms  p90 {percentile(rtts, 0.90)*1000:.2f}ms  "
+          f"p99 {percentile(rtts, 0.99)*1000:.2f}ms  max {(rtts[-1] if rtts else 0)*1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Time-budgeted Monte Carlo Tree Search player.
+
+Boards larger than 3x3 are far too big to solve, so this player grows a UCT
+search tree from random playouts until its per-move time budget runs out. The
+search can run root-parallel: each worker process grows its own tree from the
+same position and the visit counts of the root moves are summed. Every tree
+(in-process or in a worker) is kept between moves and re-rooted at the new
+position, so the subtree under the moves actually played is reused.
+
+Example:
+    python mcts.py --size 7 --win-length 4 --budget 0.5 --workers 4
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from multiprocessing import Pipe, Process
+
+import engine
+
+DEFAULT_BUDGET = 0.25  # Seconds of search per move
+EXPLORATION = math.sqrt(2)  # UCT exploration constant
+
+
+def most_visited(stats):
+    """
+    Return the move with the most visits in {cell: (visits, wins)}, or None if empty.
+    """
+    if not stats:
+        return None
+    return max(stats, key=lambda move: (stats[move][0], stats[move][1]))
+
+
+class Node():
+    """
+    A position in the search tree, reached by playing move.
+    """
+
+    __slots__ = ('move', 'player', 'children', 'untried', 'result', 'visits', 'wins')
+
+    def __init__(self, move, player, untried, result=None):
+        self.move = move  # Cell played to reach this node (None at the root)
+        self.player = player  # Player who made that move
+        self.children = {}  # Cell -> Node of the expanded moves
+        self.untried = untried  # Cells not expanded yet, in random order
+        self.result = result  # 'x', 'o' or 'draw' if the game is over here
+        self.visits = 0
+        self.wins = 0.0  # Playout score for player: 1 per win, 0.5 per draw
+
+
+class Tree():
+    """
+    Single-process UCT search that keeps its tree from one move to the next.
+    """
+
+    def __init__(self, seed=None, exploration=EXPLORATION):
+        self.rng = random.Random(seed)
+        self.exploration = exploration
+        self.root = None
+        self.geometry = None
+        self.x = self.o = 0  # Position the root stands for
+        self.turn = 'x'
+        self.playouts = 0  # Playouts over the lifetime of the tree
+
+    def new_node(self, move, player, x, o):
+        """
+        Create a node for the position (x, o) reached by player playing move.
+        """
+        geometry = self.geometry
+        if move is not None and geometry.find_win_at(x if player == 'x' else o, move) is not None:
+            return Node(move, player, [], player)
+        untried = list(engine.iter_cells(~(x | o) & geometry.full))
+        if not untried:
+            return Node(move, player, untried, 'draw')
+        self.rng.shuffle(untried)
+        return Node(move, player, untried)
+
+    def advance(self, board):
+        """
+        Re-root the tree at board's position. When the position follows from the
+        current root, the subtree of the moves played in between is kept.
+        """
+        x, o = board.x, board.o
+        node = None
+        if self.root is not None and self.geometry is board.geometry \
+                and self.x & x == self.x and self.o & o == self.o:
+            node = self.root
+            new_x, new_o = x & ~self.x, o & ~self.o
+            # Follow expanded moves until the new pieces are all placed
+            while node is not None and (new_x or new_o):
+                mine = new_x if node.player != 'x' else new_o
+                matches = [child for move, child in node.children.items() if mine >> move & 1]
+                if not matches:
+                    node = None
+                    break
+                node = max(matches, key=lambda child: child.visits)
+                if node.player == 'x':
+                    new_x ^= 1 << node.move
+                else:
+                    new_o ^= 1 << node.move
+        if node is None:
+            self.geometry = board.geometry
+            node = self.new_node(None, engine.other(board.turn), x, o)
+        node.move = None
+        self.root = node
+        self.x, self.o, self.turn = x, o, board.turn
+
+    def iterate(self):
+        """
+        Run one select, expand, playout and backpropagate cycle.
+        """
+        node = self.root
+        path = [node]
+        x, o = self.x, self.o
+        log = math.log
+        sqrt = math.sqrt
+        exploration = self.exploration
+
+        # Select: descend through fully expanded nodes by UCT
+        while not node.untried and node.children:
+            scale = exploration * sqrt(log(node.visits))
+            best = None
+            best_value = -1.0
+            for child in node.children.values():
+                value = child.wins / child.visits + scale / sqrt(child.visits)
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            if node.player == 'x':
+                x |= 1 << node.move
+            else:
+                o |= 1 << node.move
+            path.append(node)
+
+        # Expand one untried move
+        if node.result is None and node.untried:
+            move = node.untried.pop()
+            player = engine.other(node.player)
+            if player == 'x':
+                x |= 1 << move
+            else:
+                o |= 1 << move
+            child = self.new_node(move, player, x, o)
+            node.children[move] = child
+            node = child
+            path.append(node)
+
+        result = node.result or self.playout(x, o, engine.other(node.player))
+        self.playouts += 1
+
+        # Backpropagate from the view of the player who moved into each node
+        for node in path:
+            node.visits += 1
+            if result == node.player:
+                node.wins += 1.0
+            elif result == 'draw':
+                node.wins += 0.5
+
+    def playout(self, x, o, turn):
+        """
+        Play random moves from (x, o) with turn to move and return 'x', 'o' or 'draw'.
+        """
+        geometry = self.geometry
+        empty = list(engine.iter_cells(~(x | o) & geometry.full))
+        self.rng.shuffle(empty)
+        mine, theirs = (x, o) if turn == 'x' else (o, x)
+        find_win_at = geometry.find_win_at
+        for cell in empty:
+            mine |= 1 << cell
+            if find_win_at(mine, cell) is not None:
+                return turn
+            mine, theirs = theirs, mine
+            turn = 'o' if turn == 'x' else 'x'
+        return 'draw'
+
+    def search(self, board, deadline):
+        """
+        Search board's position until time.perf_counter() reaches deadline and
+        return the number of playouts run. At least one playout always runs.
+        """
+        self.advance(board)
+        start = self.playouts
+        clock = time.perf_counter
+        while True:
+            self.iterate()
+            if clock() >= deadline or self.root.result:
+                break
+        return self.playouts - start
+
+    def root_stats(self):
+        """
+        Return {cell: (visits, wins)} for the expanded moves at the root.
+        """
+        return {move: (child.visits, child.wins) for move, child in self.root.children.items()}
+
+
+def _worker(connection, seed, exploration):
+    """
+    Worker process loop: search each position sent by the parent with a persistent tree.
+    """
+    tree = Tree(seed, exploration)
+    while True:
+        job = connection.recv()
+        if job is None:
+            break
+        x, o, size, win_length, deadline = job
+        playouts = tree.search(engine.Board(x, o, size, win_length), deadline)
+        connection.send((tree.root_stats(), playouts))
+    connection.close()
+
+
+class MCTS():
+    """
+    MCTS player with a strict per-move time budget, root-parallel across worker
+    processes when workers > 1.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, workers=1, seed=None, exploration=EXPLORATION,
+                 processes=None):
+        """
+        Search for budget seconds per move. With more than one worker, each worker
+        process keeps its own tree and their root visit counts are merged.
+        processes forces the choice between worker processes and an in-process
+        tree; by default a single worker searches in-process. A lone worker process
+        keeps the caller's GIL free, e.g. for a UI thread waiting on the search.
+        """
+        self.budget = budget
+        self.rng = random.Random(seed)
+        self.tree = None  # In-process tree when not running workers
+        self.workers = []  # (process, connection) per worker
+        if processes is None:
+            processes = workers > 1
+        if processes:
+            for _ in range(workers):
+                parent, child = Pipe()
+                process = Process(target=_worker, args=(child, self.rng.getrandbits(64), exploration),
+                                  daemon=True)
+                process.start()
+                child.close()
+                self.workers.append((process, parent))
+        else:
+            self.tree = Tree(self.rng.getrandbits(64), exploration)
+        self.playouts = 0  # Playouts run over all moves and workers
+        self.seconds = 0.0  # Wall-clock time spent searching
+        self.last_playouts = 0  # Playouts behind the last move
+        self.last_seconds = 0.0
+
+    def search(self, board, budget=None):
+        """
+        Search board's position and return the merged {cell: [visits, wins]} of the root moves.
+        """
+        start = time.perf_counter()
+        deadline = start + (self.budget if budget is None else budget)
+        stats = {}
+        if self.workers:
+            job = (board.x, board.o, board.size, board.win_length, deadline)
+            for _, connection in self.workers:
+                connection.send(job)
+            playouts = 0
+            for _, connection in self.workers:
+                worker_stats, worker_playouts = connection.recv()
+                playouts += worker_playouts
+                for move, (visits, wins) in worker_stats.items():
+                    total = stats.setdefault(move, [0, 0.0])
+                    total[0] += visits
+                    total[1] += wins
+        else:
+            playouts = self.tree.search(board, deadline)
+            stats = {move: list(values) for move, values in self.tree.root_stats().items()}
+        self.last_playouts = playouts
+        self.last_seconds = time.perf_counter() - start
+        self.playouts += playouts
+        self.seconds += self.last_seconds
+        return stats
+
+    def choose(self, board, budget=None):
+        """
+        Return the most visited move after searching board's position.
+        """
+        return most_visited(self.search(board, budget))
+
+    def playouts_per_second(self):
+        """
+        Return the playout rate over every search so far.
+        """
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        for process, connection in self.workers:
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process, _ in self.workers:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    """
+    Play a game of MCTS against itself and report the playout rate per move.
+    """
+    parser = argparse.ArgumentParser(description="Measure the MCTS player's playouts per second")
+    parser.add_argument("--size", type=int, default=7, help="cells per side of the board")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds of search per move")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--moves", type=int, help="stop after this many moves (default: play to the end)")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    args = parser.parse_args(argv)
+
+    board = engine.Board(size=args.size, win_length=args.win_length)
+    with MCTS(args.budget, args.workers, args.seed) as player:
+        while not board.is_over() and (args.moves is None or len(board.moves) < args.moves):
+            cell = player.choose(board)
+            print(f"move {len(board.moves) + 1:3d}: {board.turn} plays {cell:3d}  "
+                  f"{player.last_playouts:8d} playouts in {player.last_seconds*1000:6.1f}ms  "
+                  f"({player.last_playouts / player.last_seconds:,.0f}/s)")
+            board.make(cell)
+        print(f"{player.playouts} playouts on {args.workers} workers in {player.seconds:.2f}s: "
+              f"{player.playouts_per_second():,.0f} playouts/s, winner: {board.winner or 'draw'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Networked multiplayer: an asyncio game server and a threaded client.
+
+One server process hosts any number of concurrent matches. Every match keeps an
+engine.Board, so online games follow exactly the same rules as the local game.
+Messages are single lines of ASCII text:
+
+Client to server:
+    JOIN <size> <win_length> <name>   Queue for a match on that board variant
+    MOVE <cell>                       Play a cell (row*size + col) in the current match
+    LEAVE                             Forfeit the current match or leave the queue
+    WATCH                             Spectate every match on the server
+    QUIT                              Leave the server
+
+Server to client:
+    WAIT                                      Queued until an opponent joins
+    START <side> <size> <win_length> <name>   Match started; you play side vs name
+    MOVED <side> <cell>                       A move was played (echoed to both players)
+    OVER <winner> win <cells>                 Game won along the comma-separated cells
+    OVER draw                                 Game drawn
+    OVER <winner> forfeit                     Opponent disconnected or left
+    ERROR <message>                           The last command was rejected
+
+Server to spectators, for every match (those in progress are replayed on WATCH):
+    GAME <id> START <size> <win_length>       A match started
+    GAME <id> MOVED <side> <cell>             A move was played
+    GAME <id> OVER ...                        The match ended, as in OVER above
+
+Run ``python netplay.py --port 7777`` to start a server.
+"""
+
+import argparse
+import asyncio
+import itertools
+import socket
+import threading
+
+import engine
+
+DEFAULT_PORT = 7777  # TCP port used when none is given
+MAX_LINE = 256  # Longest accepted command, in bytes
+MAX_SIZE = 19  # Largest board a client may ask for
+MAX_BUFFERED = 1 << 20  # Bytes queued for a client that stops reading before it is dropped
+
+
+class Player():
+    """
+    One connected client and the match it is currently playing, if any.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.name = None
+        self.match = None  # Match being played, or None while idle or queued
+        self.side = None  # 'x' or 'o' within the current match
+
+    def send(self, line):
+        """
+        Queue a line for the client. The transport buffers it; the handler drains.
+        """
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self.writer.close()  # A spectator that cannot keep up must not hold the server's memory
+            return
+        self.writer.write(line.encode() + b"\n")
+
+
+class Match():
+    """
+    A single game between two players, refereed with an engine.Board.
+    """
+
+    def __init__(self, match_id, x, o, size, win_length):
+        self.id = match_id
+        self.board = engine.Board(size=size, win_length=win_length)
+        self.players = {'x': x, 'o': o}
+        self.over = False
+
+    def broadcast(self, line):
+        """
+        Send a line to both players.
+        """
+        for player in self.players.values():
+            player.send(line)
+
+
+class GameServer():
+    """
+    Matchmaking and move validation for many concurrent matches.
+    """
+
+    def __init__(self):
+        self.waiting = {}  # (size, win_length) -> Player waiting for an opponent
+        self.matches = {}  # match id -> Match in progress
+        self.watchers = set()  # Players spectating every match
+        self.match_ids = itertools.count(1)
+        self.connections = 0  # Currently connected clients
+        self.matches_played = 0  # Finished matches since startup
+        self.moves_played = 0  # Accepted moves since startup
+
+    async def handle(self, reader, writer):
+        """
+        Serve one client connection until it quits or disconnects.
+        """
+        player = Player(writer)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                if len(line) > MAX_LINE:
+                    player.send("ERROR line too long")
+                    break
+                command, _, rest = line.decode(errors='replace').strip().partition(' ')
+                if command == 'QUIT':
+                    break
+                elif command == 'JOIN':
+                    self.join(player, rest)
+                elif command == 'MOVE':
+                    self.move(player, rest)
+                elif command == 'LEAVE':
+                    self.leave(player)
+                elif command == 'WATCH':
+                    self.watch(player)
+                else:
+                    player.send(f"ERROR unknown command {command!r}")
+                await writer.drain()
+        finally:
+            self.leave(player)
+            self.watchers.discard(player)
+            self.connections -= 1
+            writer.close()
+
+    def join(self, player, args):
+        """
+        Queue a player for a match, pairing them with a waiting opponent if there is one.
+        """
+        if player.match is not None and not player.match.over:
+            player.send("ERROR already playing")
+            return
+        try:
+            size, win_length, name = args.split(' ', 2)
+            size, win_length = int(size), int(win_length)
+        except ValueError:
+            player.send("ERROR usage: JOIN <size> <win_length> <name>")
+            return
+        # Checked before any geometry is built: geometries are cached for good
+        if not 1 <= size <= MAX_SIZE:
+            player.send(f"ERROR boards are limited to {MAX_SIZE}x{MAX_SIZE}")
+            return
+        if not 1 <= win_length <= size:
+            player.send(f"ERROR win length must be between 1 and {size}")
+            return
+        player.name = name
+
+        self.unqueue(player)  # A player waits for one variant at a time
+        key = (size, win_length)
+        opponent = self.waiting.pop(key, None)
+        if opponent is None or opponent is player:
+            self.waiting[key] = player
+            player.send("WAIT")
+            return
+
+        # The player who waited longer moves first
+        match = Match(next(self.match_ids), opponent, player, size, win_length)
+        self.matches[match.id] = match
+        for side, me, them in (('x', opponent, player), ('o', player, opponent)):
+            me.match, me.side = match, side
+            me.send(f"START {side} {size} {win_length} {them.name}")
+        self.spectate(match, f"START {size} {win_length}")
+
+    def move(self, player, args):
+        """
+        Validate and apply a move, then broadcast it and any result to both players.
+        """
+        match = player.match
+        if match is None or match.over:
+            player.send("ERROR not in a match")
+            return
+        board = match.board
+        if board.turn != player.side:
+            player.send("ERROR not your turn")
+            return
+        try:
+            cell = int(args)
+            if not 0 <= cell < board.geometry.cells:
+                raise ValueError
+            board.make(cell)
+        except ValueError:
+            player.send("ERROR illegal move")
+            return
+
+        self.moves_played += 1
+        match.broadcast(f"MOVED {player.side} {cell}")
+        self.spectate(match, f"MOVED {player.side} {cell}")
+        if board.winner:
+            cells = ','.join(str(c) for c in board.win_cells())
+            self.finish(match, f"OVER {board.winner} win {cells}")
+        elif board.is_draw():
+            self.finish(match, "OVER draw")
+
+    def finish(self, match, result):
+        """
+        Announce the result of a match and forget it.
+        """
+        match.over = True
+        match.broadcast(result)
+        self.spectate(match, result)
+        self.matches.pop(match.id, None)
+        self.matches_played += 1
+
+    def watch(self, player):
+        """
+        Send a player the events of every match from now on, after replaying the
+        matches already in progress.
+        """
+        self.watchers.add(player)
+        for match in self.matches.values():
+            board = match.board
+            player.send(f"GAME {match.id} START {board.size} {board.win_length}")
+            for i, cell in enumerate(board.moves):
+                player.send(f"GAME {match.id} MOVED {'xo'[i % 2]} {cell}")
+
+    def spectate(self, match, line):
+        """
+        Forward a match event to every spectator.
+        """
+        if self.watchers:
+            line = f"GAME {match.id} {line}"
+            for watcher in self.watchers:
+                watcher.send(line)
+
+    def unqueue(self, player):
+        """
+        Stop a player waiting for an opponent, whatever board they asked for.
+        """
+        for key, waiting in list(self.waiting.items()):
+            if waiting is player:
+                del self.waiting[key]
+
+    def leave(self, player):
+        """
+        Remove a player from the queue, forfeiting any match in progress.
+        """
+        self.unqueue(player)
+        match = player.match
+        if match is not None and not match.over:
+            self.finish(match, f"OVER {engine.other(player.side)} forfeit")
+        player.match = None
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """
+        Accept connections forever.
+        """
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE * 4)
+        async with server:
+            await server.serve_forever()
+
+
+class NetClient():
+    """
+    Blocking line client for the game server with a background reader thread.
+    Every line received is passed to on_line(line) from the reader thread.
+    """
+
+    def __init__(self, host, port, on_line):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.on_line = on_line
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        """
+        Forward each received line to on_line until the connection closes.
+        """
+        with self.sock.makefile('r', encoding='ascii', errors='replace', newline='\n') as stream:
+            for line in stream:
+                self.on_line(line.rstrip('\n'))
+        self.on_line("CLOSED")
+
+    def send(self, line):
+        """
+        Send one command line to the server.
+        """
+        self.sock.sendall(line.encode() + b"\n")
+
+    def join(self, name, size=engine.SIZE, win_length=None):
+        """
+        Queue for a match on the given board variant.
+        """
+        self.send(f"JOIN {size} {win_length or size} {name}")
+
+    def move(self, cell):
+        """
+        Play a cell in the current match.
+        """
+        self.send(f"MOVE {cell}")
+
+    def leave(self):
+        """
+        Forfeit the current match or leave the queue.
+        """
+        self.send("LEAVE")
+
+    def watch(self):
+        """
+        Spectate every match on the server.
+        """
+        self.send("WATCH")
+
+    def close(self):
+        """
+        Leave the server and close the connection.
+        """
+        try:
+            self.send("QUIT")
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def main(argv=None):
+    """
+    Run a game server from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe multiplayer server")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    args = parser.parse_args(argv)
+    print(f"Serving Tic-Tac-Toe on {args.host}:{args.port}")
+    try:
+        asyncio.run(GameServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Move policies for headless play.
+
+A policy is an object with a ``choose(board)`` method that returns the cell
+index to play on an engine.Board. Policies are created by name through
+make_policy() so they can be rebuilt inside worker processes.
+"""
+
+import random
+import time
+
+import engine
+import mcts
+import solver
+import tablebase
+
+
+class RandomPolicy():
+    """
+    Play a uniformly random legal move.
+    """
+
+    name = "random"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose(self, board):
+        """
+        Return a random empty cell.
+        """
+        return self.rng.choice(list(engine.iter_cells(board.legal_moves())))
+
+
+class HeuristicPolicy():
+    """
+    Win if possible, otherwise block the opponent, otherwise prefer central cells.
+    """
+
+    name = "heuristic"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def choose(self, board):
+        """
+        Return the first of: a winning move, a blocking move, the most central empty cell.
+        """
+        moves = list(engine.iter_cells(board.legal_moves()))
+        geometry = board.geometry
+        mine, theirs = (board.x, board.o) if board.turn == 'x' else (board.o, board.x)
+        for mask in (mine, theirs):
+            for cell in moves:
+                if geometry.find_win_at(mask | 1 << cell, cell) is not None:
+                    return cell
+
+        # Rank the rest by distance from the center, breaking ties at random
+        center = (board.size - 1) / 2
+        def distance(cell):
+            row, col = divmod(cell, board.size)
+            return abs(row - center) + abs(col - center)
+        best = min(distance(cell) for cell in moves)
+        return self.rng.choice([cell for cell in moves if distance(cell) == best])
+
+
+class SolverPolicy():
+    """
+    Play a perfect move from the solved table (classic 3x3 board only).
+    """
+
+    name = "solver"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.solver = solver.Solver.load_or_solve()
+
+    def choose(self, board):
+        """
+        Return one of the optimal moves, picked at random for variety.
+        """
+        if board.size != engine.SIZE or board.win_length != engine.SIZE:
+            raise ValueError("the solver policy only plays the 3x3 board")
+        return self.rng.choice(self.solver.best_moves(board))
+
+
+class MCTSPolicy():
+    """
+    Play the most visited move of a time-budgeted Monte Carlo Tree Search (any board).
+    """
+
+    name = "mcts"
+    budget = 0.02  # Seconds per move, kept short for batch self-play
+
+    def __init__(self, seed=None):
+        # One process per player: simulations already spread games across cores
+        self.search = mcts.MCTS(self.budget, workers=1, seed=seed)
+
+    def choose(self, board):
+        """
+        Return the move the search visited most.
+        """
+        return self.search.choose(board)
+
+
+class TablebasePolicy():
+    """
+    Play a perfect move from a generated tablebase file (see tablebase.py).
+    """
+
+    name = "tablebase"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.table = None  # Opened on the first move, once the board variant is known
+
+    def choose(self, board):
+        """
+        Return one of the moves with the best outcome, picked at random for variety.
+        """
+        if self.table is None or not self.table.covers(board):
+            path = tablebase.default_path(board.size, board.win_length)
+            try:
+                self.table = tablebase.Tablebase(path)
+            except FileNotFoundError:
+                raise ValueError(f"no tablebase at {path}, generate it with tablebase.py") from None
+        return self.rng.choice(self.table.best_moves(board))
+
+
+class QLearnPolicy():
+    """
+    Play the highest-valued move of a model trained by self-play (see qlearn.py).
+    """
+
+    name = "qlearn"
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.model = None  # Loaded on the first move, once the board variant is known
+
+    def choose(self, board):
+        """
+        Return one of the moves the model values most, picked at random for variety.
+        """
+        import qlearn  # Needs NumPy, which the other policies do not
+        if self.model is None or (self.model.size, self.model.win_length) != (board.size, board.win_length):
+            path = qlearn.default_path(board.size, board.win_length)
+            try:
+                self.model, _ = qlearn.load_checkpoint(path)
+            except FileNotFoundError:
+                raise ValueError(f"no trained model at {path}, train one with qlearn.py") from None
+        values = self.model.values(qlearn.observe(board))[0]
+        moves = list(engine.iter_cells(board.legal_moves()))
+        best = max(values[cell] for cell in moves)
+        return self.rng.choice([cell for cell in moves if values[cell] == best])
+
+
+POLICIES = {policy.name: policy for policy in
+            (RandomPolicy, HeuristicPolicy, SolverPolicy, MCTSPolicy, TablebasePolicy, QLearnPolicy)}
+
+
+def make_policy(name, seed=None):
+    """
+    Create a policy by name, seeding its random choices.
+    """
+    try:
+        return POLICIES[name](seed)
+    except KeyError:
+        raise ValueError(f"unknown policy {name!r}, expected one of {', '.join(POLICIES)}") from None
+
+
+def play_game(x_policy, o_policy, size=engine.SIZE, win_length=None, on_move=None):
+    """
+    Play one game between two policies and return the finished board.
+    on_move(player, cell, seconds) is called after every move if given.
+    """
+    board = engine.Board(size=size, win_length=win_length)
+    policies = {'x': x_policy, 'o': o_policy}
+    while not board.is_over():
+        player = board.turn
+        if on_move:
+            start = time.perf_counter()
+            cell = policies[player].choose(board)
+            on_move(player, cell, time.perf_counter() - start)
+        else:
+            cell = policies[player].choose(board)
+        board.make(cell)
+    return board
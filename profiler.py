@@ -0,0 +1,213 @@
+"""
+Built-in frame-time profiler.
+
+Each frame of the event loop is split into named sections (event handling, game
+logic and rendering). Sections nest, and time is always charged to the
+innermost open section, so a render call made from inside game logic counts as
+rendering. Per-frame counters (blits, font renders, display flips) are kept
+alongside, a rolling window of recent frames can be exported to CSV or JSON,
+and FrameOverlay draws a live summary on top of the game.
+"""
+
+import csv
+import functools
+import json
+import time
+from collections import deque
+
+import pygame as pg
+
+SECTIONS = ('events', 'logic', 'render')  # Sections reported for every frame
+COUNTERS = ('blits', 'font_renders', 'flips')  # Counters reported for every frame
+
+
+def profiled(section):
+    """
+    Decorate a method of an object with a ``profiler`` attribute so its time is
+    charged to the given section.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.section(section):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Section():
+    """
+    Context manager returned by FrameProfiler.section().
+    """
+
+    __slots__ = ('profiler', 'name')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._push(self.name)
+
+    def __exit__(self, *exc):
+        self.profiler._pop()
+
+
+class FrameProfiler():
+    """
+    Records section times and counters per frame over a rolling window.
+    """
+
+    def __init__(self, history=300, export_path=None, export_every=150):
+        """
+        Keep the last history frames. If export_path is given (.csv or .json), the
+        window is rewritten to it every export_every frames.
+        """
+        self.frames = deque(maxlen=history)  # Finished frames as dicts
+        self.export_path = export_path
+        self.export_every = export_every
+        self.frame_count = 0
+        self.totals = {}  # Cumulative counter values seen at the last frame end
+        self.stack = []  # Open section names, innermost last
+        self.times = None  # Section -> seconds for the frame in progress
+        self.frame_start = None
+        self.last = None  # Time of the last section boundary
+
+    def section(self, name):
+        """
+        Return a context manager that charges its time to the named section.
+        """
+        return _Section(self, name)
+
+    def _charge(self, now):
+        # Charge the time since the last boundary to the innermost open section
+        if self.stack and self.times is not None:
+            top = self.stack[-1]
+            self.times[top] = self.times.get(top, 0.0) + now - self.last
+        self.last = now
+
+    def _push(self, name):
+        self._charge(time.perf_counter())
+        self.stack.append(name)
+
+    def _pop(self):
+        self._charge(time.perf_counter())
+        self.stack.pop()
+
+    def begin_frame(self):
+        """
+        Start timing a new frame.
+        """
+        self.frame_start = self.last = time.perf_counter()
+        self.times = {}
+
+    def end_frame(self, totals):
+        """
+        Finish the frame. totals maps counter names to cumulative values; the
+        frame records how much each grew since the previous frame.
+        """
+        if self.times is None:
+            return
+        now = time.perf_counter()
+        frame = {'frame': self.frame_count, 'time': now, 'total_ms': (now - self.frame_start) * 1000}
+        for name in SECTIONS:
+            frame[f'{name}_ms'] = self.times.get(name, 0.0) * 1000
+        for name in COUNTERS:
+            value = totals.get(name, 0)
+            frame[name] = value - self.totals.get(name, value)
+        self.totals = dict(totals)
+        self.frames.append(frame)
+        self.frame_count += 1
+        self.times = None
+        if self.export_path and self.frame_count % self.export_every == 0:
+            self.export(self.export_path)
+
+    def summary(self):
+        """
+        Return averages and worst cases over the rolling window.
+        """
+        frames = list(self.frames)
+        if not frames:
+            return {}
+        result = {'frames': len(frames)}
+        for key in ['total_ms'] + [f'{name}_ms' for name in SECTIONS]:
+            values = [frame[key] for frame in frames]
+            result[key] = sum(values) / len(values)
+            result[key.replace('_ms', '_max_ms')] = max(values)
+        for name in COUNTERS:
+            result[name] = sum(frame[name] for frame in frames) / len(frames)
+        span = frames[-1]['time'] - frames[0]['time']
+        result['fps'] = (len(frames) - 1) / span if span > 0 else 0.0
+        return result
+
+    def export(self, path):
+        """
+        Write the rolling window of frames to a .json or .csv file.
+        """
+        frames = list(self.frames)
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump({'summary': self.summary(), 'frames': frames}, f, indent=1)
+        else:
+            fields = ['frame', 'time', 'total_ms'] + [f'{name}_ms' for name in SECTIONS] + list(COUNTERS)
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(frames)
+
+
+class FrameOverlay():
+    """
+    Draws the profiler summary in a corner of the screen and can remove it again.
+    """
+
+    def __init__(self, profiler, text, position=(5, 5), size=(190, 118)):
+        """
+        Draw with the given text cache, which should be separate from the game's so
+        the changing numbers do not evict the game's strings or skew its counters.
+        """
+        self.profiler = profiler
+        self.text = text
+        self.rect = pg.Rect(position, size)
+        self.visible = False
+        self.background = None  # Copy of the screen under the panel while it is drawn
+
+    def hide(self, screen, renderer):
+        """
+        Put back what was under the panel, so the game draws on a clean screen.
+        """
+        if self.background is not None:
+            screen.blit(self.background, self.rect)
+            renderer.mark(self.rect)
+            self.background = None
+
+    def draw(self, screen, renderer):
+        """
+        Save what is under the panel and draw the current summary on top.
+        """
+        if not self.visible:
+            return
+        self.background = screen.subsurface(self.rect).copy()
+        panel = pg.Surface(self.rect.size, pg.SRCALPHA)
+        panel.fill((0, 0, 0, 190))
+        screen.blit(panel, self.rect)
+
+        stats = self.profiler.summary()
+        if stats:
+            lines = [
+                f"fps {stats['fps']:5.1f}  frame {stats['total_ms']:5.2f} ms",
+                f"max frame {stats['total_max_ms']:6.2f} ms",
+                f"events {stats['events_ms']:5.2f} ms",
+                f"logic  {stats['logic_ms']:5.2f} ms",
+                f"render {stats['render_ms']:5.2f} ms",
+                f"blits {stats['blits']:4.1f}  fonts {stats['font_renders']:4.1f}",
+                f"flips {stats['flips']:4.2f} / frame",
+            ]
+        else:
+            lines = ["collecting..."]
+        y = self.rect.y + 4
+        for line in lines:
+            surface = self.text.render(line, 20, 'white')
+            screen.blit(surface, (self.rect.x + 6, y))
+            y += 16
+        renderer.mark(self.rect)
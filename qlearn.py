@@ -0,0 +1,386 @@
+"""
+Self-play Q-learning over vectorized environments.
+
+One learner plays both sides of thousands of vecenv.VecEnv games at once and
+learns action values from the side to move's point of view. Since the game is
+zero-sum and the observation is always the mover's, the value of the position
+the opponent faces next is minus its best action value, so every step updates
+
+    Q(s, a) <- Q(s, a) + rate * (target - Q(s, a)),
+    target = reward                      if the move ended the game
+             -gamma * max_a' Q(s', a')   otherwise
+
+with epsilon-greedy exploration. Two models are available. TableModel keeps
+one value per position and action, indexed by the board read as a base-3
+number; it is exact, and fits boards up to TABLE_MAX_CELLS cells (the classic
+3x3). LinearModel scores actions linearly from features of every winning line
+(how many pieces each side has on it, if the other has none), so it scales to
+larger boards.
+
+Training writes checkpoints (NumPy .npz) that it can resume from, and reports
+environment steps per second. The 'qlearn' policy in policies.py plays from a
+checkpoint, so trained models can enter simulate.py and tournament.py.
+Requires NumPy, which the game itself does not need.
+
+Example:
+    python qlearn.py --steps 20000 --envs 4096
+    python tournament.py --bots qlearn random heuristic solver
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+import engine
+import solver
+from records import O_WINS, UNFINISHED, X_WINS
+from vecenv import VecEnv
+
+TABLE_MAX_CELLS = 12  # Largest board a TableModel covers (3**12 positions x 12 actions)
+FORMAT = 1  # Checkpoint layout version
+
+
+def default_path(size=engine.SIZE, win_length=None):
+    """
+    Return the default checkpoint file of a board variant.
+    """
+    return f"qlearn_{size}x{size}_{win_length or size}.npz"
+
+
+class TableModel():
+    """
+    One action value per (position, action), for boards up to TABLE_MAX_CELLS cells.
+    """
+
+    kind = "table"
+    rate = 0.3  # Default learning rate
+
+    def __init__(self, size=engine.SIZE, win_length=None):
+        geometry = engine.geometry(size, win_length)
+        if geometry.cells > TABLE_MAX_CELLS:
+            raise ValueError(f"a value table covers at most {TABLE_MAX_CELLS} cells, use the linear model")
+        self.size = geometry.size
+        self.win_length = geometry.win_length
+        self.cells = geometry.cells
+        self.powers = 3 ** np.arange(self.cells, dtype=np.int64)
+        self.values_table = np.zeros((3 ** self.cells, self.cells), dtype=np.float32)
+
+    def index(self, obs):
+        """
+        Return the table row of each observation: its cells (-1, 0, 1) as a base-3 number.
+        """
+        return (obs.astype(np.int64) + 1) @ self.powers
+
+    def values(self, obs):
+        """
+        Return the (N, cells) action values of a batch of observations.
+        """
+        return self.values_table[self.index(obs)]
+
+    def update(self, obs, actions, targets, rate):
+        """
+        Move the values of the actions taken towards their targets. Games that
+        took the same action in the same position share one averaged update, so
+        thousands of games starting from the empty board do not overshoot.
+        """
+        flat = self.index(obs) * self.cells + actions
+        keys, inverse = np.unique(flat, return_inverse=True)
+        means = np.bincount(inverse, weights=targets) / np.bincount(inverse)
+        table = self.values_table.reshape(-1)
+        table[keys] += rate * (means - table[keys])
+
+    def state(self):
+        """
+        Return the arrays a checkpoint stores.
+        """
+        return {'values': self.values_table}
+
+    def load_state(self, arrays):
+        """
+        Restore the arrays of a checkpoint.
+        """
+        self.values_table = np.array(arrays['values'], dtype=np.float32)
+
+
+class LinearModel():
+    """
+    Action values linear in features of the winning lines and the cells, for any board.
+    """
+
+    kind = "linear"
+    rate = 0.05  # Default learning rate
+
+    def __init__(self, size=engine.SIZE, win_length=None):
+        geometry = engine.geometry(size, win_length)
+        self.size = geometry.size
+        self.win_length = geometry.win_length
+        self.cells = geometry.cells
+        self.lines = len(geometry.lines)
+        # Cells by line as a 0/1 matrix, so piece counts on every line are one product
+        self.incidence = np.zeros((self.cells, self.lines), dtype=np.float32)
+        for i, line in enumerate(geometry.lines):
+            self.incidence[list(line), i] = 1
+        # Per line: one flag per count 1..k-1 of the mover's pieces, then of the opponent's
+        self.per_line = 2 * (self.win_length - 1)
+        self.features = self.lines * self.per_line + 2 * self.cells + 1
+        self.weights = np.zeros((self.features, self.cells), dtype=np.float32)
+
+    def featurize(self, obs):
+        """
+        Return the (N, features) feature matrix of a batch of observations.
+        """
+        count = len(obs)
+        mine = (obs == 1).astype(np.float32)
+        theirs = (obs == -1).astype(np.float32)
+        mine_on, theirs_on = mine @ self.incidence, theirs @ self.incidence
+        k = self.win_length
+        lines = np.zeros((count, self.lines, self.per_line), dtype=np.float32)
+        rows, cols = np.nonzero((mine_on > 0) & (theirs_on == 0) & (mine_on < k))
+        lines[rows, cols, mine_on[rows, cols].astype(np.intp) - 1] = 1
+        rows, cols = np.nonzero((theirs_on > 0) & (mine_on == 0) & (theirs_on < k))
+        lines[rows, cols, k - 2 + theirs_on[rows, cols].astype(np.intp)] = 1
+        return np.concatenate((lines.reshape(count, -1), mine, theirs, np.ones((count, 1), np.float32)), axis=1)
+
+    def values(self, obs):
+        """
+        Return the (N, cells) action values of a batch of observations.
+        """
+        return self.featurize(obs) @ self.weights
+
+    def update(self, obs, actions, targets, rate):
+        """
+        Take one averaged gradient step on the squared error of the actions taken.
+        """
+        features = self.featurize(obs)
+        rows = np.arange(len(obs))
+        errors = np.zeros((len(obs), self.cells), dtype=np.float32)
+        errors[rows, actions] = targets - (features @ self.weights)[rows, actions]
+        self.weights += (rate / len(obs)) * (features.T @ errors)
+
+    def state(self):
+        """
+        Return the arrays a checkpoint stores.
+        """
+        return {'weights': self.weights}
+
+    def load_state(self, arrays):
+        """
+        Restore the arrays of a checkpoint.
+        """
+        self.weights = np.array(arrays['weights'], dtype=np.float32)
+
+
+MODELS = {model.kind: model for model in (TableModel, LinearModel)}
+
+
+def make_model(size=engine.SIZE, win_length=None, kind=None):
+    """
+    Create an untrained model, a table if the board is small enough unless kind says otherwise.
+    """
+    if kind is None:
+        kind = "table" if size * size <= TABLE_MAX_CELLS else "linear"
+    try:
+        return MODELS[kind](size, win_length)
+    except KeyError:
+        raise ValueError(f"unknown model {kind!r}, expected one of {', '.join(MODELS)}") from None
+
+
+def save_checkpoint(path, model, progress):
+    """
+    Write a model and the training progress (a dict of numbers) to an .npz file.
+    The file is replaced atomically, so an interrupted save keeps the previous checkpoint.
+    """
+    temporary = path + ".tmp"
+    with open(temporary, 'wb') as f:
+        np.savez(f, format=FORMAT, kind=model.kind, size=model.size, win_length=model.win_length,
+                 progress_keys=np.array(list(progress)), progress_values=np.array(list(progress.values()), dtype=np.float64),
+                 **model.state())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+    """
+    Return (model, progress) from a checkpoint written by save_checkpoint().
+    """
+    with np.load(path) as arrays:
+        if int(arrays['format']) != FORMAT:
+            raise ValueError(f"{path} is not a Q-learning checkpoint this version can read")
+        model = make_model(int(arrays['size']), int(arrays['win_length']), str(arrays['kind']))
+        model.load_state(arrays)
+        progress = dict(zip(arrays['progress_keys'].tolist(), arrays['progress_values'].tolist()))
+    progress['steps'], progress['games'] = int(progress['steps']), int(progress['games'])
+    return model, progress
+
+
+def observe(board):
+    """
+    Return the observation of an engine.Board: a (1, cells) row from the side to move's point of view.
+    """
+    mine, theirs = (board.x, board.o) if board.turn == 'x' else (board.o, board.x)
+    bits = np.arange(board.geometry.cells, dtype=object)
+    return (((mine >> bits) & 1) - ((theirs >> bits) & 1)).astype(np.int8)[None, :]
+
+
+def greedy(values, legal, rng=None):
+    """
+    Return the legal action with the highest value in every row, ties broken at random if rng is given.
+    """
+    if rng is not None:
+        values = values + rng.random(values.shape, dtype=np.float32) * 1e-4
+    return np.argmax(np.where(legal, values, -np.inf), axis=1)
+
+
+def train(model, env, steps, rate=None, epsilon=0.1, epsilon_start=1.0, gamma=1.0,
+          checkpoint=None, checkpoint_every=1000, progress=None, report=None):
+    """
+    Train a model by self-play for steps steps of every game in env.
+
+    Exploration decays linearly from epsilon_start to epsilon over the first
+    half of the steps. A checkpoint is written every checkpoint_every steps and
+    at the end if a path is given. report(progress) is called with the running
+    totals at every checkpoint. Returns the progress dict: total steps and games
+    over every run of this model, plus the timings of this run.
+    """
+    rate = model.rate if rate is None else rate
+    progress = dict(progress or {})
+    base_steps, base_games = progress.get('steps', 0), progress.get('games', 0) - env.games
+    decay = max(1, steps // 2)
+    env_seconds = 0.0
+    clock = time.perf_counter
+    start = clock()
+
+    obs = env.reset()
+    legal = env.legal()
+    for step in range(1, steps + 1):
+        explore = epsilon + (epsilon_start - epsilon) * max(0.0, 1 - step / decay)
+        actions = greedy(model.values(obs), legal, env.rng)
+        random = env.rng.random(env.count) < explore
+        actions[random] = env.sample(legal)[random]
+
+        began = clock()
+        reward, done, _ = env.step(actions)
+        env_seconds += clock() - began
+        next_obs, next_legal = env.observe(), env.legal()
+
+        best_next = np.where(next_legal, model.values(next_obs), -np.inf).max(axis=1)
+        targets = np.where(done, reward, -gamma * best_next)
+        model.update(obs, actions, targets, rate)
+        obs, legal = next_obs, next_legal
+
+        if step % checkpoint_every == 0 or step == steps:
+            elapsed = clock() - start
+            progress.update(steps=base_steps + step * env.count, games=base_games + env.games,
+                            seconds=elapsed, env_seconds=env_seconds, epsilon=explore,
+                            steps_per_second=step * env.count / elapsed,
+                            env_steps_per_second=step * env.count / env_seconds if env_seconds else 0.0)
+            if checkpoint:
+                save_checkpoint(checkpoint, model, progress)
+            if report:
+                report(progress)
+    return progress
+
+
+def play_random(model, games=10000, seed=None):
+    """
+    Play the model greedily against uniformly random moves, half the games on
+    each side, and return {'x': (wins, draws, losses), 'o': (...)} from the
+    model's point of view.
+    """
+    results = {}
+    for side, sign in (('x', 1), ('o', -1)):
+        env = VecEnv(games, model.size, model.win_length, seed)
+        obs = env.reset()
+        status = np.full(games, UNFINISHED, dtype=np.int8)
+        while (status == UNFINISHED).any():
+            legal = env.legal()
+            mover = env.turn == sign
+            actions = env.sample(legal)
+            if mover.any():
+                actions[mover] = greedy(model.values(obs[mover]), legal[mover])
+            _, done, result = env.step(actions)
+            # Games end after different numbers of moves and restart at once, so
+            # only the first result of each counts
+            first = done & (status == UNFINISHED)
+            status[first] = result[first]
+            obs = env.observe()
+        wins = int((status == (X_WINS if side == 'x' else O_WINS)).sum())
+        losses = int((status == (O_WINS if side == 'x' else X_WINS)).sum())
+        results[side] = (wins, games - wins - losses, losses)
+    return results
+
+
+def optimal_share(model):
+    """
+    Return the share of the positions reachable on the classic board in which
+    the model's greedy move is perfect play according to the solver.
+    """
+    table = solver.Solver.load_or_solve()
+    boards = []
+
+    def visit(board, seen):
+        key = (board.x, board.o)
+        if key in seen or board.is_over():
+            return
+        seen.add(key)
+        boards.append(board.copy())
+        for cell in engine.iter_cells(board.legal_moves()):
+            board.make(cell)
+            visit(board, seen)
+            board.unmake()
+
+    visit(engine.Board(), set())
+    obs = np.concatenate([observe(board) for board in boards])
+    moves = greedy(model.values(obs), obs == 0)
+    return sum(int(move) in table.best_moves(board) for move, board in zip(moves, boards)) / len(boards)
+
+
+def main(argv=None):
+    """
+    Train from the command line, resuming from the checkpoint if it exists.
+    """
+    parser = argparse.ArgumentParser(description="Train a Tic-Tac-Toe player by vectorized self-play Q-learning")
+    parser.add_argument("--size", type=int, default=engine.SIZE)
+    parser.add_argument("--win-length", type=int)
+    parser.add_argument("--model", choices=list(MODELS), help="default: table up to 3x3, linear beyond")
+    parser.add_argument("--envs", type=int, default=4096, help="games played together")
+    parser.add_argument("--steps", type=int, default=20000, help="steps of every game")
+    parser.add_argument("--rate", type=float, help="learning rate (default: per model)")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="final exploration rate")
+    parser.add_argument("--checkpoint", metavar="PATH", help="default: qlearn_<size>x<size>_<k>.npz")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="steps between checkpoints")
+    parser.add_argument("--fresh", action="store_true", help="start over instead of resuming the checkpoint")
+    parser.add_argument("--eval-games", type=int, default=10000, help="games against random moves afterwards")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    path = args.checkpoint or default_path(args.size, args.win_length)
+    progress = None
+    if os.path.exists(path) and not args.fresh:
+        model, progress = load_checkpoint(path)
+        if (model.size, model.win_length) != (args.size, args.win_length or args.size):
+            parser.error(f"{path} holds a {model.size}x{model.size} model, pass --fresh or another --checkpoint")
+        print(f"resuming {model.kind} model from {path} after {progress['steps']:,} steps")
+    else:
+        model = make_model(args.size, args.win_length, args.model)
+
+    env = VecEnv(args.envs, args.size, args.win_length, args.seed)
+
+    def report(progress):
+        print(f"{progress['steps']:>13,} steps {progress['games']:>11,} games  "
+              f"epsilon {progress['epsilon']:.2f}  {progress['steps_per_second']:,.0f} steps/s "
+              f"(environment alone {progress['env_steps_per_second']:,.0f} steps/s)")
+
+    progress = train(model, env, args.steps, args.rate, args.epsilon, checkpoint=path,
+                     checkpoint_every=args.checkpoint_every, progress=progress, report=report)
+    print(f"saved {path}")
+    if args.eval_games:
+        for side, (wins, draws, losses) in play_random(model, args.eval_games, args.seed).items():
+            print(f"as {side} against random moves: {wins} wins, {draws} draws, {losses} losses")
+    if model.size == engine.SIZE and model.win_length == engine.SIZE:
+        print(f"perfect moves in {optimal_share(model):.1%} of reachable positions")
+
+
+if __name__ == "__main__":
+    main()
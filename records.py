@@ -0,0 +1,273 @@
+"""
+Compact binary game records.
+
+A record file starts with a 16-byte header (magic, version, board size, win
+length) followed by fixed-size 16-byte records, one per game:
+
+    moves  uint64  cell of move i in bits 4*i .. 4*i+3 (up to 16 moves)
+    info   uint64  bits 0-4 move count, bits 5-6 result,
+                   bits 8-35 X name id, bits 36-63 O name id
+
+Player names are stored once each in a sidecar ``<path>.names`` file, one per
+line, where the line number is the name id. Because records have a fixed size,
+GameReader can memory-map the file and read any game by index without parsing
+the ones before it. Cell indices must fit in 4 bits, so boards up to 4x4 are
+supported.
+"""
+
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+import engine
+
+MAGIC = b"TTTR"
+VERSION = 1
+HEADER = struct.Struct('<4sBBB9x')  # magic, version, size, win length, padding
+RECORD = struct.Struct('<QQ')  # moves, info
+MAX_CELLS = 16  # Cells addressable with 4-bit move indices
+NAME_BITS = 28  # Bits per player name id
+NAME_MASK = (1 << NAME_BITS) - 1
+
+# Result codes stored in a record
+DRAW, X_WINS, O_WINS, UNFINISHED = 0, 1, 2, 3
+RESULT_CODES = {None: DRAW, 'x': X_WINS, 'o': O_WINS}
+RESULT_NAMES = {DRAW: 'draw', X_WINS: 'x', O_WINS: 'o', UNFINISHED: 'unfinished'}
+
+GameRecord = namedtuple('GameRecord', 'moves result x_name o_name')
+
+
+def pack_moves(moves):
+    """
+    Pack a sequence of cell indices into an integer, 4 bits per move.
+    """
+    packed = 0
+    for i, cell in enumerate(moves):
+        packed |= cell << (4 * i)
+    return packed
+
+
+def unpack_moves(packed, count):
+    """
+    Return the list of cell indices stored in a packed move integer.
+    """
+    return [(packed >> (4 * i)) & 0xF for i in range(count)]
+
+
+def pack_record(moves, result, x_id, o_id):
+    """
+    Return the 16 bytes of one record. result is one of the result codes.
+    """
+    if len(moves) > MAX_CELLS:
+        raise ValueError(f"a record holds at most {MAX_CELLS} moves")
+    info = len(moves) | result << 5 | x_id << 8 | o_id << (8 + NAME_BITS)
+    return RECORD.pack(pack_moves(moves), info)
+
+
+def result_code(board):
+    """
+    Return the result code of an engine.Board.
+    """
+    if board.is_over():
+        return RESULT_CODES[board.winner]
+    return UNFINISHED
+
+
+class GameWriter():
+    """
+    Appends game records to a file through a large write buffer.
+    """
+
+    def __init__(self, path, size=engine.SIZE, win_length=None, buffer_size=1 << 20):
+        """
+        Open (or create) a record file for appending games on the given board variant.
+        """
+        win_length = win_length or size
+        if size * size > MAX_CELLS:
+            raise ValueError(f"records only support boards up to {MAX_CELLS} cells")
+        self.path = path
+        self.names = {}  # name -> id
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                existing = read_header(f.read(HEADER.size), path)
+            if existing != (size, win_length):
+                raise ValueError(f"{path} holds {existing[0]}x{existing[0]} games with {existing[1]} in a row, "
+                                 f"not {size}x{size} with {win_length} in a row")
+            for name_id, name in enumerate(read_names(path)):
+                self.names[name] = name_id
+            self.file = open(path, 'ab', buffering=buffer_size)
+            self.names_file = open(path + '.names', 'a', encoding='utf-8')
+        else:
+            self.file = open(path, 'wb', buffering=buffer_size)
+            self.file.write(HEADER.pack(MAGIC, VERSION, size, win_length))
+            # Ids restart at 0 with a new file, so names left over from an old one must go
+            self.names_file = open(path + '.names', 'w', encoding='utf-8')
+
+    def name_id(self, name):
+        """
+        Return the id of a player name, adding it to the names file if it is new.
+        """
+        # Names are stored one per line, so line breaks cannot be part of one
+        name = name.replace('\r', ' ').replace('\n', ' ')
+        name_id = self.names.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            if name_id > NAME_MASK:
+                raise ValueError("too many distinct player names for one record file")
+            self.names_file.write(name + '\n')
+            self.names[name] = name_id
+        return name_id
+
+    def write(self, moves, result, x_name, o_name):
+        """
+        Append one game given its moves, result code and player names.
+        """
+        self.file.write(pack_record(moves, result, self.name_id(x_name), self.name_id(o_name)))
+
+    def write_board(self, board, x_name, o_name):
+        """
+        Append the game played on an engine.Board.
+        """
+        self.write(board.moves, result_code(board), x_name, o_name)
+
+    def write_packed(self, data):
+        """
+        Append records that were already packed with pack_record().
+        """
+        self.file.write(data)
+
+    def flush(self):
+        """
+        Write buffered records and names to disk.
+        """
+        self.names_file.flush()
+        self.file.flush()
+
+    def close(self):
+        """
+        Flush and close the record and names files.
+        """
+        self.names_file.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(data, path):
+    """
+    Validate a file header and return (size, win_length).
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a game record file")
+    magic, version, size, win_length = HEADER.unpack(data[:HEADER.size])
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a game record file")
+    return size, win_length
+
+
+def read_names(path):
+    """
+    Return the list of player names of a record file, indexed by id.
+    """
+    try:
+        with open(path + '.names', encoding='utf-8') as f:
+            return [line.rstrip('\n') for line in f]
+    except FileNotFoundError:
+        return []
+
+
+class GameReader():
+    """
+    Memory-mapped, random-access view of a record file.
+
+    Records are decoded only when they are read, so iterating over a file of
+    hundreds of millions of games never holds more than one in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size, self.win_length = read_header(self.map, path)
+        self.count = (len(self.map) - HEADER.size) // RECORD.size
+        self._names = None
+
+    @property
+    def names(self):
+        """
+        Player names by id, loaded the first time they are needed.
+        """
+        if self._names is None:
+            self._names = read_names(self.path)
+        return self._names
+
+    def __len__(self):
+        return self.count
+
+    def raw(self, index):
+        """
+        Return the (moves, info) integers of a record without decoding them.
+        """
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("game index out of range")
+        return RECORD.unpack_from(self.map, HEADER.size + index * RECORD.size)
+
+    def __getitem__(self, index):
+        return self.decode(*self.raw(index))
+
+    def __iter__(self):
+        end = HEADER.size + self.count * RECORD.size
+        for moves, info in RECORD.iter_unpack(memoryview(self.map)[HEADER.size:end]):
+            yield self.decode(moves, info)
+
+    def decode(self, moves, info):
+        """
+        Turn the two integers of a record into a GameRecord.
+        """
+        count = info & 0x1F
+        names = self.names
+        return GameRecord(
+            moves=unpack_moves(moves, count),
+            result=RESULT_NAMES[(info >> 5) & 0x3],
+            x_name=names[(info >> 8) & NAME_MASK],
+            o_name=names[(info >> (8 + NAME_BITS)) & NAME_MASK],
+        )
+
+    def result_counts(self):
+        """
+        Count the results of every game without decoding moves or names.
+        """
+        counts = dict.fromkeys(RESULT_NAMES.values(), 0)
+        end = HEADER.size + self.count * RECORD.size
+        for _, info in RECORD.iter_unpack(memoryview(self.map)[HEADER.size:end]):
+            counts[RESULT_NAMES[(info >> 5) & 0x3]] += 1
+        return counts
+
+    def replay(self, index):
+        """
+        Return an engine.Board with the moves of a game played out.
+        """
+        board = engine.Board(size=self.size, win_length=self.win_length)
+        for cell in self[index].moves:
+            board.make(cell)
+        return board
+
+    def close(self):
+        """
+        Unmap and close the record file.
+        """
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
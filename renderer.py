@@ -0,0 +1,63 @@
+"""
+Dirty-rectangle rendering for the game window.
+
+Draw code marks the regions it touched instead of presenting the whole window.
+flush() is called once per frame and hands only those rectangles to
+pg.display.update(), or skips presenting entirely when nothing changed.
+"""
+
+import pygame as pg
+
+
+class Renderer():
+    """
+    Collects dirty regions of a display surface and presents them once per frame.
+    """
+
+    def __init__(self, screen):
+        """
+        Track dirty regions of the given display surface.
+        """
+        self.screen = screen
+        self.bounds = screen.get_rect()  # Dirty regions are clipped to the window
+        self.dirty = []  # Non-overlapping rectangles waiting to be presented
+        self.full = False  # True when the whole window must be presented
+        self.flips = 0  # Number of presents issued, for diagnostics
+
+    def mark(self, rect):
+        """
+        Mark a region of the screen as changed. Overlapping regions are merged.
+        """
+        if self.full:
+            return
+        rect = pg.Rect(rect).clip(self.bounds)
+        if not rect.width or not rect.height:
+            return
+        # Merge with anything it overlaps so the same pixels are never sent twice
+        i = rect.collidelist(self.dirty)
+        while i != -1:
+            rect.union_ip(self.dirty.pop(i))
+            i = rect.collidelist(self.dirty)
+        self.dirty.append(rect)
+
+    def mark_all(self):
+        """
+        Mark the whole window as changed, e.g. after switching screens.
+        """
+        self.full = True
+        self.dirty.clear()
+
+    def flush(self):
+        """
+        Present the dirty regions, if any. Returns True if anything was presented.
+        """
+        if self.full:
+            pg.display.update()
+        elif self.dirty:
+            pg.display.update(self.dirty)
+        else:
+            return False  # Idle frame: nothing to present
+        self.full = False
+        self.dirty = []
+        self.flips += 1
+        return True
@@ -0,0 +1,293 @@
+"""
+Input recording and headless replay of game sessions.
+
+A session recorded with ``tic_tac_toe.py --record-input PATH`` stores every
+frame that did something: its monotonic time, the input events the game
+handles (clicks, keys, quit, expose), whether timers fired and the cell the
+computer played, if any. The file closes with checksums of the final game state
+and screen. Replaying feeds the same frames back through TicTacToe.frame()
+under the dummy video driver, at full speed or in real time, with the
+computer's recorded moves standing in for its search, then reports frame
+timings and checks that the final state matches:
+
+    python tic_tac_toe.py --ai o --record-input kiosk.inp
+    python replay.py kiosk.inp --output replay.json
+
+The file layout is a header (magic, version, board size, win length, computer
+side) followed by tagged records:
+
+    F  frame: time (float64), event count (uint16), computer's cell (int16, -1 for none)
+    M  mouse button down: x, y (int16), button (uint8)
+    K  key down: key (int32), modifiers (uint16), UTF-8 text length (uint8), text
+    Q  quit
+    V  window exposed
+    E  end: state and screen CRC-32 (uint32 each)
+
+Sessions that take names from a leaderboard replay without it, so completions
+offered by the database are not reproduced.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame as pg
+from pygame.locals import *
+
+from stats import percentile
+
+MAGIC = b"TTTS"
+VERSION = 1
+HEADER = struct.Struct('<4sBBBB')  # magic, version, size, win length, computer side
+FRAME = struct.Struct('<dHh')  # time, event count, computer's cell
+MOUSE = struct.Struct('<hhB')  # x, y, button
+KEY = struct.Struct('<iHB')  # key, modifiers, text length
+END = struct.Struct('<II')  # state and screen checksums
+SIDES = (None, 'x', 'o')  # Computer side by header code
+
+
+def state_checksum(game):
+    """
+    Return the CRC-32 of the game state a replay has to reproduce.
+    """
+    state = (game.state, game.size, game.win_length, tuple(game.board.moves), game.xo,
+             game.winner, game.draw, game.scores['x'], game.scores['o'], game.last_winner,
+             game.player_names['x'], game.player_names['o'], game.tiebreaker_round)
+    return zlib.crc32(repr(state).encode())
+
+
+def screen_checksum(screen):
+    """
+    Return the CRC-32 of the screen's pixels. Text is drawn with the system's
+    fonts, so this only matches between machines with the same fonts.
+    """
+    return zlib.crc32(pg.image.tobytes(screen, 'RGB'))
+
+
+class InputRecorder():
+    """
+    Appends the frames of a live session to an input log.
+    """
+
+    def __init__(self, path, size, win_length, ai_player=None):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, size, win_length, SIDES.index(ai_player)))
+        self.frames = 0  # Frames written
+
+    def encode(self, event):
+        """
+        Return the record of an input event, or None for events the game ignores.
+        """
+        if event.type == MOUSEBUTTONDOWN:
+            x, y = event.pos
+            return b'M' + MOUSE.pack(int(x), int(y), event.button)
+        if event.type == KEYDOWN:
+            text = event.unicode.encode()[:255]
+            return b'K' + KEY.pack(event.key, event.mod, len(text)) + text
+        if event.type == QUIT:
+            return b'Q'
+        if event.type == VIDEOEXPOSE:
+            return b'V'
+        return None
+
+    def frame(self, now, events, timers, cell):
+        """
+        Record a frame at monotonic time now if it handled input, ran timers
+        (timers is how many) or played the computer's move (cell, or None).
+        """
+        records = [record for record in map(self.encode, events) if record is not None]
+        if not records and not timers and cell is None:
+            return
+        self.file.write(b'F' + FRAME.pack(now, len(records), -1 if cell is None else cell))
+        self.file.write(b''.join(records))
+        self.file.flush()  # A kiosk that crashes keeps everything up to the last frame
+        self.frames += 1
+
+    def close(self, state=None, screen=None):
+        """
+        Write the final checksums, if given, and close the file.
+        """
+        if state is not None:
+            self.file.write(b'E' + END.pack(state, screen or 0))
+        self.file.close()
+
+
+class InputReader():
+    """
+    A recorded session loaded into memory: the board variant, the frames and the final checksums.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, self.size, self.win_length, side = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an input recording")
+        self.ai_player = SIDES[side]
+        self.frames = []  # (time, events, computer's cell or None)
+        self.state = self.screen = None  # Final checksums, if the session ended cleanly
+        offset = HEADER.size
+        events = []
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            offset += 1
+            if tag == b'F':
+                when, count, cell = FRAME.unpack_from(data, offset)
+                offset += FRAME.size
+                events = []
+                self.frames.append((when, events, None if cell < 0 else cell))
+            elif tag == b'M':
+                x, y, button = MOUSE.unpack_from(data, offset)
+                offset += MOUSE.size
+                events.append(pg.event.Event(MOUSEBUTTONDOWN, pos=(x, y), button=button))
+            elif tag == b'K':
+                key, mod, length = KEY.unpack_from(data, offset)
+                offset += KEY.size
+                text = data[offset:offset + length].decode(errors='replace')
+                offset += length
+                events.append(pg.event.Event(KEYDOWN, key=key, mod=mod, unicode=text))
+            elif tag == b'Q':
+                events.append(pg.event.Event(QUIT))
+            elif tag == b'V':
+                events.append(pg.event.Event(VIDEOEXPOSE))
+            elif tag == b'E':
+                self.state, self.screen = END.unpack_from(data, offset)
+                offset += END.size
+            else:
+                raise ValueError(f"{path} is corrupt at byte {offset - 1}")
+
+
+class ScriptedThinker():
+    """
+    Stands in for thinker.Thinker during a replay: the search finishes on the
+    frame where the recorded session played the computer's move.
+    """
+
+    def __init__(self):
+        self.active = False  # A search has been started and not collected
+        self.pending = None  # Recorded move for the frame being replayed
+        self.best = None
+        self.iterations = 0
+        self.started = 0.0
+
+    def start(self, board):
+        self.active = True
+        self.best = None
+        self.started = time.perf_counter()
+
+    def thinking(self):
+        return self.active
+
+    def poll(self):
+        if not self.active or self.pending is None:
+            return False
+        self.best, self.pending = self.pending, None
+        self.active = False
+        return True
+
+    def hurry(self):
+        pass
+
+    def cancel(self):
+        self.active = False
+        self.best = None
+
+
+def replay(path, realtime=False, profile_path=None):
+    """
+    Replay a recorded session headlessly and return a summary dict with the
+    frame timings and whether the final state matches the recording.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import tic_tac_toe
+    session = InputReader(path)
+    game = tic_tac_toe.TicTacToe(ai_player=session.ai_player, size=session.size,
+                                 win_length=session.win_length, profile_path=profile_path)
+    computer = ScriptedThinker()
+    if session.ai_player:
+        game.thinker = computer  # Replaces the search, so start() loads no AI
+    game.start()
+
+    durations = []
+    clock = time.perf_counter
+    start = clock()
+    first = session.frames[0][0] if session.frames else 0.0
+    for when, events, cell in session.frames:
+        if realtime:
+            delay = start + (when - first) - clock()
+            if delay > 0:
+                time.sleep(delay)
+        computer.pending = cell
+        began = clock()
+        game.frame(events, when)
+        durations.append(clock() - began)
+        if not game.running:
+            break
+    elapsed = clock() - start
+
+    state, screen = state_checksum(game), screen_checksum(game.screen)
+    if game.running:
+        game.quit()
+    if profile_path:
+        game.profiler.export(profile_path)
+    pg.quit()
+    durations.sort()
+    return {
+        'path': path,
+        'frames': len(durations),
+        'recorded_frames': len(session.frames),
+        'seconds': elapsed,
+        'session_seconds': session.frames[-1][0] - first if session.frames else 0.0,
+        'frames_per_second': len(durations) / elapsed if elapsed else 0.0,
+        'frame_ms': {
+            'mean': sum(durations) / len(durations) * 1000 if durations else 0.0,
+            'p50': percentile(durations, 0.5) * 1000,
+            'p99': percentile(durations, 0.99) * 1000,
+            'max': durations[-1] * 1000 if durations else 0.0,
+        },
+        'state_checksum': state,
+        'screen_checksum': screen,
+        'expected_state': session.state,
+        'expected_screen': session.screen,
+        'state_matches': session.state is None or session.state == state,
+        'screen_matches': session.screen is None or session.screen == screen,
+    }
+
+
+def main(argv=None):
+    """
+    Replay a recorded session from the command line. Exits with status 1 if the
+    final state differs from the recording.
+    """
+    parser = argparse.ArgumentParser(description="Replay a recorded Tic-Tac-Toe session headlessly")
+    parser.add_argument("path", help="input recording made with tic_tac_toe.py --record-input")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded pacing instead of full speed")
+    parser.add_argument("--profile", metavar="PATH", help="export the frame profiler's timings to .csv or .json")
+    parser.add_argument("--output", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args(argv)
+
+    summary = replay(args.path, args.realtime, args.profile)
+    timing = summary['frame_ms']
+    print(f"{summary['frames']} of {summary['recorded_frames']} frames in {summary['seconds']*1000:.1f}ms "
+          f"({summary['frames_per_second']:.0f} frames/s, session lasted {summary['session_seconds']:.1f}s)")
+    print(f"frame time: mean {timing['mean']:.3f}ms  p50 {timing['p50']:.3f}ms  "
+          f"p99 {timing['p99']:.3f}ms  max {timing['max']:.3f}ms")
+    if summary['expected_state'] is None:
+        print(f"state {summary['state_checksum']:08x} (the recording has no final checksums)")
+    else:
+        print(f"state {summary['state_checksum']:08x}: {'match' if summary['state_matches'] else 'MISMATCH'}, "
+              f"screen {summary['screen_checksum']:08x}: {'match' if summary['screen_matches'] else 'differs'}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+    if not summary['state_matches']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Timer scheduler for the game's single event loop.
+
+Instead of sleeping, code asks the scheduler to call it back later. The main
+loop runs whatever is due each iteration and uses timeout() to decide how long
+it may block waiting for input.
+"""
+
+import heapq
+import itertools
+import time
+
+
+class Timer():
+    """
+    Handle for a scheduled callback, used to cancel it.
+    """
+
+    __slots__ = ('when', 'callback', 'args', 'cancelled')
+
+    def __init__(self, when, callback, args):
+        self.when = when  # Monotonic time the callback is due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler():
+    """
+    Runs callbacks at or after a given monotonic time, in due order.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Create an empty scheduler. clock returns the current time in seconds.
+        """
+        self.clock = clock
+        self.timers = []  # Heap of (when, sequence, timer)
+        self.sequence = itertools.count()  # Keeps callbacks due together in order
+
+    def call_later(self, delay, callback, *args):
+        """
+        Call callback(*args) after delay seconds. Returns a Timer handle.
+        """
+        timer = Timer(self.clock() + delay, callback, args)
+        heapq.heappush(self.timers, (timer.when, next(self.sequence), timer))
+        return timer
+
+    def cancel(self, timer):
+        """
+        Stop a scheduled callback from running. Cancelling twice is harmless.
+        """
+        if timer is not None:
+            timer.cancelled = True
+
+    def cancel_all(self):
+        """
+        Drop every scheduled callback.
+        """
+        for _, _, timer in self.timers:
+            timer.cancelled = True
+        self.timers.clear()
+
+    def run_due(self):
+        """
+        Run every callback whose time has come. Returns how many ran.
+        """
+        ran = 0
+        now = self.clock()
+        while self.timers and self.timers[0][0] <= now:
+            _, _, timer = heapq.heappop(self.timers)
+            if not timer.cancelled:
+                timer.cancelled = True  # A timer only ever fires once
+                timer.callback(*timer.args)
+                ran += 1
+        return ran
+
+    def timeout(self):
+        """
+        Return seconds until the next callback is due (0 if overdue), or None if idle.
+        """
+        while self.timers and self.timers[0][2].cancelled:
+            heapq.heappop(self.timers)
+        if not self.timers:
+            return None
+        return max(0.0, self.timers[0][0] - self.clock())
@@ -0,0 +1,158 @@
+"""
+Headless self-play simulator.
+
+Plays batches of games between two move policies across a process pool and
+reports throughput, the result distribution and per-move latency percentiles.
+
+Example:
+    python simulate.py --games 1000000 --x random --o solver
+"""
+
+import argparse
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import engine
+import policies
+import records
+from stats import Reservoir, percentile
+
+SAMPLES_PER_WORKER = 20000  # Latency samples kept per batch (reservoir sampled)
+SAMPLES_KEPT = 20000  # Latency samples kept per side for the whole run
+
+
+def play_batch(job):
+    """
+    Play a batch of games in a worker process.
+    Returns the result counts, moves played and latency samples per side.
+    """
+    x_name, o_name, games, size, win_length, seed, name_ids = job
+    rng = random.Random(seed)
+    x_policy = policies.make_policy(x_name, rng.getrandbits(32))
+    o_policy = policies.make_policy(o_name, rng.getrandbits(32))
+
+    results = {'x': 0, 'o': 0, 'draw': 0}
+    moves = {'x': 0, 'o': 0}
+    samples = {'x': [], 'o': []}
+    packed = bytearray() if name_ids else None  # Game records, if recording
+
+    def on_move(player, cell, seconds):
+        # Reservoir sampling keeps a batch's memory bounded however many moves it plays
+        moves[player] += 1
+        kept = samples[player]
+        if len(kept) < SAMPLES_PER_WORKER:
+            kept.append(seconds)
+        else:
+            slot = rng.randrange(moves[player])
+            if slot < SAMPLES_PER_WORKER:
+                kept[slot] = seconds
+
+    for _ in range(games):
+        board = policies.play_game(x_policy, o_policy, size, win_length, on_move)
+        results[board.winner or 'draw'] += 1
+        if packed is not None:
+            packed += records.pack_record(board.moves, records.result_code(board), *name_ids)
+    return results, moves, samples, packed
+
+
+def simulate(x_name, o_name, games, size=engine.SIZE, win_length=None,
+             workers=None, batch_size=1000, seed=None, writer=None):
+    """
+    Play games across a process pool and return a summary dict.
+    Every game is appended to writer (a records.GameWriter) if one is given.
+    """
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    # Workers pack records themselves, so resolve the name ids up front
+    name_ids = (writer.name_id(x_name), writer.name_id(o_name)) if writer else None
+    jobs = []
+    remaining = games
+    while remaining > 0:
+        count = min(batch_size, remaining)
+        jobs.append((x_name, o_name, count, size, win_length, rng.getrandbits(64), name_ids))
+        remaining -= count
+
+    results = {'x': 0, 'o': 0, 'draw': 0}
+    moves = {'x': 0, 'o': 0}
+    # One fixed-size sample per side, so the parent's memory does not grow with the games either
+    samples = {'x': Reservoir(SAMPLES_KEPT, rng), 'o': Reservoir(SAMPLES_KEPT, rng)}
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        for batch_results, batch_moves, batch_samples, packed in pool.imap_unordered(play_batch, jobs):
+            if writer:
+                writer.write_packed(packed)
+            for key in results:
+                results[key] += batch_results[key]
+            for player in moves:
+                moves[player] += batch_moves[player]
+                samples[player].add(batch_samples[player], batch_moves[player])
+    elapsed = time.perf_counter() - start
+
+    latency = {}
+    for player in samples:
+        ordered = sorted(samples[player].values())
+        latency[player] = {
+            'p50_us': percentile(ordered, 0.50) * 1e6,
+            'p90_us': percentile(ordered, 0.90) * 1e6,
+            'p99_us': percentile(ordered, 0.99) * 1e6,
+            'max_us': (ordered[-1] if ordered else 0.0) * 1e6,
+        }
+    return {
+        'games': games,
+        'workers': workers,
+        'seconds': elapsed,
+        'games_per_second': games / elapsed if elapsed else 0.0,
+        'results': results,
+        'moves': moves,
+        'latency': latency,
+    }
+
+
+def print_report(summary, x_name, o_name):
+    """
+    Print a human-readable summary of a simulation run.
+    """
+    games = summary['games'] or 1
+    results = summary['results']
+    print(f"{summary['games']} games of {x_name} (x) vs {o_name} (o) "
+          f"on {summary['workers']} workers in {summary['seconds']:.2f}s")
+    print(f"Throughput: {summary['games_per_second']:.0f} games/s")
+    print(f"X wins: {results['x']} ({results['x']/games:.1%})  "
+          f"O wins: {results['o']} ({results['o']/games:.1%})  "
+          f"Draws: {results['draw']} ({results['draw']/games:.1%})")
+    for player, name in (('x', x_name), ('o', o_name)):
+        stats = summary['latency'][player]
+        print(f"{player.upper()} ({name}) move latency: p50 {stats['p50_us']:.1f}us  "
+              f"p90 {stats['p90_us']:.1f}us  p99 {stats['p99_us']:.1f}us  max {stats['max_us']:.1f}us")
+
+
+def main(argv=None):
+    """
+    Run a simulation from the command line and print the report.
+    """
+    parser = argparse.ArgumentParser(description="Play Tic-Tac-Toe games headlessly between move policies")
+    parser.add_argument("--games", type=int, default=100000, help="number of games to play")
+    parser.add_argument("--x", default="random", choices=sorted(policies.POLICIES), help="policy playing X")
+    parser.add_argument("--o", default="random", choices=sorted(policies.POLICIES), help="policy playing O")
+    parser.add_argument("--size", type=int, default=engine.SIZE, help="cells per side of the board")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="games per worker task")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    parser.add_argument("--record", metavar="PATH", help="append every game to a binary record file")
+    args = parser.parse_args(argv)
+
+    writer = records.GameWriter(args.record, args.size, args.win_length) if args.record else None
+    try:
+        summary = simulate(args.x, args.o, args.games, args.size, args.win_length,
+                           args.workers, args.batch_size, args.seed, writer)
+    finally:
+        if writer:
+            writer.close()
+    print_report(summary, args.x, args.o)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Perfect-play Tic-Tac-Toe solver.
+
+Positions are searched with negamax and alpha-beta pruning. Results are kept in
+a transposition table keyed by the canonical form of the position under the 8
+symmetries of the board, so every rotation or reflection shares one entry. The
+solved table can be written to disk and loaded at startup, which turns move
+selection into a handful of table lookups.
+
+Run ``python solver.py [path]`` to solve the game and save the table (by
+default as solver_table.bin next to this module).
+"""
+
+import os
+import sys
+from array import array
+
+import engine
+
+TABLE_MAGIC = b"TTT1"  # File header for saved tables
+# Default path for the saved table, next to this module wherever the game is started from
+DEFAULT_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solver_table.bin")
+
+# Transposition table flags for the stored value
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def _symmetries():
+    """
+    Return the 8 board symmetries as cell permutations (new index -> old index).
+    """
+    n = engine.SIZE
+    perms = []
+    for flip in (False, True):
+        grid = [[r*n + c for c in range(n)] for r in range(n)]
+        if flip:
+            grid = [row[::-1] for row in grid]
+        for _ in range(4):
+            perms.append(tuple(cell for row in grid for cell in row))
+            grid = [list(row) for row in zip(*grid[::-1])]  # Rotate 90 degrees
+    return perms
+
+
+SYMMETRIES = _symmetries()
+
+# For every symmetry, the image of each of the 512 possible masks
+_TRANSFORMS = tuple(
+    tuple(sum(1 << new for new, old in enumerate(perm) if mask >> old & 1)
+          for mask in range(1 << engine.CELLS))
+    for perm in SYMMETRIES
+)
+
+
+def canonical(x, o):
+    """
+    Return the smallest key of the position (x, o) over all 8 symmetries.
+    """
+    return min(t[x] | t[o] << engine.CELLS for t in _TRANSFORMS)
+
+
+class Solver():
+    """
+    Negamax solver with a symmetry-reduced transposition table.
+
+    Scores are from the point of view of the side to move: a win is
+    ``1 + empty cells left``, so faster wins and slower losses score better,
+    and a draw is 0.
+    """
+
+    def __init__(self):
+        """
+        Create a solver with an empty transposition table.
+        """
+        self.table = {}  # canonical key -> (score, flag)
+
+    def search(self, x, o, alpha=-engine.CELLS - 1, beta=engine.CELLS + 1):
+        """
+        Return the negamax score of (x, o) for the side to move.
+        The side to move is always stored in x; callers swap masks per ply.
+        """
+        key = canonical(x, o)
+        entry = self.table.get(key)
+        if entry is not None:
+            score, flag = entry
+            if flag == EXACT:
+                return score
+            if flag == LOWER and score >= beta:
+                return score
+            if flag == UPPER and score <= alpha:
+                return score
+
+        empty = engine.legal_mask(x, o)
+        # The opponent made the last move, so only they can have just won
+        if engine.find_win(o) is not None:
+            return -(bin(empty).count('1') + 1)
+        if not empty:
+            return 0
+
+        original_alpha = alpha
+        best = -engine.CELLS - 1
+        for cell in engine.iter_cells(empty):
+            score = -self.search(o, x | 1 << cell, -beta, -alpha)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (best, flag)
+        return best
+
+    def score(self, x, o):
+        """
+        Return the exact score of (x, o) for the side to move.
+        """
+        entry = self.table.get(canonical(x, o))
+        if entry is not None and entry[1] == EXACT:
+            return entry[0]
+        return self.search(x, o)
+
+    def best_moves(self, board):
+        """
+        Return every optimal cell for the side to move on an engine.Board.
+        """
+        mine, theirs = (board.x, board.o) if board.turn == 'x' else (board.o, board.x)
+        best, moves = None, []
+        for cell in engine.iter_cells(board.legal_moves()):
+            score = -self.score(theirs, mine | 1 << cell)
+            if best is None or score > best:
+                best, moves = score, [cell]
+            elif score == best:
+                moves.append(cell)
+        return moves
+
+    def best_move(self, board):
+        """
+        Return an optimal cell for the side to move, or None if the game is over.
+        """
+        moves = self.best_moves(board)
+        return moves[0] if moves else None
+
+    def solve(self):
+        """
+        Fill the table with exact scores for every reachable position.
+        """
+        seen = set()
+        stack = [(0, 0)]
+        while stack:
+            x, o = stack.pop()
+            key = canonical(x, o)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = self.table.get(key)
+            if entry is None or entry[1] != EXACT:
+                self.table[key] = (self.search(x, o), EXACT)
+            if engine.find_win(o) is None:
+                for cell in engine.iter_cells(engine.legal_mask(x, o)):
+                    stack.append((o, x | 1 << cell))
+        return self
+
+    def save(self, path=DEFAULT_TABLE):
+        """
+        Write the exact entries of the table to a compact binary file.
+        """
+        keys = array('I')
+        scores = array('b')
+        for key, (score, flag) in sorted(self.table.items()):
+            if flag == EXACT:
+                keys.append(key)
+                scores.append(score)
+        with open(path, 'wb') as f:
+            f.write(TABLE_MAGIC)
+            f.write(len(keys).to_bytes(4, 'little'))
+            keys.tofile(f)
+            scores.tofile(f)
+
+    @classmethod
+    def load(cls, path=DEFAULT_TABLE):
+        """
+        Create a solver from a table previously written by save().
+        """
+        solver = cls()
+        with open(path, 'rb') as f:
+            if f.read(4) != TABLE_MAGIC:
+                raise ValueError(f"{path} is not a solver table")
+            count = int.from_bytes(f.read(4), 'little')
+            keys = array('I')
+            scores = array('b')
+            keys.fromfile(f, count)
+            scores.fromfile(f, count)
+        solver.table = {key: (score, EXACT) for key, score in zip(keys, scores)}
+        return solver
+
+    @classmethod
+    def load_or_solve(cls, path=DEFAULT_TABLE):
+        """
+        Load the saved table if it exists, otherwise solve the game in memory.
+        """
+        try:
+            return cls.load(path)
+        except (OSError, ValueError, EOFError):
+            return cls().solve()
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE
+    solver = Solver().solve()
+    solver.save(path)
+    print(f"Saved {len(solver.table)} positions to {path}")
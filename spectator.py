@@ -0,0 +1,393 @@
+"""
+Spectator wall: hundreds of live boards tiled in one window.
+
+Board backgrounds (fill and grid) are pre-rendered once per tile size and board
+size, and marks are pre-scaled sprites, so updating a tile never redraws the
+grid. Everything that changed during a frame is queued and drawn with a single
+Surface.blits() call, and only the tiles that changed are presented. Tiles too
+small for the X and O images fall back to flat coloured squares.
+
+The wall can show bots playing locally or spectate every match on a
+multiplayer server:
+    python spectator.py --games 400 --x random --o heuristic
+    python spectator.py --connect 127.0.0.1:7777
+"""
+
+import argparse
+import math
+import os
+import random
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame as pg
+from pygame.locals import *
+
+import engine
+import netplay
+import policies
+import profiler
+import renderer
+import scheduler
+import sprites
+import text_cache
+
+SPECTATE_EVENT = pg.USEREVENT + 2  # Carries a line received from the server
+LOD_IMAGE_SIZE = 12  # Cells smaller than this many pixels draw flat squares instead of images
+WALL_COLOR = (48, 25, 52)  # Gap between tiles
+MARK_COLORS = {'x': (200, 40, 40), 'o': (40, 90, 200)}  # Flat marks at low detail
+WIN_COLOR = (20, 160, 60)
+
+
+class Tile():
+    """
+    One board on the wall.
+    """
+
+    __slots__ = ('rect', 'board', 'line')
+
+    def __init__(self, rect):
+        self.rect = rect  # Screen area of the tile
+        self.board = None  # engine.Board shown, or None when the tile is empty
+        self.line = None  # (start, end) of the winning line to draw, in screen coordinates
+
+
+class SpectatorWall():
+    """
+    Tiles many boards over a surface and redraws only the tiles that changed.
+    """
+
+    def __init__(self, screen, renderer, count, gap=2):
+        """
+        Lay out count tiles as large and square as fit on screen.
+        """
+        self.screen = screen
+        self.renderer = renderer
+        width, height = screen.get_size()
+        # Pick the column count that gives the largest square tiles
+        best = None
+        for columns in range(1, count + 1):
+            rows = math.ceil(count / columns)
+            side = min(width // columns, height // rows)
+            if best is None or side > best[0]:
+                best = (side, columns)
+        side, columns = best
+        self.tile_size = max(1, side - gap)
+        self.tiles = [Tile(pg.Rect((i % columns) * side + gap // 2, (i // columns) * side + gap // 2,
+                                   self.tile_size, self.tile_size)) for i in range(count)]
+        self.backgrounds = {}  # Board size -> pre-rendered empty board
+        self.sprites = {}  # (board size, side) -> pre-scaled mark
+        self.images = {side: sprites.load_image(f"{side}.png") for side in ('x', 'o')}
+        self.pending = []  # (surface, position) pairs to draw this frame, in order
+        self.dirty = set()  # Indices of tiles changed this frame
+        self.blits = 0  # Surfaces drawn since startup, for the profiler
+
+        screen.fill(WALL_COLOR)
+        renderer.mark_all()
+
+    def cell_size(self, size):
+        """
+        Return the width in pixels of a cell on a board of the given size.
+        """
+        return self.tile_size / size
+
+    def background(self, size):
+        """
+        Return the empty board of the given size, rendering it the first time.
+        """
+        surface = self.backgrounds.get(size)
+        if surface is None:
+            surface = pg.Surface((self.tile_size, self.tile_size)).convert()
+            surface.fill(pg.Color('white'))
+            cell = self.cell_size(size)
+            width = max(1, int(cell) // 12)
+            color = pg.Color('black') if cell >= LOD_IMAGE_SIZE else pg.Color('gray70')
+            for i in range(1, size):
+                offset = round(i * cell)
+                pg.draw.line(surface, color, (offset, 0), (offset, self.tile_size), width)
+                pg.draw.line(surface, color, (0, offset), (self.tile_size, offset), width)
+            self.backgrounds[size] = surface
+        return surface
+
+    def sprite(self, size, side):
+        """
+        Return the mark of side for a cell on a board of the given size, scaling it the first time.
+        """
+        key = (size, side)
+        surface = self.sprites.get(key)
+        if surface is None:
+            cell = self.cell_size(size)
+            if cell >= LOD_IMAGE_SIZE:
+                mark = max(1, int(cell * 0.6))
+                surface = pg.transform.smoothscale(self.images[side], (mark, mark))
+            else:
+                # Level of detail: a flat square reads better than a few blurred pixels
+                mark = max(1, int(cell) - 1)
+                surface = pg.Surface((mark, mark)).convert()
+                surface.fill(MARK_COLORS[side])
+            self.sprites[key] = surface
+        return surface
+
+    def cell_position(self, tile, size, cell, surface):
+        """
+        Return where surface goes to be centered on a cell of a tile.
+        """
+        row, col = divmod(cell, size)
+        width = self.cell_size(size)
+        return (tile.rect.x + int((col + 0.5) * width - surface.get_width() / 2),
+                tile.rect.y + int((row + 0.5) * width - surface.get_height() / 2))
+
+    def start(self, index, size=engine.SIZE, win_length=None):
+        """
+        Show a new empty board on a tile and return its engine.Board.
+        """
+        tile = self.tiles[index]
+        tile.board = engine.Board(size=size, win_length=win_length)
+        tile.line = None
+        self.pending.append((self.background(size), tile.rect))
+        self.dirty.add(index)
+        return tile.board
+
+    def move(self, index, cell):
+        """
+        Play a cell on a tile's board and draw only the new mark.
+        """
+        tile = self.tiles[index]
+        board = tile.board
+        side = board.turn
+        board.make(cell)
+        surface = self.sprite(board.size, side)
+        self.pending.append((surface, self.cell_position(tile, board.size, cell, surface)))
+        if board.winner:
+            cells = board.win_cells()
+            width = self.cell_size(board.size)
+            ends = []
+            for end in (cells[0], cells[-1]):
+                row, col = divmod(end, board.size)
+                ends.append((tile.rect.x + (col + 0.5) * width, tile.rect.y + (row + 0.5) * width))
+            tile.line = tuple(ends)
+        self.dirty.add(index)
+
+    def clear(self, index):
+        """
+        Blank a tile that no longer shows a game.
+        """
+        tile = self.tiles[index]
+        tile.board = tile.line = None
+        self.screen.fill(WALL_COLOR, tile.rect)
+        self.dirty.add(index)
+
+    def draw(self):
+        """
+        Draw everything queued this frame in one batch and mark the changed tiles.
+        """
+        if self.pending:
+            self.screen.blits(self.pending, doreturn=False)
+            self.blits += len(self.pending)
+            self.pending = []
+        for index in self.dirty:
+            tile = self.tiles[index]
+            if tile.line:
+                width = max(1, self.tile_size // 30)
+                pg.draw.line(self.screen, WIN_COLOR, *tile.line, width)
+            self.renderer.mark(tile.rect)
+        self.dirty.clear()
+
+
+class LocalFeed():
+    """
+    Bots playing a game on every tile, one move per game every move_delay seconds.
+    """
+
+    def __init__(self, wall, timers, x_name, o_name, size=engine.SIZE, win_length=None,
+                 move_delay=0.25, hold=1.0, seed=None):
+        self.wall = wall
+        self.timers = timers
+        self.size = size
+        self.win_length = win_length
+        self.move_delay = move_delay
+        self.hold = hold  # Seconds a finished board stays up
+        self.rng = random.Random(seed)
+        self.policies = {'x': policies.make_policy(x_name, self.rng.getrandbits(32)),
+                         'o': policies.make_policy(o_name, self.rng.getrandbits(32))}
+        self.games = 0  # Games finished
+        for index in range(len(wall.tiles)):
+            # Stagger the first moves so the tiles do not all change on the same frame
+            self.timers.call_later(self.rng.uniform(0, move_delay), self.new_game, index)
+
+    def new_game(self, index):
+        """
+        Start a fresh game on a tile.
+        """
+        self.wall.start(index, self.size, self.win_length)
+        self.timers.call_later(self.move_delay, self.step, index)
+
+    def step(self, index):
+        """
+        Play the next move of a tile's game.
+        """
+        board = self.wall.tiles[index].board
+        self.wall.move(index, self.policies[board.turn].choose(board))
+        if board.is_over():
+            self.games += 1
+            self.timers.call_later(self.hold, self.new_game, index)
+        else:
+            self.timers.call_later(self.move_delay, self.step, index)
+
+
+class ServerFeed():
+    """
+    Every match on a multiplayer server, each shown on a free tile while it runs.
+    """
+
+    def __init__(self, wall, timers, host, port, hold=1.0):
+        self.wall = wall
+        self.timers = timers
+        self.hold = hold  # Seconds a finished board stays up
+        self.tiles = {}  # Match id -> tile index
+        self.free = list(range(len(wall.tiles) - 1, -1, -1))  # Free tile indices, lowest last
+        self.hidden = set()  # Matches not shown because every tile was busy
+        self.games = 0  # Matches finished while watching
+        self.closed = False  # Set once the server has gone away; the wall then quits
+        self.client = netplay.NetClient(host, port, on_line=self.post_line)
+        self.client.watch()
+
+    def post_line(self, line):
+        """
+        Hand a server line to the main thread (called from the client's reader thread).
+        """
+        pg.event.post(pg.event.Event(SPECTATE_EVENT, line=line))
+
+    def handle_line(self, line):
+        """
+        Apply one spectator message from the server.
+        """
+        if line == "CLOSED":
+            self.closed = True
+            return
+        kind, *args = line.split()
+        if kind != 'GAME' or len(args) < 2:
+            return
+        match_id, event = args[0], args[1]
+        if event == 'START':
+            if not self.free:
+                self.hidden.add(match_id)
+                return
+            index = self.free.pop()
+            self.tiles[match_id] = index
+            self.wall.start(index, int(args[2]), int(args[3]))
+        elif event == 'MOVED' and match_id in self.tiles:
+            self.wall.move(self.tiles[match_id], int(args[3]))
+        elif event == 'OVER':
+            self.games += 1
+            self.hidden.discard(match_id)
+            index = self.tiles.pop(match_id, None)
+            if index is not None:
+                self.timers.call_later(self.hold, self.release, index)
+
+    def release(self, index):
+        """
+        Blank a tile after its match ended and make it available again.
+        """
+        self.wall.clear(index)
+        self.free.append(index)
+
+    def close(self):
+        """
+        Disconnect from the server.
+        """
+        self.client.close()
+
+
+def run(args):
+    """
+    Open the window and run the wall until it is closed.
+    """
+    pg.display.init()
+    pg.font.init()
+    pg.display.set_caption("Tic Tac Toe - spectator wall")
+    screen = pg.display.set_mode((args.width, args.height))
+    present = renderer.Renderer(screen)
+    clock = pg.time.Clock()
+    timers = scheduler.Scheduler()
+    frames = profiler.FrameProfiler(export_path=args.profile)
+    overlay = profiler.FrameOverlay(frames, text_cache.TextCache(max_entries=64))
+    overlay.visible = args.show_profile
+
+    wall = SpectatorWall(screen, present, args.games)
+    if args.connect:
+        host, _, port = args.connect.rpartition(':')
+        feed = ServerFeed(wall, timers, host or '127.0.0.1', int(port))
+    else:
+        feed = LocalFeed(wall, timers, args.x, args.o, args.size, args.win_length,
+                         args.move_delay, seed=args.seed)
+
+    running = True
+    while running:
+        clock.tick(args.fps)
+        frames.begin_frame()
+        overlay.hide(screen, present)
+        with frames.section('events'):
+            for event in pg.event.get():
+                if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                    running = False
+                elif event.type == KEYDOWN and event.key == K_F3:
+                    overlay.visible = not overlay.visible
+                elif event.type == SPECTATE_EVENT:
+                    feed.handle_line(event.line)
+                    if feed.closed:
+                        running = False
+        with frames.section('logic'):
+            timers.run_due()
+        with frames.section('render'):
+            wall.draw()
+            overlay.draw(screen, present)
+            present.flush()
+        frames.end_frame({'blits': wall.blits, 'flips': present.flips})
+        if args.frames and frames.frame_count >= args.frames:
+            running = False
+
+    if isinstance(feed, ServerFeed):
+        feed.close()
+    if args.profile:
+        frames.export(args.profile)
+    summary = frames.summary()
+    pg.quit()
+    return feed, summary
+
+
+def main(argv=None):
+    """
+    Parse the command line and run the spectator wall.
+    """
+    parser = argparse.ArgumentParser(description="Watch many Tic-Tac-Toe games at once")
+    parser.add_argument("--games", type=int, default=200, help="number of tiles on the wall")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="spectate every match on a multiplayer server")
+    parser.add_argument("--x", default="random", choices=sorted(policies.POLICIES), help="local bot playing X")
+    parser.add_argument("--o", default="random", choices=sorted(policies.POLICIES), help="local bot playing O")
+    parser.add_argument("--size", type=int, default=engine.SIZE, help="cells per side of the local boards")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--move-delay", type=float, default=0.25, help="seconds between moves of a local game")
+    parser.add_argument("--width", type=int, default=1280, help="window width")
+    parser.add_argument("--height", type=int, default=720, help="window height")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate cap")
+    parser.add_argument("--frames", type=int, help="quit after this many frames (for measurements)")
+    parser.add_argument("--profile", metavar="PATH", help="export rolling frame timings to a .csv or .json file")
+    parser.add_argument("--show-profile", action="store_true", help="start with the frame-time overlay (F3)")
+    parser.add_argument("--seed", type=int, help="seed for reproducible local games")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.connect and not args.connect.rpartition(':')[2].isdigit():
+        parser.error("--connect expects HOST:PORT")
+
+    feed, summary = run(args)
+    if args.connect and feed.closed:
+        print("Lost connection to the server")
+    if summary:
+        print(f"{summary['frames']} frames at {summary['fps']:.1f} fps, {summary['total_ms']:.2f} ms per frame "
+              f"(worst {summary['total_max_ms']:.2f} ms), {summary['blits']:.0f} blits per frame; "
+              f"{feed.games} games finished")
+
+
+if __name__ == "__main__":
+    main()
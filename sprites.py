@@ -0,0 +1,137 @@
+"""
+Pre-rendered board sprites.
+
+The X and O images are loaded from disk once and converted to the display's
+pixel format, so blitting them needs no per-pixel conversion. SpriteAtlas
+renders everything a board layout needs up front: the empty grid, the X and O
+marks scaled to the cell, and the winning line in each of the four directions
+(or a dot, when a single cell wins).
+SpriteCache keeps one atlas per layout, so images are scaled once from the
+originals (never from an already scaled copy) and a new atlas is only built
+when the window or board size changes. Drawing a move or a win is then a single
+blit.
+"""
+
+import os
+
+import pygame as pg
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))  # Images live next to this module
+BOARD_COLOR = pg.Color('white')
+GRID_COLOR = (48, 25, 52)
+WIN_COLOR = pg.Color('black')
+WIN_WIDTH = 5  # Thickness of the winning line in pixels
+MARK_SCALE = 0.6  # Side of an X or O relative to its cell
+MARK_INSET = 0.225  # Offset of the mark from the cell's top-left corner, relative to the cell
+
+
+def load_image(name):
+    """
+    Load an image from the asset directory, converted to the display format with
+    its alpha channel. The display mode must already be set.
+    """
+    return pg.image.load(os.path.join(ASSET_DIR, name)).convert_alpha()
+
+
+class SpriteAtlas():
+    """
+    Every sprite of one board layout: a width x height board of size x size cells.
+    """
+
+    def __init__(self, images, width, height, size, win_length):
+        """
+        Render the sprites from the original images by side ('x' and 'o').
+        """
+        self.width = width
+        self.height = height
+        self.size = size
+        self.win_length = win_length
+        self.cell_width = width / size
+        self.cell_height = height / size
+        mark = (max(1, int(self.cell_width * MARK_SCALE)), max(1, int(self.cell_height * MARK_SCALE)))
+        self.marks = {side: pg.transform.smoothscale(image, mark) for side, image in images.items()}
+        self.board = self.render_board()
+        # (row step, column step) -> (surface, offset of the line's start point within it);
+        # (0, 0) is the dot marking a win of a single cell
+        self.lines = {step: self.render_line(*step) for step in ((0, 1), (1, 0), (1, 1), (1, -1), (0, 0))}
+
+    def render_board(self):
+        """
+        Return the empty board with its grid lines, thinner on larger boards.
+        """
+        surface = pg.Surface((self.width, self.height)).convert()
+        surface.fill(BOARD_COLOR)
+        line_width = max(1, 21 // self.size)
+        for i in range(1, self.size):
+            x, y = self.cell_width * i, self.cell_height * i
+            pg.draw.line(surface, GRID_COLOR, (x, 0), (x, self.height), line_width)
+            pg.draw.line(surface, GRID_COLOR, (0, y), (self.width, y), line_width)
+        return surface
+
+    def render_line(self, row_step, col_step):
+        """
+        Return (surface, start) for a winning line of win_length cells in one direction,
+        where start is the position of the line's first end inside the surface. A zero
+        step gives a dot centred on start.
+        """
+        dx = col_step * self.win_length * self.cell_width
+        dy = row_step * self.win_length * self.cell_height
+        pad = WIN_WIDTH
+        left, top = min(0, dx) - pad, min(0, dy) - pad
+        surface = pg.Surface((abs(dx) + 2 * pad, abs(dy) + 2 * pad), pg.SRCALPHA).convert_alpha()
+        start = (-left, -top)
+        if dx or dy:
+            pg.draw.line(surface, WIN_COLOR, start, (start[0] + dx, start[1] + dy), WIN_WIDTH)
+        else:
+            pg.draw.circle(surface, WIN_COLOR, start, pad)
+        return surface, start
+
+    def mark_position(self, row, col):
+        """
+        Return where the mark of the cell at (row, col), counted from 0, is blitted.
+        """
+        return (col * self.cell_width + self.cell_width * MARK_INSET,
+                row * self.cell_height + self.cell_height * MARK_INSET)
+
+    def win_line(self, cells):
+        """
+        Return (surface, position) of the line through a winning row of cells,
+        extended by half a cell beyond both end cells.
+        """
+        first_row, first_col = divmod(cells[0], self.size)
+        last_row, last_col = divmod(cells[-1], self.size)
+        row_step = (last_row > first_row) - (last_row < first_row)
+        col_step = (last_col > first_col) - (last_col < first_col)
+        surface, (start_x, start_y) = self.lines[row_step, col_step]
+        x = (first_col + 0.5 - col_step / 2) * self.cell_width
+        y = (first_row + 0.5 - row_step / 2) * self.cell_height
+        return surface, (x - start_x, y - start_y)
+
+
+class SpriteCache():
+    """
+    Loads the X and O images once and hands out an atlas per board layout.
+    """
+
+    def __init__(self):
+        self.images = {}  # Side -> converted original image
+        self.atlases = {}  # (width, height, size, win length) -> SpriteAtlas
+        self.builds = 0  # Atlases rendered, for diagnostics
+
+    def load(self):
+        """
+        Load and convert the images. Call once the display mode is set.
+        """
+        self.images = {side: load_image(f"{side}.png") for side in ('x', 'o')}
+        self.atlases.clear()
+
+    def atlas(self, width, height, size, win_length):
+        """
+        Return the atlas for a layout, rendering it the first time it is asked for.
+        """
+        key = (width, height, size, win_length)
+        atlas = self.atlases.get(key)
+        if atlas is None:
+            atlas = self.atlases[key] = SpriteAtlas(self.images, width, height, size, win_length)
+            self.builds += 1
+        return atlas
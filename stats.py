@@ -0,0 +1,69 @@
+"""
+Small summary statistics shared by the command-line tools.
+
+Only the standard library is used, so the game can time its frames with this
+module without loading the simulator's process pool and policies.
+"""
+
+import heapq
+import math
+import random
+
+
+def percentile(sorted_values, fraction):
+    """
+    Return the value at the given fraction (0..1) of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class Reservoir():
+    """
+    A uniform random sample of at most size values from a stream that arrives
+    in batches, each of which may itself already be a sample of more values.
+    """
+
+    def __init__(self, size, rng=None):
+        self.size = size
+        self.rng = rng or random.Random()
+        self.heap = []  # (key, value) of the kept values, smallest key first out
+        self.seen = 0  # Values the sample stands for
+
+    def add(self, values, seen=None):
+        """
+        Add a uniform sample of values drawn from seen values (default: all of them).
+        """
+        seen = len(values) if seen is None else seen
+        self.seen += seen
+        if not values:
+            return
+        # Weighted sampling (Efraimidis-Spirakis): every value stands for seen/len(values)
+        # values, and the size values with the largest keys u ** (1/weight) are kept, so
+        # batches mix in proportion to what they saw. Keys are stored as logarithms
+        weight = seen / len(values)
+        heap = self.heap
+        random_value = self.rng.random
+        index = 0
+        while index < len(values) and len(heap) < self.size:
+            heapq.heappush(heap, (math.log(1.0 - random_value()) / weight, values[index]))
+            index += 1
+        while index < len(values):
+            # Exponential jumps: skip straight to the next value whose key beats the
+            # smallest kept one, so a full reservoir costs little per value
+            threshold = heap[0][0]
+            index += int(math.log(1.0 - random_value()) / threshold / weight)
+            if index >= len(values):
+                break
+            low = math.exp(threshold * weight)
+            key = math.log(low + (1.0 - low) * random_value()) / weight
+            heapq.heapreplace(heap, (key, values[index]))
+            index += 1
+
+    def values(self):
+        """
+        Return the kept values, in no particular order.
+        """
+        return [value for _, value in self.heap]
@@ -0,0 +1,268 @@
+"""
+Disk-backed perfect-play tablebase for boards too large to keep solved in memory.
+
+Every position of an N x N board (up to 4x4) has a slot at its base-3 rank,
+sum(digit * 3**cell) with digit 0 empty, 1 X and 2 O, and each slot is a 4-bit
+code packed two per byte:
+
+    0       not stored (unreachable, or already over)
+    1       draw with best play
+    2 + d   the side to move wins (d odd) or loses (d even) in d more plies
+
+Distances above MAX_DTM saturate to the largest value of the same parity, so
+the outcome is always exact. A 4x4 board has 3**16 slots, about 21.5 MB on
+disk. Tablebase memory-maps the file, so a lookup reads one byte from the page
+cache and every process using the same file shares its pages.
+
+Example:
+    python tablebase.py --size 4 --win-length 4
+"""
+
+import argparse
+import mmap
+import struct
+import time
+from functools import lru_cache
+
+import engine
+
+MAGIC = b"TTTB"
+VERSION = 1
+HEADER = struct.Struct('<4sBBB9x')  # magic, version, size, win length, padding
+MAX_CELLS = 16  # Largest board a file may cover (3**16 slots)
+UNKNOWN, DRAW = 0, 1  # Codes without a distance
+MAX_DTM = 13  # Largest distance a code can hold
+
+WIN, LOSS = 'win', 'loss'  # Outcomes for the side to move, besides 'draw'
+
+
+def default_path(size=4, win_length=None):
+    """
+    Return the default file name of the tablebase for a board variant.
+    """
+    return f"tablebase_{size}x{size}_{win_length or size}.bin"
+
+
+@lru_cache(maxsize=None)
+def ternary(cells):
+    """
+    Return a list mapping each bitmask of the given cell count to sum(3**cell for set bits).
+    """
+    values = [0] * (1 << cells)
+    for mask in range(1, 1 << cells):
+        low = mask & -mask
+        values[mask] = values[mask ^ low] + 3 ** (low.bit_length() - 1)
+    return values
+
+
+def rank(x, o, cells):
+    """
+    Return the slot of the position (x, o).
+    """
+    values = ternary(cells)
+    return values[x] + 2 * values[o]
+
+
+def encode(dtm):
+    """
+    Return the code for a win or loss in dtm plies, saturating long distances.
+    """
+    if dtm > MAX_DTM:
+        dtm = MAX_DTM if dtm % 2 else MAX_DTM - 1
+    return 2 + dtm
+
+
+def decode(code):
+    """
+    Return (outcome, plies) for a code: outcome is 'win', 'loss', 'draw' or None if unknown.
+    """
+    if code == UNKNOWN:
+        return None, None
+    if code == DRAW:
+        return 'draw', None
+    dtm = code - 2
+    return (WIN if dtm % 2 else LOSS), dtm
+
+
+def preference(code):
+    """
+    Order codes of the opponent's replies for the player choosing between them:
+    higher is better (quick wins, then draws, then slow losses).
+    """
+    if code == DRAW:
+        return 0
+    dtm = code - 2
+    if dtm % 2:
+        return -100 + dtm  # The opponent wins: losing later is better
+    return 100 - dtm  # The opponent loses: winning sooner is better
+
+
+def generate(size=4, win_length=None):
+    """
+    Solve every position reachable from the empty board and return the packed
+    table as a bytearray. Values are filled in by a memoized depth-first search;
+    the table itself is the memo, so a position is never solved twice.
+    """
+    geometry = engine.geometry(size, win_length)
+    cells = geometry.cells
+    if cells > MAX_CELLS:
+        raise ValueError(f"tablebases support boards up to {MAX_CELLS} cells")
+    full = geometry.full
+    find_win_at = geometry.find_win_at
+    powers = [3 ** cell for cell in range(cells)]
+    table = bytearray((3 ** cells + 1) // 2)
+
+    def solve(mine, theirs, slot, digit):
+        # Return the code of the position from the view of the player to move,
+        # who owns mine and writes digit (1 for X, 2 for O) into the rank
+        empty = ~(mine | theirs) & full
+        if not empty:
+            return DRAW
+        best = None
+        while empty:
+            bit = empty & -empty
+            empty ^= bit
+            cell = bit.bit_length() - 1
+            if find_win_at(mine | bit, cell) is not None:
+                best = encode(0)  # Winning on the spot; the game ends in that position
+                continue
+            # Positions after missed wins are solved too, so any legal position can be probed
+            child = slot + digit * powers[cell]
+            shift = (child & 1) << 2
+            code = (table[child >> 1] >> shift) & 0xF
+            if code == UNKNOWN:
+                code = solve(theirs, mine | bit, child, 3 - digit)
+                table[child >> 1] |= code << shift
+            if best is None or preference(code) > preference(best):
+                best = code
+        if best == DRAW:
+            return DRAW
+        # One ply more than the best reply, with the outcome flipped
+        return encode(best - 2 + 1)
+
+    code = solve(0, 0, 0, 1)  # Solved before touching table[0], which the search also writes
+    table[0] |= code
+    return table
+
+
+def save(path, table, size=4, win_length=None):
+    """
+    Write a packed table under a header naming its board variant.
+    """
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, win_length or size))
+        f.write(table)
+
+
+class Tablebase():
+    """
+    Memory-mapped, read-only view of a tablebase file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, self.win_length = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a tablebase file")
+        self.cells = self.size * self.size
+        if len(self.map) < HEADER.size + (3 ** self.cells + 1) // 2:
+            raise ValueError(f"{path} is truncated")
+        self.values = ternary(self.cells)
+
+    def covers(self, board):
+        """
+        Return True if the file was generated for board's variant.
+        """
+        return board.size == self.size and board.win_length == self.win_length
+
+    def code(self, x, o):
+        """
+        Return the stored code of the position (x, o).
+        """
+        slot = self.values[x] + 2 * self.values[o]
+        return (self.map[HEADER.size + (slot >> 1)] >> ((slot & 1) << 2)) & 0xF
+
+    def lookup(self, board):
+        """
+        Return (outcome, plies) for the side to move on board: outcome is 'win',
+        'loss' or 'draw' (plies is None for draws), or (None, None) if not stored.
+        """
+        if board.winner:
+            return LOSS, 0  # The previous move won
+        if board.is_over():
+            return 'draw', None
+        return decode(self.code(board.x, board.o))
+
+    def best_moves(self, board):
+        """
+        Return every move that keeps the best outcome for the side to move.
+        """
+        moves = list(engine.iter_cells(board.legal_moves()))
+        mine = board.x if board.turn == 'x' else board.o
+        winning = [cell for cell in moves if board.geometry.find_win_at(mine | 1 << cell, cell) is not None]
+        if winning:
+            return winning
+        scores = {}
+        for cell in moves:
+            if board.turn == 'x':
+                code = self.code(board.x | 1 << cell, board.o)
+            else:
+                code = self.code(board.x, board.o | 1 << cell)
+            if code != UNKNOWN:
+                scores[cell] = preference(code)
+        if not scores:
+            return moves
+        best = max(scores.values())
+        return [cell for cell, score in scores.items() if score == best]
+
+    def best_move(self, board):
+        """
+        Return the lowest best move, or None if the game is over.
+        """
+        moves = self.best_moves(board)
+        return moves[0] if moves else None
+
+    def close(self):
+        """
+        Unmap and close the file.
+        """
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    """
+    Generate a tablebase from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Generate a perfect-play tablebase file")
+    parser.add_argument("--size", type=int, default=4, help="cells per side of the board (at most 4)")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--output", metavar="PATH", help="file to write (default: tablebase_NxN_K.bin)")
+    args = parser.parse_args(argv)
+    win_length = args.win_length or args.size
+    if args.size * args.size > MAX_CELLS or not 1 <= win_length <= args.size:
+        parser.error(f"boards up to {MAX_CELLS} cells with 1 <= win length <= size are supported")
+
+    path = args.output or default_path(args.size, win_length)
+    start = time.perf_counter()
+    table = generate(args.size, win_length)
+    save(path, table, args.size, win_length)
+    # Count the non-zero nibbles of every byte in C rather than one by one
+    nibbles = bytes((value & 0xF != 0) + (value >> 4 != 0) for value in range(256))
+    stored = sum(table.translate(nibbles))
+    outcome, plies = decode(table[0] & 0xF)
+    print(f"Solved {stored} positions in {time.perf_counter() - start:.1f}s and wrote {path} "
+          f"({len(table) + HEADER.size} bytes); the first player's result: {outcome}"
+          + (f" in {plies} plies" if plies is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import analyze
+import engine
+import tablebase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def reachable(board, seen):
+    # Collect the board string of every position reachable from board
+    text = analyze.board_string(board)
+    if text in seen:
+        return
+    seen.add(text)
+    if board.is_over():
+        return
+    for cell in engine.iter_cells(board.legal_moves()):
+        board.make(cell)
+        reachable(board, seen)
+        board.unmake()
+
+
+@pytest.fixture(scope='module')
+def positions():
+    seen = set()
+    reachable(engine.Board(), seen)
+    return sorted(seen)
+
+
+@pytest.fixture(scope='module')
+def lines(positions):
+    # Board strings, JSON records, repeats and errors, in an order the workers split up
+    lines = []
+    for i, text in enumerate(positions[:600]):
+        lines.append(text)
+        if i % 5 == 0:
+            lines.append(json.dumps({'id': i, 'board': text[:3] + '/' + text[3:6] + '/' + text[6:]}))
+        if i % 7 == 0:
+            lines.append(positions[i // 2])
+    lines[100:100] = ['', 'xxx......', 'xoxoxoxox?', '{"x": 3, "o": 8}', '{"x": 1, "o": 2, "size": 2}', '[1]']
+    return lines
+
+
+def run_stream(lines, **kwargs):
+    out = io.StringIO()
+    summary = analyze.analyze_stream((line + '\n' for line in lines), out, **kwargs)
+    return out.getvalue(), summary
+
+
+def test_every_reachable_3x3_position(positions):
+    assert len(positions) == 5478
+    output, summary = run_stream(positions, workers=1)
+    results = [json.loads(line) for line in output.splitlines()]
+    assert summary['errors'] == 0 and len(results) == len(positions)
+    assert results[0]['board'] == '.........' and results[0]['value'] == 'draw'
+    for result in results:
+        if result['over']:
+            continue
+        board = analyze.parse_board(result['board'])
+        # Every best move keeps the value: a win stays a win one ply sooner, and so on
+        for cell in result['best_moves']:
+            board.make(cell)
+            child = json.loads(analyze.describe(board))
+            board.unmake()
+            expected = {'win': 'loss', 'loss': 'win', 'draw': 'draw'}[result['value']]
+            assert child['value'] == expected
+            if result['value'] != 'draw':
+                assert child['plies'] == result['plies'] - 1
+
+
+def test_solver_and_tablebase_agree(positions, tmp_path, monkeypatch):
+    path = str(tmp_path / 'tablebase_3x3_3.bin')
+    tablebase.save(path, tablebase.generate(3), 3)
+    solved, _ = run_stream(positions, workers=1)
+    with tablebase.Tablebase(path) as table:
+        monkeypatch.setitem(analyze._engines, (3, 3), table)
+        analyze.analyze_board.cache_clear()
+        analyze.analyze_position.cache_clear()
+        try:
+            probed, _ = run_stream(positions, workers=1)
+        finally:
+            analyze.analyze_board.cache_clear()
+            analyze.analyze_position.cache_clear()
+    for a, b in zip(solved.splitlines(), probed.splitlines()):
+        a, b = json.loads(a), json.loads(b)
+        a['best_moves'].sort()
+        b['best_moves'].sort()
+        assert a == b
+
+
+def test_workers_and_chunks_do_not_change_the_output(lines):
+    single, summary = run_stream(lines, workers=1)
+    assert summary['errors'] == 4
+    for workers, chunk_lines in ((2, 7), (3, 1), (4, 1000)):
+        output, _ = run_stream(lines, workers=workers, chunk_lines=chunk_lines)
+        assert output == single
+
+
+def test_command_line_matches_in_process(lines, tmp_path):
+    source = tmp_path / 'positions.txt'
+    source.write_text('\n'.join(lines) + '\n')
+    target = tmp_path / 'analysis.jsonl'
+    subprocess.run([sys.executable, os.path.join(ROOT, 'analyze.py'), str(source), '--output', str(target),
+                    '--workers', '2', '--chunk-lines', '50', '--quiet'], cwd=str(tmp_path), check=True)
+    piped = subprocess.run([sys.executable, os.path.join(ROOT, 'analyze.py'), '--workers', '1', '--quiet'],
+                           input=source.read_text(), capture_output=True, text=True, cwd=str(tmp_path),
+                           check=True).stdout
+    expected, _ = run_stream(lines, workers=1)
+    assert target.read_text() == expected
+    assert piped == expected
+
+
+def test_errors_name_their_line():
+    output, summary = run_stream(['x........', 'oo.......', '{"id": "a", "board": "xxxoo...."}'], workers=1)
+    first, second, third = (json.loads(line) for line in output.splitlines())
+    assert first['turn'] == 'o' and first['best_moves'] == [4]
+    assert second == {'line': 2, 'error': second['error']}
+    assert third['id'] == 'a' and third['winner'] == 'x' and third['win_line'] == [0, 1, 2]
+    assert summary['errors'] == 1
+
+
+def test_malformed_records_do_not_stop_the_stream():
+    lines = ['x........', '{"board": 123}', '{"id": 1, "board": null}', '{"board": ["x"]}', 'o........',
+             '{"x": "a", "o": 0}', '{"x": null, "o": 0}', '{"board": "x........", "size": "3"}', '.........']
+    for workers in (1, 2):
+        output, summary = run_stream(lines, workers=workers, chunk_lines=2)
+        results = [json.loads(line) for line in output.splitlines()]
+        assert [result.get('line') for result in results] == [None, 2, 3, 4, 5, 6, 7, 8, None]
+        assert results[0]['best_moves'] == [4] and results[-1]['value'] == 'draw'
+        assert results[2]['id'] == 1 and 'string' in results[2]['error']
+        assert summary['errors'] == 7
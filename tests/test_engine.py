@@ -0,0 +1,52 @@
+"""
+Tests of the bitboard rules engine.
+"""
+
+import random
+
+import pytest
+
+import engine
+
+
+def test_make_rejects_cells_off_the_board_without_changing_it():
+    board = engine.Board()
+    for cell in (engine.CELLS, -1, 100):
+        with pytest.raises(ValueError):
+            board.make(cell)
+    assert (board.x, board.o, board.moves, board.turn) == (0, 0, [], 'x')
+
+
+def test_make_rejects_taken_cells():
+    board = engine.Board()
+    board.make(4)
+    with pytest.raises(ValueError):
+        board.make(4)
+    assert board.moves == [4]
+
+
+def test_no_move_after_a_win_and_unmake_keeps_it_consistent():
+    board = engine.Board()
+    for cell in (0, 3, 1, 4, 2):
+        board.make(cell)
+    assert board.winner == 'x' and board.win_cells() == (0, 1, 2)
+    with pytest.raises(ValueError):
+        board.make(5)
+    assert board.winner == 'x' and board.moves == [0, 3, 1, 4, 2]
+    assert board.unmake() == 2
+    assert board.winner is None and board.legal_moves()
+
+
+@pytest.mark.parametrize('size, win_length', [(3, 3), (4, 3), (5, 4), (7, 4)])
+def test_incremental_win_detection_matches_a_full_scan(size, win_length):
+    rng = random.Random(size * 10 + win_length)
+    for _ in range(300):
+        board = engine.Board(size=size, win_length=win_length)
+        while not board.is_over():
+            board.make(rng.choice(list(engine.iter_cells(board.legal_moves()))))
+            fresh = engine.Board(board.x, board.o, size, win_length)
+            assert board.winner == fresh.winner
+            assert board.turn == fresh.turn
+        while board.moves:
+            board.unmake()
+        assert (board.x, board.o, board.winner) == (0, 0, None)
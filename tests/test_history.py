@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+import engine
+from history import History
+
+
+def test_undo_redo_and_variations():
+    history = History(engine.Board())
+    history.play(4)
+    history.play(0)
+    assert history.undo() == 0
+    history.play(8)  # A second variation after 4
+    assert history.variation() == (2, 2)
+    assert history.switch(-1) == (8, 0)
+    assert history.line() == [4, 0]
+    assert history.undo() == 0 and history.redo() == 0  # Redo follows the variation last left
+    assert history.undo() == 0 and history.undo() == 4 and history.undo() is None
+    assert history.redo() == 4 and history.redo() == 0 and history.redo() is None
+    assert history.nodes == 4
+
+
+def test_a_move_after_undo_keeps_the_old_variation():
+    history = History(engine.Board())
+    for cell in (0, 1, 2):
+        history.play(cell)
+    history.undo()
+    history.undo()
+    history.play(5)
+    assert not history.can_redo()
+    history.undo()
+    assert history.redo() == 5
+    assert history.switch(1) == (5, 1)
+    assert history.redo() == 2  # The old continuation is still there
+    assert history.line() == [0, 1, 2]
+
+
+def test_taken_cells_leave_the_tree_alone():
+    history = History(engine.Board())
+    history.play(4)
+    with pytest.raises(ValueError):
+        history.play(4)
+    assert history.nodes == 2 and history.line() == [4]
+
+
+def test_starts_from_a_position_with_moves():
+    board = engine.Board()
+    board.make(4)
+    history = History(board)
+    assert history.undo() is None and board.moves == [4]
+    history.play(0)
+    assert history.depth() == 1 and history.line() == [0]
+
+
+@pytest.mark.parametrize('size, win_length', [(3, 3), (4, 3), (5, 4)])
+def test_random_walk_matches_replaying_the_line(size, win_length):
+    rng = random.Random(size * 10 + win_length)
+    board = engine.Board(size=size, win_length=win_length)
+    history = History(board)
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.45 and board.legal_moves():
+            history.play(rng.choice(list(engine.iter_cells(board.legal_moves()))))
+        elif action < 0.7:
+            history.undo()
+        elif action < 0.9:
+            history.redo()
+        else:
+            history.switch(rng.choice((-1, 1)))
+
+        # The board reached by stepping through the tree is the one the line replays to
+        replayed = engine.Board(size=size, win_length=win_length)
+        for cell in history.line():
+            replayed.make(cell)
+        assert (board.x, board.o, board.turn) == (replayed.x, replayed.o, replayed.turn)
+        assert (board.winner, board.win_line) == (replayed.winner, replayed.win_line)
+
+        # And the tree holds the line: walking it from the root by the moves ends at the current node
+        node = history.root
+        for cell in history.line():
+            node = node.children[cell]
+        assert node is history.node
+        assert history.can_redo() == (node.last is not None)
@@ -0,0 +1,35 @@
+import sqlite3
+import threading
+
+import leaderboard
+
+
+def test_results_are_written(tmp_path):
+    with leaderboard.Leaderboard(str(tmp_path / 'board.db')) as board:
+        board.record('alice', 'bob', 'x')
+        board.record('alice', 'bob', None)
+        board.record('Bob', 'carol', 'x', tiebreaker=True)
+        board.flush()
+        assert board.player('ALICE') == ('alice', 1, 0, 1, 0, 0, 1)
+        assert board.player('bob') == ('bob', 1, 1, 1, 1, 1, 1)
+        assert [player.name for player in board.top(2)] == ['alice', 'bob']
+        assert board.complete('b', 2) == ['bob']
+        assert board.error is None
+
+
+def test_flush_and_close_return_after_a_database_error(tmp_path):
+    board = leaderboard.Leaderboard(str(tmp_path / 'board.db'))
+    board.record('alice', 'bob', 'x')
+    board.flush()
+    board.reader.execute("DROP TABLE players")  # Every later write fails
+    board.reader.commit()
+    board.record('alice', 'bob', 'x')
+    board.record('carol', 'dave', None)
+
+    done = threading.Event()
+    threading.Thread(target=lambda: (board.flush(), done.set()), daemon=True).start()
+    assert done.wait(5), "flush() hung after the writer failed"
+    assert isinstance(board.error, sqlite3.Error)
+    assert board.writer.is_alive()
+    board.close()
+    assert not board.writer.is_alive()
@@ -0,0 +1,79 @@
+"""
+Tests of the multiplayer server's matchmaking, without sockets.
+"""
+
+import engine
+import netplay
+
+
+class FakeTransport():
+    def get_write_buffer_size(self):
+        return 0
+
+
+class FakeWriter():
+    """
+    Collects the lines the server sends to one client.
+    """
+
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.lines = []
+
+    def is_closing(self):
+        return False
+
+    def write(self, data):
+        self.lines.extend(data.decode().splitlines())
+
+
+def connect():
+    return netplay.Player(FakeWriter())
+
+
+def test_join_rejects_oversized_boards_before_building_a_geometry():
+    server = netplay.GameServer()
+    player = connect()
+    cached = engine.geometry.cache_info().currsize
+    for args in ("600 1 bob", f"{netplay.MAX_SIZE + 1} 3 bob", "0 0 bob", "-3 3 bob"):
+        server.join(player, args)
+    assert engine.geometry.cache_info().currsize == cached
+    assert all(line.startswith("ERROR") for line in player.writer.lines)
+    assert not server.waiting
+
+
+def test_join_rejects_bad_win_lengths():
+    server = netplay.GameServer()
+    player = connect()
+    server.join(player, "3 4 bob")
+    server.join(player, "3 0 bob")
+    assert [line.split()[0] for line in player.writer.lines] == ["ERROR", "ERROR"]
+    assert not server.waiting
+
+
+def test_joining_another_variant_leaves_the_first_queue():
+    server = netplay.GameServer()
+    alice, bob, carol = connect(), connect(), connect()
+    server.join(alice, "3 3 alice")
+    server.join(alice, "4 4 alice")
+    assert list(server.waiting.values()) == [alice]
+
+    server.join(bob, "3 3 bob")  # Must not be paired with alice, who left this queue
+    assert bob.writer.lines == ["WAIT"] and bob.match is None
+    server.join(carol, "4 4 carol")
+    assert alice.match is carol.match is not None
+    assert alice.writer.lines[-1] == "START x 4 4 carol"
+    assert list(server.waiting.values()) == [bob]
+
+
+def test_moves_are_validated_and_echoed():
+    server = netplay.GameServer()
+    x, o = connect(), connect()
+    server.join(x, "3 3 x")
+    server.join(o, "3 3 o")
+    server.move(o, "4")
+    assert o.writer.lines[-1] == "ERROR not your turn"
+    server.move(x, "9")
+    assert x.writer.lines[-1] == "ERROR illegal move"
+    server.move(x, "4")
+    assert x.writer.lines[-1] == o.writer.lines[-1] == "MOVED x 4"
@@ -0,0 +1,74 @@
+"""
+Tests of the self-play Q-learning trainer.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import engine
+import qlearn
+import records
+import vecenv
+
+
+class RecordingEnv(vecenv.VecEnv):
+    """
+    A VecEnv that remembers the first result of every game.
+    """
+
+    instances = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.first = np.full(self.count, records.UNFINISHED, dtype=np.int8)
+        RecordingEnv.instances.append(self)
+
+    def step(self, actions):
+        reward, done, status = super().step(actions)
+        unset = done & (self.first == records.UNFINISHED)
+        self.first[unset] = status[unset]
+        return reward, done, status
+
+
+def test_play_random_counts_only_the_first_result_of_each_game(monkeypatch):
+    RecordingEnv.instances = []
+    monkeypatch.setattr(qlearn, 'VecEnv', RecordingEnv)
+    model = qlearn.make_model(4, 3, 'linear')  # Games of uneven length that restart while others play on
+    results = qlearn.play_random(model, 2000, seed=3)
+    for (side, winner, loser), env in zip((('x', records.X_WINS, records.O_WINS),
+                                           ('o', records.O_WINS, records.X_WINS)), RecordingEnv.instances):
+        wins, draws, losses = results[side]
+        assert wins == (env.first == winner).sum()
+        assert losses == (env.first == loser).sum()
+        assert wins + draws + losses == 2000
+
+
+def test_observe_matches_the_environment():
+    env = vecenv.VecEnv(1, seed=2)
+    board = engine.Board()
+    env.reset()
+    for cell in (4, 0, 8):
+        env.step([cell])
+        board.make(cell)
+        assert (qlearn.observe(board) == env.observe()).all()
+
+
+def test_checkpoints_round_trip(tmp_path):
+    model = qlearn.make_model()
+    env = vecenv.VecEnv(256, seed=1)
+    progress = qlearn.train(model, env, 20, checkpoint_every=10)
+    path = str(tmp_path / "model.npz")
+    qlearn.save_checkpoint(path, model, progress)
+    loaded, loaded_progress = qlearn.load_checkpoint(path)
+    assert loaded.kind == model.kind
+    assert (loaded.values_table == model.values_table).all()
+    assert loaded_progress['steps'] == progress['steps'] == 20 * 256
+    assert loaded_progress['games'] == progress['games']
+
+
+def test_table_model_learns_to_avoid_losing_to_random_moves():
+    model = qlearn.make_model()
+    qlearn.train(model, vecenv.VecEnv(2048, seed=1), 1500, checkpoint_every=1500)
+    results = qlearn.play_random(model, 2000, seed=1)
+    assert results['x'][2] == 0 and results['o'][2] == 0
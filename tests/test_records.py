@@ -0,0 +1,42 @@
+import pytest
+
+import records
+
+
+def test_names_with_line_breaks_keep_their_ids(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    names = ['alice', 'bob\r', 'carol\r\ndave', 'eve\nfrank', 'mallory']
+    writer = records.GameWriter(path)
+    for x_name, o_name in zip(names, names[1:]):
+        writer.write([0, 3, 1, 4, 2], records.X_WINS, x_name, o_name)
+    writer.close()
+    writer = records.GameWriter(path)  # Reopening reads the names back
+    writer.write([0, 1, 2], records.UNFINISHED, 'bob\r', 'alice')
+    writer.close()
+
+    games = list(records.GameReader(path))
+    assert [game.x_name for game in games] == ['alice', 'bob ', 'carol  dave', 'eve frank', 'bob ']
+    assert [game.o_name for game in games] == ['bob ', 'carol  dave', 'eve frank', 'mallory', 'alice']
+    assert records.read_names(path) == ['alice', 'bob ', 'carol  dave', 'eve frank', 'mallory']
+
+
+def test_new_file_replaces_stale_names(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    with open(path + '.names', 'w', encoding='utf-8') as f:
+        f.write('stale\nnames\n')
+    open(path, 'wb').close()  # An empty record file starts over too
+    writer = records.GameWriter(path)
+    writer.write([4, 0], records.UNFINISHED, 'alice', 'bob')
+    writer.close()
+    assert records.read_names(path) == ['alice', 'bob']
+    game, = records.GameReader(path)
+    assert (game.x_name, game.o_name) == ('alice', 'bob')
+
+
+def test_variant_mismatch_names_the_win_length(tmp_path):
+    path = str(tmp_path / 'games.rec')
+    writer = records.GameWriter(path, 4, 3)
+    writer.write([0], records.UNFINISHED, 'alice', 'bob')
+    writer.close()
+    with pytest.raises(ValueError, match='4x4 games with 3 in a row, not 4x4 with 4 in a row'):
+        records.GameWriter(path, 4)
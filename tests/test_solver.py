@@ -0,0 +1,24 @@
+import os
+
+import engine
+import solver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_default_table_lives_next_to_the_module(tmp_path, monkeypatch):
+    assert solver.DEFAULT_TABLE == os.path.join(ROOT, 'solver_table.bin')
+    monkeypatch.chdir(tmp_path)
+    solver.Solver.load_or_solve()
+    assert os.listdir(tmp_path) == []
+
+
+def test_saved_table_loads_back(tmp_path):
+    path = str(tmp_path / 'table.bin')
+    solved = solver.Solver().solve()
+    solved.save(path)
+    loaded = solver.Solver.load(path)
+    assert loaded.score(0, 0) == solved.score(0, 0) == 0
+    board = engine.Board()
+    board.make(0)
+    assert loaded.best_moves(board) == solved.best_moves(board) == [4]
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+pg = pytest.importorskip("pygame")
+
+import sprites
+
+
+@pytest.fixture
+def images(tmp_path, monkeypatch):
+    pg.display.init()
+    pg.display.set_mode((400, 450))
+    for side, color in (('x', (200, 0, 0)), ('o', (0, 0, 200))):
+        image = pg.Surface((40, 40), pg.SRCALPHA)
+        image.fill(color)
+        pg.image.save(image, str(tmp_path / f"{side}.png"))
+    monkeypatch.setattr(sprites, 'ASSET_DIR', str(tmp_path))
+    yield
+    pg.display.quit()
+
+
+@pytest.mark.parametrize('cells, center', [((0, 1, 2), None), ((2, 4, 6), None), ((4,), (200, 200))])
+def test_win_line_covers_the_winning_cells(images, cells, center):
+    cache = sprites.SpriteCache()
+    cache.load()
+    atlas = cache.atlas(400, 400, 3, len(cells))
+    surface, (x, y) = atlas.win_line(cells)
+    rect = surface.get_rect(topleft=(round(x), round(y)))
+    for cell in cells:
+        row, col = divmod(cell, 3)
+        assert rect.collidepoint((col + 0.5) * atlas.cell_width, (row + 0.5) * atlas.cell_height)
+    if center:
+        # A single winning cell gets a dot on its centre
+        assert surface.get_at((center[0] - rect.x, center[1] - rect.y)) == sprites.WIN_COLOR
+
+
+def test_first_move_wins_with_one_in_a_row(images):
+    import tic_tac_toe
+
+    game = tic_tac_toe.TicTacToe(size=3, win_length=1)
+    game.start()
+    game.start_game()
+    game.user_click((200, 200))  # The centre cell: x has one in a row
+    assert game.board.winner == 'x'
+    assert game.win_rect.collidepoint(200, 200)
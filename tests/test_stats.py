@@ -0,0 +1,36 @@
+import random
+
+from stats import Reservoir, percentile
+
+
+def test_percentile():
+    values = list(range(100))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99 and percentile(values, 1.0) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_reservoir_keeps_everything_until_full():
+    reservoir = Reservoir(10, random.Random(1))
+    reservoir.add([3, 1, 2])
+    reservoir.add([], 0)
+    assert sorted(reservoir.values()) == [1, 2, 3] and reservoir.seen == 3
+
+
+def test_reservoir_stays_bounded():
+    reservoir = Reservoir(500, random.Random(2))
+    for batch in range(200):
+        reservoir.add([batch] * 1000)
+    assert len(reservoir.values()) == 500 and reservoir.seen == 200000
+    # Every batch was equally large, so the kept values are spread evenly over them
+    assert 80 <= percentile(sorted(reservoir.values()), 0.5) <= 120
+
+
+def test_reservoir_weights_batches_by_the_values_they_stand_for():
+    reservoir = Reservoir(200, random.Random(3))
+    for _ in range(20):
+        reservoir.add([0.0] * 50, 50)  # Every value seen
+        reservoir.add([1.0] * 50, 450)  # A sample of nine times as many values
+    kept = reservoir.values()
+    assert len(kept) == 200 and reservoir.seen == 10000
+    assert 0.86 <= sum(kept) / len(kept) <= 0.94
@@ -0,0 +1,73 @@
+"""
+Tests of the vectorized environment against the rules engine.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import engine
+import records
+import vecenv
+
+
+def expected_observation(board):
+    sign = {board.turn: 1, engine.other(board.turn): -1, None: 0}
+    return [sign[board.cell(cell)] for cell in range(board.geometry.cells)]
+
+
+@pytest.mark.parametrize('size, win_length', [(3, 3), (4, 3), (5, 4), (7, 4)])
+def test_random_games_match_engine_boards(size, win_length):
+    count = 64
+    env = vecenv.VecEnv(count, size, win_length, seed=size)
+    env.reset()
+    boards = [engine.Board(size=size, win_length=win_length) for _ in range(count)]
+    finished = 0
+    for _ in range(150):
+        obs = env.observe()
+        for row, board in zip(obs, boards):
+            assert row.tolist() == expected_observation(board)
+        actions = env.sample()
+        reward, done, status = env.step(actions)
+        for i, board in enumerate(boards):
+            mover = board.turn
+            board.make(int(actions[i]))
+            over = board.is_over()
+            assert done[i] == over
+            assert status[i] == (records.RESULT_CODES[board.winner] if over else records.UNFINISHED)
+            assert reward[i] == (board.winner == mover)
+            if over:
+                finished += 1
+                boards[i] = engine.Board(size=size, win_length=win_length)
+    assert finished == env.games > 0
+
+
+class ZeroKeys():
+    """
+    A random generator whose keys all come out exactly 0.
+    """
+
+    def random(self, shape, dtype):
+        return np.zeros(shape, dtype=dtype)
+
+
+def test_sample_picks_an_empty_cell_when_its_key_is_zero():
+    env = vecenv.VecEnv(2, seed=1)
+    env.reset()
+    for cell in (0, 4, 8, 2, 6, 3, 5, 7):
+        env.step([cell, cell])  # Nobody wins, and only cell 1 is left
+    env.rng = ZeroKeys()
+    assert env.sample().tolist() == [1, 1]
+
+
+def test_step_rejects_taken_cells_without_changing_anything():
+    env = vecenv.VecEnv(3, seed=1)
+    env.reset()
+    env.step([4, 4, 4])
+    before = env.boards.copy(), env.turn.copy(), env.line_sums.copy()
+    with pytest.raises(ValueError):
+        env.step([0, 4, 1])
+    with pytest.raises(ValueError):
+        env.step([0, 9, 1])
+    after = env.boards, env.turn, env.line_sums
+    assert all((a == b).all() for a, b in zip(before, after))
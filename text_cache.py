@@ -0,0 +1,108 @@
+"""
+Shared fonts and a bounded cache of rendered text surfaces.
+
+Creating a pygame Font and rasterizing glyphs are the most expensive parts of
+drawing the menus and status bar, and the same strings are drawn over and over.
+FontRegistry builds each font once, and TextCache keeps recently rendered
+surfaces keyed by (text, size, color, antialias, font) in LRU order.
+"""
+
+from collections import OrderedDict
+
+import pygame as pg
+
+
+class FontRegistry():
+    """
+    Creates each (name, size, bold) font once and hands out the shared instance.
+    """
+
+    def __init__(self):
+        self.fonts = {}  # (name, size, bold) -> pg.font.Font
+
+    def get(self, size, name=None, bold=False):
+        """
+        Return the font for the given size. name=None is pygame's default font,
+        any other name is looked up as a system font.
+        """
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            if name is None:
+                font = pg.font.Font(None, size)
+                font.set_bold(bold)
+            else:
+                font = pg.font.SysFont(name, size, bold=bold)
+            self.fonts[key] = font
+        return font
+
+
+class TextCache():
+    """
+    LRU cache of rendered text surfaces with an entry and memory budget.
+    """
+
+    def __init__(self, fonts=None, max_entries=256, max_bytes=8 * 1024 * 1024):
+        """
+        Create a cache that evicts the least recently used surfaces once it holds
+        more than max_entries surfaces or more than max_bytes of pixel data.
+        """
+        self.fonts = fonts or FontRegistry()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.surfaces = OrderedDict()  # key -> rendered surface, oldest first
+        self.bytes = 0  # Pixel memory held by cached surfaces
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, text, size, color, antialias=True, name=None, bold=False):
+        """
+        Return a surface with the rendered text, reusing a cached one when possible.
+        The returned surface is shared and must not be drawn on.
+        """
+        color = tuple(pg.Color(color))
+        key = (text, size, color, bool(antialias), name, bold)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.fonts.get(size, name, bold).render(text, antialias, color)
+        self.surfaces[key] = surface
+        self.bytes += self._size_of(surface)
+        while self.surfaces and (len(self.surfaces) > self.max_entries or self.bytes > self.max_bytes):
+            _, evicted = self.surfaces.popitem(last=False)
+            self.bytes -= self._size_of(evicted)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        """
+        Drop every cached surface (fonts are kept).
+        """
+        self.surfaces.clear()
+        self.bytes = 0
+
+    def stats(self):
+        """
+        Return the hit/miss counters and current memory use as a dict.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.surfaces),
+            'bytes': self.bytes,
+        }
+
+    @staticmethod
+    def _size_of(surface):
+        """
+        Return the pixel memory used by a surface in bytes.
+        """
+        return surface.get_pitch() * surface.get_height()
@@ -0,0 +1,104 @@
+"""
+Background move search for the game window.
+
+The computer's move is worked out on a daemon thread while the event loop keeps
+drawing and handling input; the loop polls for the answer once per frame. An
+MCTS search runs as a series of short slices that all grow the same tree
+(iterative deepening), and the best move is published after every slice, so
+there is always an answer when the budget runs out or the player asks the
+computer to hurry. Table lookups (the solver and tablebases) answer in one step.
+A search can be cancelled at any time; the thread stops within one slice.
+"""
+
+import threading
+import time
+
+import mcts
+
+SLICE = 0.02  # Seconds per search slice, which bounds how long cancelling can take
+
+
+class Thinker():
+    """
+    Runs one move search at a time for an AI player off the main thread.
+    """
+
+    def __init__(self, player, budget=mcts.DEFAULT_BUDGET, step=SLICE):
+        """
+        player is an mcts.MCTS, searched for budget seconds per move in slices of
+        step seconds, or anything with best_move(board), such as a solver.Solver
+        or a tablebase.Tablebase.
+        """
+        self.player = player
+        self.budget = budget
+        self.step = step
+        self.anytime = isinstance(player, mcts.MCTS)  # Searches that improve with time
+        self.thread = None  # Thread of the current search, until its move is collected
+        self.cancelled = threading.Event()  # Abandon the search, nobody wants the move
+        self.hurried = threading.Event()  # Play the best move found so far now
+        self.finished = False  # Set by the thread once best is final
+        self.best = None  # Best move found so far
+        self.iterations = 0  # Slices completed for the current move
+        self.started = 0.0  # time.perf_counter() when the current search began
+
+    def start(self, board):
+        """
+        Start searching a copy of board's position, abandoning any search in progress.
+        """
+        self.cancel()
+        self.cancelled.clear()
+        self.hurried.clear()
+        self.iterations = 0
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, args=(board.copy(), self.started + self.budget),
+                                       name="ai-thinker", daemon=True)
+        self.thread.start()
+
+    def _run(self, board, deadline):
+        # Search until the deadline, publishing the best move after every slice
+        if not self.anytime:
+            self.best = self.player.best_move(board)
+            self.iterations = 1
+        else:
+            clock = time.perf_counter
+            while True:
+                remaining = deadline - clock()
+                self.best = mcts.most_visited(self.player.search(board, max(0.0, min(self.step, remaining))))
+                self.iterations += 1
+                if remaining <= self.step or self.cancelled.is_set() or self.hurried.is_set():
+                    break
+        self.finished = True
+
+    def thinking(self):
+        """
+        Return True from start() until the move is collected by poll() or the search is cancelled.
+        """
+        return self.thread is not None
+
+    def poll(self):
+        """
+        Return True once the search has finished; its move is then in best.
+        Never blocks, so it can be called every frame.
+        """
+        if self.thread is None or not self.finished:
+            return False
+        self.thread.join()
+        self.thread = None
+        return True
+
+    def hurry(self):
+        """
+        Ask the search to stop after the current slice and keep its best move so far.
+        """
+        self.hurried.set()
+
+    def cancel(self):
+        """
+        Abandon the search in progress, if any, and wait for its thread to stop.
+        """
+        if self.thread is not None:
+            self.cancelled.set()
+            self.thread.join()
+            self.thread = None
+        self.finished = False
+        self.best = None
@@ -1,17 +1,101 @@
-import pygame as pg
 import time
+_import_start = time.perf_counter()  # Start of the cold-start measurement
+
+import argparse
+import math
+import os
 import sys
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # Keep imports quiet
+import pygame as pg
 from pygame.locals import *
 
+import engine
+import history
+import mcts
+import profiler
+import records
+import renderer
+import scheduler
+import solver
+import sprites
+import text_cache
+import thinker
+
+# Game flow states, each with its own event handler on TicTacToe
+START = 'start'  # Title screen
+NAMES = 'names'  # Player name entry
+PLAYING = 'playing'  # A round is in progress
+ROUND_OVER = 'round_over'  # Showing the finished board before the next round
+TIEBREAKER = 'tiebreaker'  # Asking whether to play a tiebreaker
+FINAL = 'final'  # Showing the closing message before quitting
+LEADERBOARD = 'leaderboard'  # Showing the top players
+ANALYSIS = 'analysis'  # Stepping through the finished round's moves and variations
+
+NET_EVENT = pg.USEREVENT + 1  # Carries a line received from the multiplayer server
+
+# Back and forward a turn, previous and next variation of the last turn
+NAVIGATION_KEYS = (K_LEFT, K_RIGHT, K_UP, K_DOWN)
+
+STARTUP_BUDGET = 0.5  # Seconds allowed from import to the first presented frame
+
+
+class StartupTimer():
+    """
+    Records how long each startup phase takes, measured from module import.
+    """
+
+    def __init__(self, start=None):
+        self.start = _import_start if start is None else start
+        self.last = self.start
+        self.phases = []  # (name, seconds) in the order they finished
+
+    def mark(self, name):
+        """
+        Record the time since the previous mark as the named phase.
+        """
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def total(self):
+        """
+        Return the seconds from the start to the last mark.
+        """
+        return self.last - self.start
+
+    def report(self, budget=STARTUP_BUDGET):
+        """
+        Return a printable per-phase timing report, flagging a blown budget.
+        """
+        lines = [f"{name:<12} {seconds*1000:8.1f} ms" for name, seconds in self.phases]
+        verdict = "within" if self.total() <= budget else "OVER"
+        lines.append(f"{'total':<12} {self.total()*1000:8.1f} ms ({verdict} {budget*1000:.0f} ms budget)")
+        return "\n".join(lines)
+
 
 class TicTacToe():
     """
     Main Tic-Tac-Toe game class that handles all game logic, display, and user interaction.
     """
     
-    def __init__(self):
+    def __init__(self, ai_player=None, size=3, win_length=None, server=None, record_path=None,
+                 profile_path=None, show_profile=False, ai_budget=mcts.DEFAULT_BUDGET, ai_workers=1,
+                 leaderboard_path=None, input_path=None):
         """
-        Initialize the game with default values, load resources, and set up the display.
+        Initialize the game with default values. No window is opened and no assets
+        are loaded until start() is called, so the class is cheap to construct.
+        If ai_player is 'x' or 'o', the computer plays that side: perfectly from the
+        solved table on the classic board or from a generated tablebase file when one
+        exists for the variant, otherwise by Monte Carlo Tree Search with ai_budget
+        seconds per move across ai_workers processes.
+        size and win_length configure an N x N board with k in a row (default 3x3, 3).
+        server is an optional (host, port) of a multiplayer server to play on.
+        Every finished round is archived to record_path if it is given.
+        Frame timings are exported to profile_path (.csv or .json) if it is given, and
+        show_profile starts with the profiler overlay visible (toggle with F3).
+        Player statistics are kept in the leaderboard database at leaderboard_path if given.
+        The session's input is recorded to input_path for replay.py if it is given.
         """
         # Game state variables
         self.xo = 'x'  # Current player ('x' or 'o')
@@ -24,24 +108,28 @@ class TicTacToe():
         self.height = 400  # Height of game board
         self.fps = 30  # Frames per second for game loop
         
-        # Game board (3x3 grid)
-        self.board = [[None]*3, [None]*3, [None]*3]
+        # Game board (N x N grid) backed by the headless bitboard engine
+        self.size = size  # Cells per side
+        self.win_length = win_length or size  # Pieces in a row needed to win
+        self.board = engine.Board(size=self.size, win_length=self.win_length)
+        self.history = history.History(self.board)  # The round's moves and variations, for undo and redo
+        self.round_result = None  # Real (winner, draw) of a round while it is analysed
+        self.cell_size = self.width / self.size  # Width and height of one cell
         
-        # Load and scale player images
-        self.x_image = pg.image.load("x.png")
-        self.o_image = pg.image.load("o.png")
-        
-        # Initialize pygame
-        pg.init()
-        self.clock = pg.time.Clock()
-        self.screen = pg.display.set_mode((self.width, self.height + 100), 0, 32)
+        # Display resources, created by start()
+        self.screen = None  # Window surface
+        self.renderer = None  # Presents only the regions that changed
+        self.clock = None
+        self.sprites = sprites.SpriteCache()  # Converted images and pre-rendered board sprites
+        self.atlas = None  # sprites.SpriteAtlas of the current board layout
+        self.win_rect = None  # Screen area of the winning line on the board, if one is drawn
         
         # Game statistics
         self.scores = {'x': 0, 'o': 0}  # Track scores for both players
         self.last_winner = None  # Track who won the last game
         
-        # Font settings
-        self.font_bold = pg.font.SysFont('Arial', 72, bold=True)
+        # Font settings: shared fonts plus an LRU cache of rendered strings
+        self.text = text_cache.TextCache()
         
         # Tiebreaker mode
         self.tiebreaker_round = False  # Flag for tiebreaker mode
@@ -52,6 +140,135 @@ class TicTacToe():
         self.current_input = ""  # Current text input for player names
         self.current_player_input = 'x'  # Track which player we're entering name for
 
+        # Event loop state machine
+        self.state = START  # Current phase of the game flow
+        self.frame_time = time.monotonic()  # Clock reading latched once per frame
+        # Timed transitions instead of sleeps, timed by the latched clock so a replay
+        # fed the recorded frame times fires them on the same frames
+        self.scheduler = scheduler.Scheduler(clock=lambda: self.frame_time)
+        self.running = True  # Cleared to leave the event loop
+        self.buttons = {}  # Clickable rectangles of the current screen by name
+        self.input_active = False  # Whether typing edits a player name
+
+        # Computer opponent, created by start(): the solved table on 3x3, a tablebase
+        # file if one was generated for the variant, MCTS elsewhere
+        self.ai_player = ai_player  # Side played by the computer, or None
+        self.solver = None
+        self.tablebase = None  # tablebase.Tablebase for the current variant
+        self.searcher = None  # mcts.MCTS for boards too large to solve
+        self.ai_budget = ai_budget
+        self.ai_workers = ai_workers
+        self.thinker = None  # thinker.Thinker searching the computer's moves off the main thread (or set by a replay)
+        self.thinking_dots = 0  # Dots after "thinking" in the status bar, animated while searching
+        if ai_player:
+            self.player_names[ai_player] = "Computer"
+
+        # Online play: the server referees, this window shows one side of the match
+        self.server = server  # (host, port) of the multiplayer server, or None
+        self.client = None  # netplay.NetClient once connected
+        self.net_side = None  # Side we play in the current match, None while queued
+        self.local_name = None  # Our name as sent to the server
+
+        # Game archive, opened by start()
+        self.record_path = record_path
+        self.recorder = None  # records.GameWriter when archiving games
+
+        # Input log for replays, opened by start()
+        self.input_path = input_path
+        self.input_recorder = None  # replay.InputRecorder when recording the session
+
+        # Long-lived player statistics, opened by start()
+        self.leaderboard_path = leaderboard_path
+        self.leaderboard = None  # leaderboard.Leaderboard when keeping statistics
+        self.suggestion = ""  # Known player name completing the name being typed
+
+        # Frame-time instrumentation
+        self.profiler = profiler.FrameProfiler(export_path=profile_path)
+        self.show_profile = show_profile
+        self.overlay = None  # profiler.FrameOverlay, created by start()
+        self.blits = 0  # Blits to the screen since startup
+
+    def start(self, timer=None):
+        """
+        Initialize only the pygame subsystems the game uses (display and font), open
+        the window, load assets and present the start screen. Phases are recorded
+        on timer if one is given.
+        """
+        timer = timer or StartupTimer()
+        timer.mark('import')
+
+        pg.display.init()
+        pg.font.init()
+        timer.mark('pygame init')
+
+        pg.display.set_caption("Tic Tac Toe")
+        self.screen = pg.display.set_mode((self.width, self.height + 100), 0, 32)
+        self.renderer = renderer.Renderer(self.screen)
+        self.clock = pg.time.Clock()
+        # The overlay gets its own small text cache so its numbers do not skew the game's
+        self.overlay = profiler.FrameOverlay(self.profiler, text_cache.TextCache(max_entries=64))
+        self.overlay.visible = self.show_profile
+        timer.mark('window')
+
+        self.load_images()
+        timer.mark('assets')
+
+        if not self.ai_player or self.thinker:
+            pass  # No computer, or a replay supplies its moves
+        elif self.size == engine.SIZE and self.win_length == engine.SIZE:
+            self.solver = solver.Solver.load_or_solve()
+            self.thinker = thinker.Thinker(self.solver)
+            timer.mark('ai table')
+        else:
+            import tablebase  # Optional modules load only when used, keeping startup fast
+            path = tablebase.default_path(self.size, self.win_length)
+            if os.path.exists(path):
+                self.tablebase = tablebase.Tablebase(path)
+                self.thinker = thinker.Thinker(self.tablebase)
+                timer.mark('ai tablebase')
+            else:
+                # Always in worker processes, so the search never holds the GIL the window needs
+                self.searcher = mcts.MCTS(self.ai_budget, self.ai_workers, processes=True)
+                self.thinker = thinker.Thinker(self.searcher, self.ai_budget)
+                timer.mark('ai workers')
+
+        if self.server:
+            import netplay  # Brings in asyncio
+            self.client = netplay.NetClient(*self.server, on_line=self.post_net_line)
+            timer.mark('network')
+
+        if self.record_path:
+            self.recorder = records.GameWriter(self.record_path, self.size, self.win_length)
+
+        if self.input_path:
+            import replay
+            self.input_recorder = replay.InputRecorder(self.input_path, self.size, self.win_length,
+                                                       self.ai_player)
+
+        if self.leaderboard_path:
+            import leaderboard  # Brings in sqlite3
+            self.leaderboard = leaderboard.Leaderboard(self.leaderboard_path)
+            timer.mark('leaderboard')
+
+        self.start_screen()  # Show start screen first
+        self.renderer.flush()
+        timer.mark('first frame')
+        return timer
+
+    def load_images(self):
+        """
+        Load the player images and convert them to the display format.
+        """
+        self.sprites.load()
+
+    def blit(self, surface, dest, area=None):
+        """
+        Draw a surface (or the area of it) onto the screen, counting blits for the profiler.
+        """
+        self.blits += 1
+        return self.screen.blit(surface, dest, area)
+
+    @profiler.profiled('render')
     def draw_name_input_screen(self):
         """
         Draw the player name input screen with text boxes for both players.
@@ -61,14 +278,12 @@ class TicTacToe():
         self.screen.fill((48, 25, 72))
         
         # Draw title
-        title_font = pg.font.Font(None, 50)
-        title = title_font.render("Enter Player Names", True, pg.Color('white'))
-        self.screen.blit(title, (self.width/2 - title.get_width()/2, 50))
+        title = self.text.render("Enter Player Names", 50, 'white')
+        self.blit(title, (self.width/2 - title.get_width()/2, 50))
         
         # Player X input section
-        x_font = pg.font.Font(None, 36)
-        x_label = x_font.render("Player X:", True, pg.Color('white'))
-        self.screen.blit(x_label, (self.width/4 - 100, 150))
+        x_label = self.text.render("Player X:", 36, 'white')
+        self.blit(x_label, (self.width/4 - 100, 150))
         
         # Draw input box for Player X
         x_box = pg.Rect(self.width/4 + 20, 145, 200, 40)
@@ -79,13 +294,15 @@ class TicTacToe():
             pg.draw.rect(self.screen, pg.Color('yellow'), x_box, 2)
         
         # Show current name or placeholder
-        x_name = x_font.render(self.player_names['x'] if self.player_names['x'] else "Player 1", 
-                            True, pg.Color('white'))
-        self.screen.blit(x_name, (x_box.x + 10, x_box.y + 10))
+        x_name = self.text.render(self.player_names['x'] if self.player_names['x'] else "Player 1", 
+                            36, 'white')
+        self.blit(x_name, (x_box.x + 10, x_box.y + 10))
+        if self.current_player_input == 'x':
+            self.draw_suggestion(x_box, x_name)
         
         # Player O input section
-        o_label = x_font.render("Player O:", True, pg.Color('white'))
-        self.screen.blit(o_label, (self.width/4 - 100, 220))
+        o_label = self.text.render("Player O:", 36, 'white')
+        self.blit(o_label, (self.width/4 - 100, 220))
         
         # Draw input box for Player O
         o_box = pg.Rect(self.width/4 + 20, 215, 200, 40)
@@ -96,26 +313,39 @@ class TicTacToe():
             pg.draw.rect(self.screen, pg.Color('yellow'), o_box, 2)
         
         # Show current name or placeholder
-        o_name = x_font.render(self.player_names['o'] if self.player_names['o'] else "Player 2", 
-                            True, pg.Color('white'))
-        self.screen.blit(o_name, (o_box.x + 10, o_box.y + 10))
+        o_name = self.text.render(self.player_names['o'] if self.player_names['o'] else "Player 2", 
+                            36, 'white')
+        self.blit(o_name, (o_box.x + 10, o_box.y + 10))
+        if self.current_player_input == 'o':
+            self.draw_suggestion(o_box, o_name)
         
         # Draw start button
-        button_font = pg.font.Font(None, 40)
-        start_button_text = button_font.render("START", True, pg.Color('white'))
+        start_button_text = self.text.render("START", 40, 'white')
         start_button_rect = pg.Rect(self.width/2 - 100, 300, 200, 50)
         pg.draw.rect(self.screen, pg.Color('black'), start_button_rect, border_radius=10)
-        self.screen.blit(start_button_text, (start_button_rect.centerx - start_button_text.get_width()/2, 
+        self.blit(start_button_text, (start_button_rect.centerx - start_button_text.get_width()/2, 
                                         start_button_rect.centery - start_button_text.get_height()/2))
         
         # Draw instructions
-        instr_font = pg.font.Font(None, 24)
-        instruction = instr_font.render("Click on a name to edit, then press START", True, pg.Color('white'))
-        self.screen.blit(instruction, (self.width/2 - instruction.get_width()/2, 360))
+        instruction = self.text.render("Click on a name to edit, then press START", 24, 'white')
+        self.blit(instruction, (self.width/2 - instruction.get_width()/2, 360))
+        if self.leaderboard:
+            hint = self.text.render("Press TAB to accept a suggested name", 24, 'gray60')
+            self.blit(hint, (self.width/2 - hint.get_width()/2, 385))
         
-        pg.display.update()
+        self.renderer.mark_all()
         return start_button_rect, x_box, o_box
 
+    def draw_suggestion(self, box, name):
+        """
+        Draw the rest of the suggested player name after the typed text, in grey.
+        """
+        if not (self.input_active and self.suggestion):
+            return
+        rest = self.text.render(self.suggestion[len(self.current_input):], 36, 'gray60')
+        self.blit(rest, (box.x + 10 + name.get_width(), box.y + 10))
+
+    @profiler.profiled('render')
     def draw_start_screen(self):
         """
         Draw the initial start screen with game title and start button.
@@ -130,52 +360,55 @@ class TicTacToe():
         
         for line in title_lines:
             # Create text with shadow effect
-            title_text = self.font_bold.render(line, True, pg.Color('white'))
+            title_text = self.text.render(line, 72, 'white', name='Arial', bold=True)
             title_rect = title_text.get_rect(center=(self.width/2, title_y))
-            shadow = self.font_bold.render(line, True, pg.Color('black'))
-            self.screen.blit(shadow, (title_rect.x+2, title_rect.y+2))
-            self.screen.blit(title_text, title_rect)
+            shadow = self.text.render(line, 72, 'black', name='Arial', bold=True)
+            self.blit(shadow, (title_rect.x+2, title_rect.y+2))
+            self.blit(title_text, title_rect)
             title_y += title_text.get_height() + 5
         
         # Draw start button
-        button_font = pg.font.Font(None, 50)
-        start_button_text = button_font.render("START", 1, pg.Color('white'))
+        start_button_text = self.text.render("START", 50, 'white')
         start_button_rect = pg.Rect(self.width/4, self.height - 80, self.width/2, 60)
         pg.draw.rect(self.screen, pg.Color('black'), start_button_rect, border_radius=10)
-        self.screen.blit(start_button_text, (start_button_rect.centerx - start_button_text.get_width()/2, 
+        self.blit(start_button_text, (start_button_rect.centerx - start_button_text.get_width()/2, 
                                           start_button_rect.centery - start_button_text.get_height()/2))
         
-        pg.display.update()
+        self.renderer.mark_all()
         return start_button_rect
 
+    def set_state(self, state):
+        """
+        Switch the game flow to a new state, cancelling transitions of the old one.
+        """
+        self.scheduler.cancel_all()
+        self.state = state
+
+    @profiler.profiled('render')
     def show_tie_breaker_prompt(self):
         """
         Display a prompt asking if players want to play a tiebreaker round.
-        Returns True if players choose to play, False otherwise.
+        The answer arrives through handle_tiebreaker_event.
         """
         # Create semi-transparent overlay
         overlay = pg.Surface((self.width, self.height + 100), pg.SRCALPHA)
         overlay.fill((0, 0, 0, 180))
-        self.screen.blit(overlay, (0, 0))
-        
-        # Use slightly smaller font for tie message
-        font = pg.font.Font(None, 36)
+        self.blit(overlay, (0, 0))
         
-        # Show current scores
-        score_text = font.render(f"Scores tied at {self.scores['x']}-{self.scores['o']}", 
-                            True, pg.Color('white'))
+        # Show current scores (slightly smaller font for tie message)
+        score_text = self.text.render(f"Scores tied at {self.scores['x']}-{self.scores['o']}", 
+                            36, 'white')
         score_rect = score_text.get_rect(center=(self.width/2, self.height/2 - 50))
-        self.screen.blit(score_text, score_rect)
+        self.blit(score_text, score_rect)
         
         # Ask about tiebreaker
-        question_text = font.render("Play one tiebreaker round?", True, pg.Color('white'))
+        question_text = self.text.render("Play one tiebreaker round?", 36, 'white')
         question_rect = question_text.get_rect(center=(self.width/2, self.height/2))
-        self.screen.blit(question_text, question_rect)
+        self.blit(question_text, question_rect)
         
         # Create yes/no buttons
-        button_font = pg.font.Font(None, 30)
-        yes_text = button_font.render("YES", True, pg.Color('white'))
-        no_text = button_font.render("NO", True, pg.Color('white'))
+        yes_text = self.text.render("YES", 30, 'white')
+        no_text = self.text.render("NO", 30, 'white')
         
         yes_rect = pg.Rect(self.width/2 - 90, self.height/2 + 50, 70, 35)
         no_rect = pg.Rect(self.width/2 + 20, self.height/2 + 50, 70, 35)
@@ -185,41 +418,53 @@ class TicTacToe():
         pg.draw.rect(self.screen, (178, 34, 34), no_rect, border_radius=5)
         
         # Position button text
-        self.screen.blit(yes_text, (yes_rect.centerx - yes_text.get_width()/2, 
+        self.blit(yes_text, (yes_rect.centerx - yes_text.get_width()/2, 
                                 yes_rect.centery - yes_text.get_height()/2))
-        self.screen.blit(no_text, (no_rect.centerx - no_text.get_width()/2, 
+        self.blit(no_text, (no_rect.centerx - no_text.get_width()/2, 
                                 no_rect.centery - no_text.get_height()/2))
         
-        pg.display.update()
-        
-        # Wait for player input
-        waiting = True
-        while waiting:
-            for event in pg.event.get():
-                if event.type == QUIT:
-                    pg.quit()
-                    sys.exit()
-                elif event.type == MOUSEBUTTONDOWN:
-                    mouse_pos = pg.mouse.get_pos()
-                    if yes_rect.collidepoint(mouse_pos):
-                        return True  # Play tiebreaker
-                    elif no_rect.collidepoint(mouse_pos):
-                        return False  # Don't play tiebreaker
-            self.clock.tick(self.fps)
+        self.renderer.mark_all()
+        
+        # Wait for player input in the TIEBREAKER state
+        self.buttons = {'yes': yes_rect, 'no': no_rect}
+        self.set_state(TIEBREAKER)
+
+    def handle_tiebreaker_event(self, event):
+        """
+        Handle input while the tiebreaker prompt is shown.
+        """
+        if event.type == QUIT:
+            self.quit()
+        elif event.type == MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            if self.buttons['yes'].collidepoint(mouse_pos):
+                # Play tiebreaker
+                self.tiebreaker_round = True
+                self.scores = {'x': 0, 'o': 0}  # Reset scores for tiebreaker
+                self.reset_game()
+            elif self.buttons['no'].collidepoint(mouse_pos):
+                # If no tiebreaker, show tie message
+                self.show_final_message("Game ended in a tie!")
 
     def check_tie_and_prompt(self):
         """
         Check if scores are tied and prompt for tiebreaker if needed.
-        Returns True if tiebreaker should be played, False otherwise.
+        Returns True if the prompt was shown, False otherwise.
         """
         if self.scores['x'] == self.scores['o'] and self.scores['x'] > 0:
-            return self.show_tie_breaker_prompt()
+            self.show_tie_breaker_prompt()
+            return True
         return False
 
     def handle_exit(self):
         """
         Handle game exit, showing appropriate messages for tiebreakers or normal game end.
         """
+        self.cancel_ai()  # The computer's move is no longer wanted
+        # Forfeit an unfinished online match so the opponent is not left waiting
+        if self.client and not (self.winner or self.draw):
+            self.client.leave()
+            self.net_side = None
         # Special handling for tiebreaker rounds
         if self.tiebreaker_round:
             if self.last_winner:
@@ -227,19 +472,11 @@ class TicTacToe():
                 self.show_final_message(f"{winner_name} wins the tiebreaker!")
             else:
                 self.show_final_message("Tiebreaker was a draw!")
-            pg.quit()
-            sys.exit()
+            return
         
         # Check for tied scores and prompt for tiebreaker
         if self.scores['x'] == self.scores['o'] and (self.scores['x'] > 0 or self.winner is not None):
-            if self.show_tie_breaker_prompt():
-                self.tiebreaker_round = True
-                self.scores = {'x': 0, 'o': 0}  # Reset scores for tiebreaker
-                self.reset_game()
-                return
-            
-            # If no tiebreaker, show tie message
-            self.show_final_message("Game ended in a tie!")
+            self.show_tie_breaker_prompt()
         else:
             # Show winner message if there is one
             if self.last_winner:
@@ -247,11 +484,8 @@ class TicTacToe():
                 self.show_final_message(f"{winner_name} wins the game!")
             else:
                 self.show_final_message("Thanks for playing!")
-        
-        # Quit the game
-        pg.quit()
-        sys.exit()
 
+    @profiler.profiled('render')
     def show_final_message(self, message):
         """
         Display a final message overlay before exiting the game.
@@ -264,16 +498,17 @@ class TicTacToe():
         # Create semi-transparent overlay
         overlay = pg.Surface((self.width, self.height+100), pg.SRCALPHA)
         overlay.fill((0,0,0,180))
-        self.screen.blit(overlay, (0,0))
+        self.blit(overlay, (0,0))
         
         # Display the message
-        font = pg.font.Font(None, 40)
-        text = font.render(message, True, pg.Color('white'))
+        text = self.text.render(message, 40, 'white')
         text_rect = text.get_rect(center=(self.width/2, self.height/2))
-        self.screen.blit(text, text_rect)
-        pg.display.update()
-        time.sleep(2)  # Show message for 2 seconds
+        self.blit(text, text_rect)
+        self.renderer.mark_all()
+        self.set_state(FINAL)
+        self.scheduler.call_later(2, self.quit)  # Show message for 2 seconds
 
+    @profiler.profiled('render')
     def show_exit_message(self):
         """
         Display an exit message overlay before quitting.
@@ -281,10 +516,9 @@ class TicTacToe():
         # Create semi-transparent overlay
         overlay = pg.Surface((self.width, self.height + 100), pg.SRCALPHA)
         overlay.fill((0, 0, 0, 180))
-        self.screen.blit(overlay, (0, 0))
+        self.blit(overlay, (0, 0))
         
         # Determine appropriate exit message
-        font = pg.font.Font(None, 40)
         if self.scores['x'] == self.scores['o']:
             message = "Game ended in a tie!"
         elif self.last_winner:
@@ -295,122 +529,218 @@ class TicTacToe():
             message = "Thanks for playing!"
         
         # Display the message
-        text = font.render(message, True, pg.Color('white'))
+        text = self.text.render(message, 40, 'white')
         text_rect = text.get_rect(center=(self.width/2, self.height/2))
-        self.screen.blit(text, text_rect)
+        self.blit(text, text_rect)
         
-        pg.display.update()
-        time.sleep(2)  # Show message for 2 seconds
+        self.renderer.mark_all()
+        self.set_state(FINAL)
+        self.scheduler.call_later(2, self.quit)  # Show message for 2 seconds
+
+    def handle_final_event(self, event):
+        """
+        Handle input while the closing message is shown: closing the window quits at once.
+        """
+        if event.type == QUIT:
+            self.quit()
 
     def start_screen(self):
         """
-        Display and handle the initial start screen.
-        """
-        start_button_rect = self.draw_start_screen()
-        waiting = True
-        
-        while waiting:
-            for event in pg.event.get():
-                if event.type == QUIT:
-                    self.show_exit_message()
-                    pg.quit()
-                    sys.exit()
-                elif event.type == MOUSEBUTTONDOWN:
-                    mouse_pos = pg.mouse.get_pos()
-                    if start_button_rect.collidepoint(mouse_pos):
-                        waiting = False
-                        # Show name input screen
-                        if not self.handle_name_input():
-                            return  # User exited from name input
-                        self.game_started = True
-                        self.init_game_board()
-            self.clock.tick(self.fps)
+        Display the initial start screen.
+        """
+        self.buttons = {'start': self.draw_start_screen()}
+        if self.leaderboard:
+            self.buttons['leaderboard'] = self.draw_leaderboard_button()
+        self.set_state(START)
+
+    def draw_leaderboard_button(self):
+        """
+        Draw the button leading to the leaderboard below the start button.
+        Returns its rectangle.
+        """
+        button_text = self.text.render("LEADERBOARD", 36, 'white')
+        button_rect = pg.Rect(self.width/4, self.height + 15, self.width/2, 50)
+        pg.draw.rect(self.screen, pg.Color('black'), button_rect, border_radius=10)
+        self.blit(button_text, (button_rect.centerx - button_text.get_width()/2,
+                                button_rect.centery - button_text.get_height()/2))
+        self.renderer.mark(button_rect)
+        return button_rect
 
+    @profiler.profiled('render')
+    def show_leaderboard(self, count=10):
+        """
+        Display the best players from the leaderboard database.
+        """
+        self.screen.fill((48, 25, 72))
+        title = self.text.render("Leaderboard", 50, 'white')
+        self.blit(title, (self.width/2 - title.get_width()/2, 25))
+
+        # Column positions for rank, name, wins, losses, draws and best streak
+        columns = (15, 45, 220, 260, 300, 340)
+        header = ("#", "Name", "W", "L", "D", "Best")
+        for x, label in zip(columns, header):
+            self.blit(self.text.render(label, 24, 'gray60'), (x, 80))
+
+        y = 110
+        for rank, player in enumerate(self.leaderboard.top(count), 1):
+            name = player.name if len(player.name) <= 14 else player.name[:12] + "..."
+            values = (str(rank), name, str(player.wins), str(player.losses), str(player.draws),
+                      str(player.best_streak))
+            for x, value in zip(columns, values):
+                self.blit(self.text.render(value, 28, 'white'), (x, y))
+            y += 32
+        if y == 110:
+            empty = self.text.render("No games recorded yet", 30, 'white')
+            self.blit(empty, (self.width/2 - empty.get_width()/2, y))
+
+        back = self.text.render("Click anywhere to return", 24, 'white')
+        self.blit(back, (self.width/2 - back.get_width()/2, self.height + 60))
+        self.renderer.mark_all()
+        self.set_state(LEADERBOARD)
+
+    def handle_leaderboard_event(self, event):
+        """
+        Handle input on the leaderboard screen: any click or key goes back to the start screen.
+        """
+        if event.type == QUIT:
+            self.show_exit_message()
+        elif event.type in (MOUSEBUTTONDOWN, KEYDOWN):
+            self.start_screen()
+
+    def handle_start_event(self, event):
+        """
+        Handle input on the start screen.
+        """
+        if event.type == QUIT:
+            self.show_exit_message()
+        elif event.type == MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            if self.buttons['start'].collidepoint(mouse_pos):
+                self.handle_name_input()  # Show name input screen
+            elif 'leaderboard' in self.buttons and self.buttons['leaderboard'].collidepoint(mouse_pos):
+                self.show_leaderboard()
+
+    def start_game(self):
+        """
+        Leave the menus and start the first round.
+        """
+        self.game_started = True
+        self.set_state(PLAYING)
+        self.join_match()
+        self.init_game_board()
+        self.ai_move()  # Computer opens if it plays 'x'
+
+    @profiler.profiled('render')
     def init_game_board(self):
         """
-        Initialize the game board with scaled images and grid lines.
+        Draw the empty board and the status area. The grid comes pre-rendered from
+        the sprite atlas, which is only built when the board layout changes.
         """
-        # Scale player images
-        self.x_image = pg.transform.scale(self.x_image, (80, 80))
-        self.o_image = pg.transform.scale(self.o_image, (80, 80))
-        
-        # Fill screen with white for board and dark purple for status area
-        self.screen.fill(pg.Color('white'))
-        self.screen.fill((48, 25, 52), (0, 400, 400, 100))
+        self.atlas = self.sprites.atlas(self.width, self.height, self.size, self.win_length)
+        self.blit(self.atlas.board, (0, 0))
+        self.win_rect = None
+        self.screen.fill((48, 25, 52), (0, 400, 400, 100))  # Dark purple status area
 
-        # Draw grid lines
-        pg.draw.line(self.screen, (48, 25, 52), (self.width/3, 0), (self.width/3, self.height), 7)
-        pg.draw.line(self.screen, (48, 25, 52), (self.width/3 * 2, 0), (self.width/3 * 2, self.height), 7)
-        pg.draw.line(self.screen, (48, 25, 52), (0, self.height/3), (self.width, self.height/3), 7)
-        pg.draw.line(self.screen, (48, 25, 52), (0, self.height/3 * 2), (self.width, self.height/3 * 2), 7)
-        
-        pg.display.update()
+        self.renderer.mark_all()
         self.status()  # Update status display
 
     def handle_name_input(self):
         """
-        Handle player name input screen and user interactions.
-        Returns True when names are submitted, False if exited.
+        Show the player name input screen. Typing and clicks arrive through handle_name_event.
+        """
+        self.draw_name_buttons()
+        self.input_active = False
+        self.set_state(NAMES)
+
+    def draw_name_buttons(self):
+        """
+        Redraw the name input screen and remember its clickable rectangles.
         """
         start_button_rect, x_box, o_box = self.draw_name_input_screen()
-        input_active = False
-        
-        while True:
-            for event in pg.event.get():
-                if event.type == QUIT:
-                    pg.quit()
-                    sys.exit()
-                elif event.type == MOUSEBUTTONDOWN:
-                    mouse_pos = pg.mouse.get_pos()
-                    if start_button_rect.collidepoint(mouse_pos):
-                        return True  # Start game
-                    elif x_box.collidepoint(mouse_pos):
-                        self.current_player_input = 'x'
-                        # Clear if default text
-                        if self.player_names['x'] == "Player 1":
-                            self.current_input = ""
-                            self.player_names['x'] = ""
-                        else:
-                            self.current_input = self.player_names['x']
-                        input_active = True
-                    elif o_box.collidepoint(mouse_pos):
-                        self.current_player_input = 'o'
-                        # Clear if default text
-                        if self.player_names['o'] == "Player 2":
-                            self.current_input = ""
-                            self.player_names['o'] = ""
-                        else:
-                            self.current_input = self.player_names['o']
-                        input_active = True
-                    else:
-                        input_active = False
-                elif event.type == KEYDOWN and input_active:
-                    if event.key == K_RETURN:
-                        # If empty after editing, restore default
-                        if not self.current_input.strip():
-                            if self.current_player_input == 'x':
-                                self.player_names['x'] = "Player 1"
-                            else:
-                                self.player_names['o'] = "Player 2"
-                        input_active = False
-                    elif event.key == K_BACKSPACE:
-                        self.current_input = self.current_input[:-1]
-                        self.player_names[self.current_player_input] = self.current_input
+        self.buttons = {'start': start_button_rect, 'x': x_box, 'o': o_box}
+
+    def handle_name_event(self, event):
+        """
+        Handle player name input screen and user interactions.
+        """
+        if event.type == QUIT:
+            self.quit()
+            return
+        elif event.type == MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            if self.buttons['start'].collidepoint(mouse_pos):
+                self.start_game()
+                return
+            elif self.buttons['x'].collidepoint(mouse_pos):
+                self.current_player_input = 'x'
+                # Clear if default text
+                if self.player_names['x'] == "Player 1":
+                    self.current_input = ""
+                    self.player_names['x'] = ""
+                else:
+                    self.current_input = self.player_names['x']
+                self.input_active = True
+            elif self.buttons['o'].collidepoint(mouse_pos):
+                self.current_player_input = 'o'
+                # Clear if default text
+                if self.player_names['o'] == "Player 2":
+                    self.current_input = ""
+                    self.player_names['o'] = ""
+                else:
+                    self.current_input = self.player_names['o']
+                self.input_active = True
+            else:
+                self.input_active = False
+        elif event.type == KEYDOWN and self.input_active:
+            if event.key in (K_RETURN, K_KP_ENTER):
+                # If empty after editing, restore default
+                if not self.current_input.strip():
+                    if self.current_player_input == 'x':
+                        self.player_names['x'] = "Player 1"
                     else:
-                        self.current_input += event.unicode
-                        self.player_names[self.current_player_input] = self.current_input
-            
-            # Redraw the input screen with updated names
-            start_button_rect, x_box, o_box = self.draw_name_input_screen()
-            self.clock.tick(self.fps)
+                        self.player_names['o'] = "Player 2"
+                self.input_active = False
+            elif event.key == K_TAB:
+                if not self.suggestion:
+                    return
+                # Take the known name, with its stored capitalization
+                self.current_input = self.suggestion
+                self.player_names[self.current_player_input] = self.current_input
+            elif event.key == K_BACKSPACE:
+                self.current_input = self.current_input[:-1]
+                self.player_names[self.current_player_input] = self.current_input
+            elif event.unicode.isprintable():
+                self.current_input += event.unicode
+                self.player_names[self.current_player_input] = self.current_input
+            else:
+                return  # Control characters such as '\r' are not part of a name
+        else:
+            return  # Nothing changed, keep the current frame
+        self.update_suggestion()
+        
+        # Redraw the input screen with updated names
+        self.draw_name_buttons()
+
+    def update_suggestion(self):
+        """
+        Look up a known player name that completes the name being typed.
+        The lookup is a bounded index range scan, cheap enough for every keystroke.
+        """
+        self.suggestion = ""
+        if self.leaderboard and self.input_active and self.current_input:
+            for name in self.leaderboard.complete(self.current_input, 2):
+                if len(name) > len(self.current_input):
+                    self.suggestion = name
+                    break
 
+    @profiler.profiled('render')
     def status(self):
         """
         Update and display the game status bar (current player, scores, exit button).
         Returns the exit button rectangle for click detection.
         """
         # Clear status area
-        pg.draw.rect(self.screen, (48, 25, 52), (0, 400, self.width, 100))
+        status_rect = pg.draw.rect(self.screen, (48, 25, 52), (0, 400, self.width, 100))
         
         # Use different font sizes for normal and tiebreaker modes
         if self.tiebreaker_round:
@@ -421,75 +751,61 @@ class TicTacToe():
             status_y_pos = 440   # Normal position
         
         # Build status message based on game state
-        if self.winner is None:
+        if self.state == ANALYSIS:
+            main_font_size = 30
+            status_message = self.analysis_message()
+            hint = self.text.render("Left/Right: moves  Up/Down: variations  Enter: next round", 20, 'gray60')
+            self.blit(hint, (self.width/2 - hint.get_width()/2, 475))
+        elif self.client and self.net_side is None and self.winner is None:
+            status_message = "Waiting for opponent..."
+        elif self.thinker and self.thinker.thinking():
+            # Padded to a fixed width so the text does not shift as the dots change
+            dots = '.' * self.thinking_dots + ' ' * (3 - self.thinking_dots)
+            status_message = f"{self.player_names[self.xo]} is thinking{dots}"
+        elif self.winner is None:
             player_name = self.player_names[self.xo]
             status_message = f"{player_name}'s Turn"
         else:
             player_name = self.player_names[self.winner]
             status_message = f"{player_name} WON!!"
             self.last_winner = self.winner
-        if self.draw:
+        if self.draw and self.state != ANALYSIS:
             status_message = "Game Draw!"
             self.last_winner = None
 
         # Render main status text
-        font = pg.font.Font(None, main_font_size)
-        text = font.render(status_message, 2, pg.Color('white'))
+        text = self.text.render(status_message, main_font_size, 'white')
         text_rect = text.get_rect(center=(self.width/2, status_y_pos))
-        self.screen.blit(text, text_rect)
+        self.blit(text, text_rect)
         
         # Display scores (smaller font)
-        score_font = pg.font.Font(None, 25)
-        score_text = score_font.render(f"X: {self.scores['x']}  O: {self.scores['o']}", 1, pg.Color('white'))
-        self.screen.blit(score_text, (20, 415))  # Position in top-left
+        score_text = self.text.render(f"X: {self.scores['x']}  O: {self.scores['o']}", 25, 'white')
+        self.blit(score_text, (20, 415))  # Position in top-left
         
         # Draw exit button
-        exit_font = pg.font.Font(None, 25)
-        exit_text = exit_font.render("EXIT", 1, pg.Color('white'))
+        exit_text = self.text.render("EXIT", 25, 'white')
         exit_rect = pg.Rect(self.width - 70, 415, 50, 25)
         pg.draw.rect(self.screen, (0, 0, 0), exit_rect, border_radius=5)
-        self.screen.blit(exit_text, (exit_rect.centerx - exit_text.get_width()/2, 
+        self.blit(exit_text, (exit_rect.centerx - exit_text.get_width()/2, 
                                     exit_rect.centery - exit_text.get_height()/2))
         
-        pg.display.update()
+        self.renderer.mark(status_rect)
         return exit_rect  # Return for click detection
 
+    @profiler.profiled('logic')
     def check_win(self):
         """
         Check if the current board state has a winner or is a draw.
         Updates game state and draws winning lines if needed.
         Returns the exit button rectangle.
         """
-        # Check rows for winner
-        for i in range(3):
-            if self.board[i][0] == self.board[i][1] == self.board[i][2] and self.board[i][0] is not None:
-                self.winner = self.board[i][0]
-                # Draw horizontal winning line
-                pg.draw.line(self.screen, pg.Color('black'), 
-                            (0, (i+1)*self.height/3 - self.height / 6), 
-                            (self.width, (i+1)*self.height/3 - self.height / 6), 5)
-                break
-            # Check columns for winner
-            elif self.board[0][i] == self.board[1][i] == self.board[2][i] and self.board[0][i] is not None:
-                self.winner = self.board[0][i]
-                # Draw vertical winning line
-                pg.draw.line(self.screen, pg.Color('black'), 
-                            ((i+1)*self.height/3 - self.height / 6, 0), 
-                            ((i+1)*self.height/3 - self.height / 6, self.width), 5)
-                break
-
-        # Check diagonal (top-left to bottom-right)
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] and self.board[0][0] is not None:
-            self.winner = self.board[0][0]
-            pg.draw.line(self.screen, pg.Color('black'), (0, 0), (self.width, self.height), 5)
-
-        # Check diagonal (top-right to bottom-left)
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] and self.board[0][2] is not None:
-            self.winner = self.board[0][2]
-            pg.draw.line(self.screen, pg.Color('black'), (self.width, 0), (0, self.height), 5)
+        # The engine already knows whether the last move completed a line
+        if self.board.winner:
+            self.winner = self.board.winner
+            self.draw_win_line(self.board.win_cells())
 
         # Check for draw (all spaces filled)
-        if self.winner is None and all([all(row) for row in self.board]):
+        if self.board.is_draw():
             self.draw = True
         elif self.winner:
             self.scores[self.winner] += 1  # Update scores
@@ -498,112 +814,549 @@ class TicTacToe():
         exit_rect = self.status()
         return exit_rect
 
+    @profiler.profiled('render')
+    def draw_win_line(self, line):
+        """
+        Draw the line through a winning row of cells, extended by half a cell on each end.
+        """
+        surface, position = self.atlas.win_line(line)
+        self.win_rect = self.blit(surface, position)
+        self.renderer.mark(self.win_rect)
+
+    @profiler.profiled('render')
     def draw_xo(self, row, col):
         """
         Draw an X or O in the specified row and column.
         Alternates players after each move.
         """
-        # Calculate position based on row and column
-        if row == 1:
-            posx = 30
-        if row == 2:
-            posx = self.width/3 + 30
-        if row == 3:
-            posx = self.width/3*2 + 30
-
-        if col == 1:
-            posy = 30
-        if col == 2:
-            posy = self.height/3 + 30
-        if col == 3:
-            posy = self.height/3*2 + 30
-
-        # Update board state
-        self.board[row-1][col-1] = self.xo
-
-        # Draw appropriate symbol and switch player
-        if (self.xo == 'x'):
-            self.screen.blit(self.x_image, (posy, posx))
-            self.xo = 'o' 
-        else:
-            self.screen.blit(self.o_image, (posy, posx))
-            self.xo = 'x' 
+        # Update board state, recording the move as a variation of the current position
+        self.history.play((row-1)*self.size + (col-1))
 
-        pg.display.update()
+        # Draw the pre-scaled symbol and switch player
+        self.blit(self.atlas.marks[self.xo], self.atlas.mark_position(row-1, col-1))
+        self.xo = engine.other(self.xo)
 
-    def user_click(self):
+        # Only the cell that was just played needs presenting
+        self.renderer.mark(((col-1) * self.cell_size, (row-1) * self.cell_size,
+                            self.cell_size, self.cell_size))
+
+    @profiler.profiled('logic')
+    def user_click(self, pos):
         """
-        Handle user mouse clicks on the game board or exit button.
+        Handle a user mouse click at pos on the game board or exit button.
         """
-        x,y = pg.mouse.get_pos()
+        x,y = pos
     
         # Check if exit button was clicked
         if self.width-80 <= x <= self.width-20 and 410 <= y <= 440:
             self.handle_exit()
             return
 
-        # Determine which column was clicked
-        if (x < self.width/3):
-            col = 1
-        elif (x < self.width/3 * 2):
-            col = 2
-        elif (x < self.width):
-            col = 3
-        else:
-            col = None
-
-        # Determine which row was clicked
-        if (y < self.height/3):
-            row = 1
-        elif (y < self.height/3 * 2):
-            row = 2
-        elif (y < self.height):
-            row = 3
-        else:
-            row = None
+        # Determine which column and row were clicked (1-based, None if off the board)
+        col = int(x // self.cell_size) + 1 if 0 <= x < self.width else None
+        row = int(y // self.cell_size) + 1 if 0 <= y < self.height else None
+
+        # Clicks on the board are ignored while the computer is to move
+        if self.ai_player == self.xo:
+            return
 
         # If valid empty cell was clicked, make the move
-        if (row and col and self.board[row-1][col-1] is None):
+        if (row and col and self.board.cell((row-1)*self.size + (col-1)) is None):
+            if self.client:
+                # Online the server referees: send our move and draw it when it is echoed
+                if self.net_side == self.xo:
+                    self.client.move((row-1)*self.size + (col-1))
+                return
             self.draw_xo(row, col)
             self.check_win()  # Check for win/draw after move
+            self.ai_move()  # Let the computer answer
+
+    def ai_move(self):
+        """
+        Start the computer's search if it is the computer's turn and the round is
+        still going. The move is played by poll_ai() once the search finishes.
+        """
+        if self.ai_player != self.xo or self.winner or self.draw:
+            return
+        self.thinker.start(self.board)
+        self.thinking_dots = 0
+        self.status()  # Show the thinking indicator
+
+    @profiler.profiled('logic')
+    def poll_ai(self):
+        """
+        Called every frame: play the computer's move if its search has finished,
+        otherwise animate the thinking indicator. Returns the cell played, if any.
+        """
+        if not (self.thinker and self.thinker.thinking()):
+            return None
+        if not self.thinker.poll():
+            dots = int((time.perf_counter() - self.thinker.started) * 4) % 4
+            if dots != self.thinking_dots:
+                self.thinking_dots = dots
+                self.status()
+            return None
+        cell = self.thinker.best
+        if cell is None or self.state != PLAYING:
+            return None
+        row, col = divmod(cell, self.size)
+        self.draw_xo(row + 1, col + 1)
+        self.check_win()
+        if self.winner or self.draw:
+            self.finish_round()
+        return cell
+
+    def cancel_ai(self):
+        """
+        Abandon the computer's search, if one is running.
+        """
+        if self.thinker and self.thinker.thinking():
+            self.thinker.cancel()
+            self.status()
+
+    def handle_playing_event(self, event):
+        """
+        Handle input while a round is in progress.
+        """
+        if event.type == QUIT:
+            self.handle_exit()  # Handle window close
+        elif event.type == MOUSEBUTTONDOWN:
+            self.user_click(event.pos)  # Handle game moves
+            if self.state == PLAYING and (self.winner or self.draw):
+                self.finish_round()  # Start new round if game ended
+        elif event.type == KEYDOWN and event.key == K_SPACE and self.thinker and self.thinker.thinking():
+            self.thinker.hurry()  # Make the computer play its best move so far
+        elif event.type == KEYDOWN and event.key in NAVIGATION_KEYS:
+            self.navigate(event.key)  # Take back or replay moves
+
+    def finish_round(self):
+        """
+        Keep the finished board on screen for a moment, then start the next round.
+        """
+        if self.recorder:
+            result = records.result_code(self.board)
+            if self.winner and not self.board.winner:
+                result = records.RESULT_CODES[self.winner]  # Won by forfeit online
+            self.recorder.write(self.board.moves, result, self.player_names['x'], self.player_names['o'])
+        if self.leaderboard:
+            # Queued for the writer thread; unnamed default players are not ranked
+            names = [None if self.player_names[side] in ("Player 1", "Player 2", "") else self.player_names[side]
+                     for side in ('x', 'o')]
+            self.leaderboard.record(*names, self.winner, self.tiebreaker_round)
+        self.set_state(ROUND_OVER)
+        self.scheduler.call_later(1.5, self.reset_game)  # Pause to show final state
+
+    def handle_round_over_event(self, event):
+        """
+        Handle input while the finished board is shown. Clicks wait for the next round.
+        """
+        if event.type == QUIT:
+            self.handle_exit()
+        elif event.type == KEYDOWN and event.key in NAVIGATION_KEYS and not self.client:
+            self.start_analysis()  # Stay on this round to explore it
+            self.navigate(event.key)
+
+    def start_analysis(self):
+        """
+        Stop the countdown to the next round and let the players step through the
+        finished round and try other moves. The round's real result is kept for the
+        scores and the tiebreaker and restored by end_analysis().
+        """
+        self.round_result = (self.winner, self.draw)
+        self.set_state(ANALYSIS)  # Cancels the pending reset
+        self.status()
+
+    def end_analysis(self):
+        """
+        Restore the analysed round's real result.
+        """
+        self.winner, self.draw = self.round_result
+        self.round_result = None
+
+    def handle_analysis_event(self, event):
+        """
+        Handle input while a finished round is analysed: arrows step through it,
+        clicks on empty cells play new variations for either side and Enter
+        starts the next round.
+        """
+        if event.type == QUIT:
+            self.end_analysis()
+            self.handle_exit()
+        elif event.type == MOUSEBUTTONDOWN:
+            self.analysis_click(event.pos)
+        elif event.type == KEYDOWN and event.key in NAVIGATION_KEYS:
+            self.navigate(event.key)
+        elif event.type == KEYDOWN and event.key in (K_RETURN, K_KP_ENTER):
+            self.end_analysis()
+            self.reset_game()
+
+    @profiler.profiled('logic')
+    def analysis_click(self, pos):
+        """
+        Handle a click at pos while analysing: the exit button, or a move on an empty cell.
+        """
+        x, y = pos
+        if self.width-80 <= x <= self.width-20 and 410 <= y <= 440:
+            self.end_analysis()
+            self.handle_exit()
+            return
+        if not (0 <= x < self.width and 0 <= y < self.height) or self.board.is_over():
+            return
+        row, col = int(y // self.cell_size), int(x // self.cell_size)
+        if self.board.cell(row*self.size + col) is None:
+            self.draw_xo(row + 1, col + 1)
+            self.winner, self.draw = self.board.winner, self.board.is_draw()
+            if self.winner:
+                self.draw_win_line(self.board.win_cells())
+            self.status()
+
+    def analysis_message(self):
+        """
+        Return the status line of the analysed position: the move number, which
+        of the variations played from the position before it this is, and the
+        result or the side to move.
+        """
+        message = f"Move {self.history.depth()}"
+        variation, variations = self.history.variation()
+        if variations > 1:
+            message += f" ({variation}/{variations})"
+        if self.board.winner:
+            return f"{message}: {self.player_names[self.board.winner]} wins"
+        if self.board.is_draw():
+            return f"{message}: draw"
+        return f"{message}: {self.player_names[self.board.turn]} to play"
+
+    @profiler.profiled('logic')
+    def navigate(self, key):
+        """
+        Step through the round's move history: Left takes back a turn, Right
+        replays it and Up or Down switch the last turn to the previous or next
+        variation played from the same position. Against the computer a turn is
+        the player's move and the computer's reply; while analysing, or without
+        a computer, it is a single move. Every step is a make or unmake on the
+        board, and only the cells that changed are redrawn.
+        """
+        if self.client:
+            return  # Online the server referees, so moves cannot be taken back
+        computer = self.ai_player if self.state == PLAYING else None
+        # Moves in the last turn: the player's, followed by the computer's reply if it has been played
+        turn = 2 if computer and self.xo != computer else 1
+        if key == K_RIGHT:
+            if not self.history.can_redo() or self.board.is_over():
+                return
+        elif self.history.depth() < turn:
+            return
+        elif key in (K_UP, K_DOWN):
+            node = self.history.node
+            for _ in range(turn - 1):
+                node = node.parent
+            if len(node.parent.children) < 2:
+                return  # No other variation to switch to
+
+        self.cancel_ai()  # The search was for the position being left
+        changed = []
+        if key == K_LEFT:
+            changed = [self.history.undo() for _ in range(turn)]
+        elif key == K_RIGHT:
+            for _ in range(2 if computer else 1):
+                if not self.history.can_redo() or self.board.is_over():
+                    break
+                changed.append(self.history.redo())
+        else:
+            replies = [self.history.undo() for _ in range(turn - 1)]
+            changed = replies + list(self.history.switch(-1 if key == K_UP else 1))
+            # Follow the new variation's reply, if it has been played
+            for _ in replies:
+                if self.history.can_redo():
+                    changed.append(self.history.redo())
+
+        self.xo = self.board.turn
+        if self.state == ANALYSIS:
+            self.winner, self.draw = self.board.winner, self.board.is_draw()
+        self.redraw_cells(changed)
+        self.status()
+        if self.state == PLAYING:
+            self.ai_move()  # Answer if the computer is now to move
+
+    def cell_rect(self, cell):
+        """
+        Return the screen rectangle of a cell, widened to whole pixels.
+        """
+        row, col = divmod(cell, self.size)
+        left, top = int(col * self.cell_size), int(row * self.cell_size)
+        return pg.Rect(left, top, math.ceil((col + 1) * self.cell_size) - left,
+                       math.ceil((row + 1) * self.cell_size) - top)
+
+    def cells_in(self, rect):
+        """
+        Return the cells a screen rectangle overlaps.
+        """
+        rect = rect.clip(pg.Rect(0, 0, self.width, self.height))
+        if not rect:
+            return []
+        cols = range(int(rect.left // self.cell_size), min(self.size, int((rect.right - 1) // self.cell_size) + 1))
+        rows = range(int(rect.top // self.cell_size), min(self.size, int((rect.bottom - 1) // self.cell_size) + 1))
+        return [row*self.size + col for row in rows for col in cols]
+
+    @profiler.profiled('render')
+    def redraw_cells(self, cells):
+        """
+        Redraw cells from the empty board sprite and the pieces now on them, then
+        the winning line if the position has one. The cells under a winning line
+        already on screen are redrawn too, so taking back a win erases it.
+        """
+        cells = set(cells)
+        if self.win_rect:
+            cells.update(self.cells_in(self.win_rect))
+            self.win_rect = None
+        for cell in cells:
+            rect = self.cell_rect(cell)
+            self.blit(self.atlas.board, rect, rect)
+            owner = self.board.cell(cell)
+            if owner:
+                self.blit(self.atlas.marks[owner], self.atlas.mark_position(*divmod(cell, self.size)))
+            self.renderer.mark(rect)
+        if self.board.winner:
+            self.draw_win_line(self.board.win_cells())
 
     def reset_game(self):
         """
         Reset the game state for a new round while maintaining scores.
         """
-        time.sleep(1.5)  # Pause to show final state
-        
+        self.cancel_ai()  # A search of the old board is of no use
         # Special handling for tiebreaker rounds
         if self.tiebreaker_round and (self.winner or self.draw):
             if self.winner:
                 self.show_final_message(f"{self.winner.upper()} wins the tiebreaker!")
             else:
                 self.show_final_message("Tiebreaker was a draw!")
-            pg.quit()
-            sys.exit()
+            return
         
         # Reset game state
         self.xo = 'x'
         self.draw = False
         self.winner = None
-        self.board = [[None]*3, [None]*3, [None]*3]
+        self.board = engine.Board(size=self.size, win_length=self.win_length)
+        self.history = history.History(self.board)
+        self.set_state(PLAYING)
+        self.join_match()
         self.init_game_board()  # Redraw empty board
+        self.ai_move()  # Computer opens if it plays 'x'
 
+    def join_match(self):
+        """
+        Queue for a new online match when playing on a server.
+        """
+        if not self.client:
+            return
+        self.net_side = None
+        self.local_name = self.local_name or self.player_names['x']
+        self.client.join(self.local_name, self.size, self.win_length)
 
-# Main game initialization and loop
-t = TicTacToe()
-t.start_screen()  # Show start screen first
+    def post_net_line(self, line):
+        """
+        Hand a line from the server's reader thread to the event loop.
+        """
+        pg.event.post(pg.event.Event(NET_EVENT, line=line))
 
-while True:
-    for event in pg.event.get():
-        if event.type == QUIT:
-            t.handle_exit()  # Handle window close
-        elif event.type == MOUSEBUTTONDOWN:
-            if t.game_started:
-                t.user_click()  # Handle game moves
-                if (t.winner or t.draw):
-                    t.reset_game()  # Start new round if game ended
+    def handle_net_line(self, line):
+        """
+        Apply a message from the multiplayer server.
+        """
+        kind, *args = line.split(' ', 4)
+        if kind == 'START' and self.state == PLAYING:
+            # START <side> <size> <win_length> <opponent name>
+            self.net_side = args[0]
+            self.player_names[self.net_side] = self.local_name
+            self.player_names[engine.other(self.net_side)] = args[3]
+            self.status()
+        elif kind == 'MOVED' and self.state == PLAYING and self.net_side:
+            row, col = divmod(int(args[1]), self.size)
+            self.draw_xo(row + 1, col + 1)
+            self.check_win()
+            if self.winner or self.draw:
+                self.finish_round()
+        elif kind == 'OVER' and args[-1] == 'forfeit' and self.state == PLAYING and self.net_side:
+            # The opponent left, so the remaining side wins the round
+            self.winner = args[0]
+            self.scores[self.winner] += 1
+            self.status()
+            self.finish_round()
+        elif kind == 'CLOSED' and self.running and self.state != FINAL:
+            self.client = None
+            self.show_final_message("Lost connection to the server")
+
+    def handle_event(self, event):
+        """
+        Dispatch an event to the handler of the current state.
+        """
+        if event.type == VIDEOEXPOSE:
+            self.renderer.mark_all()  # The window was uncovered, present all of it
+            return
+        if event.type == NET_EVENT:
+            self.handle_net_line(event.line)
+            return
+        if event.type == KEYDOWN and event.key == K_F3:
+            self.overlay.visible = not self.overlay.visible  # Toggle the profiler overlay
+            return
+        handlers = {
+            START: self.handle_start_event,
+            NAMES: self.handle_name_event,
+            PLAYING: self.handle_playing_event,
+            ROUND_OVER: self.handle_round_over_event,
+            TIEBREAKER: self.handle_tiebreaker_event,
+            FINAL: self.handle_final_event,
+            LEADERBOARD: self.handle_leaderboard_event,
+            ANALYSIS: self.handle_analysis_event,
+        }
+        handlers[self.state](event)
+
+    def is_animating(self):
+        """
+        Return True while the screen changes on its own, so the loop must keep ticking.
+        The computer thinking counts: its move and the indicator must appear without input.
+        """
+        return self.thinker is not None and self.thinker.thinking()
+
+    def quit(self):
+        """
+        Leave the event loop; run() shuts pygame down.
+        """
+        self.running = False
+        if self.thinker:
+            self.thinker.cancel()  # Before the search's player is closed below
+        if self.client:
+            self.client.close()
+            self.client = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        if self.searcher:
+            self.searcher.close()
+            self.searcher = None
+        if self.tablebase:
+            self.tablebase.close()
+            self.tablebase = None
+        if self.leaderboard:
+            self.leaderboard.close()  # Writes any results still queued
+            if self.leaderboard.error:
+                print(f"leaderboard: some results were not saved: {self.leaderboard.error}", file=sys.stderr)
+            self.leaderboard = None
+
+    def frame(self, events, now):
+        """
+        Run one frame at monotonic time now: handle events, run due timers, play
+        the computer's move if it is ready and present what changed. run() calls
+        this for every batch of input; replay.py calls it with recorded frames.
+        """
+        self.frame_time = now
+        # Everything from here to the present is one profiled frame
+        self.profiler.begin_frame()
+        self.overlay.hide(self.screen, self.renderer)
+        with self.profiler.section('events'):
+            for event in events:
+                self.handle_event(event)
+                if not self.running:
+                    break
+        with self.profiler.section('logic'):
+            ran = self.scheduler.run_due()  # Timed transitions
+            cell = self.poll_ai()  # The computer's move, once its background search is done
+        if self.input_recorder:
+            self.input_recorder.frame(now, events, ran, cell)
+        if not self.running:
+            return
+        with self.profiler.section('render'):
+            self.overlay.draw(self.screen, self.renderer)
+            self.renderer.flush()  # Present only what changed, if anything
+        self.profiler.end_frame({'blits': self.blits, 'font_renders': self.text.misses,
+                                 'flips': self.renderer.flips})
+
+    def run(self):
+        """
+        Run the game until it quits. Timed transitions come from the scheduler, and
+        the loop blocks waiting for input instead of polling when nothing is animating.
+        """
+        if self.screen is None:
+            self.start()
+        while self.running:
+            if self.is_animating() or self.overlay.visible:
+                self.clock.tick(self.fps)  # Maintain the frame rate while animating
+                events = pg.event.get()
             else:
-                t.start_screen()  # Return to start screen if not started
-    pg.display.update()
-    t.clock.tick(30)  # Maintain 30 FPS
+                # Sleep until input arrives or the next timer is due (0 waits forever)
+                self.frame_time = time.monotonic()
+                timeout = self.scheduler.timeout()
+                wait_ms = 0 if timeout is None else max(1, math.ceil(timeout * 1000))
+                events = [pg.event.wait(wait_ms)] + pg.event.get()
+
+            self.frame(events, time.monotonic())
+        if self.input_recorder:
+            # The final state's checksums let a replay verify it ended up in the same place
+            import replay
+            self.input_recorder.close(replay.state_checksum(self), replay.screen_checksum(self.screen))
+            self.input_recorder = None
+        if self.profiler.export_path:
+            self.profiler.export(self.profiler.export_path)
+        pg.quit()
+
+
+def main(argv=None):
+    """
+    Parse the command line, start the game and run it until it quits.
+    """
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe in Pygame")
+    parser.add_argument("--ai", choices=['x', 'o'], help="let the computer play this side")
+    parser.add_argument("--ai-time", type=float, default=mcts.DEFAULT_BUDGET,
+                        help="seconds the computer searches per move on boards larger than 3x3")
+    parser.add_argument("--ai-workers", type=int, default=1,
+                        help="processes searching in parallel on boards larger than 3x3")
+    parser.add_argument("--size", type=int, default=3, help="cells per side of the board")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play online against another player through a multiplayer server")
+    parser.add_argument("--record", metavar="PATH",
+                        help="archive every finished round to a binary game record file")
+    parser.add_argument("--record-input", metavar="PATH",
+                        help="record this session's input for headless replay with replay.py")
+    parser.add_argument("--leaderboard", metavar="PATH",
+                        help="keep player statistics in this SQLite database and show a leaderboard")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="export rolling frame timings to a .csv or .json file")
+    parser.add_argument("--show-profile", action="store_true",
+                        help="start with the frame-time overlay visible (toggle with F3)")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each startup phase took")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET,
+                        help="cold-start budget in seconds for the startup report")
+    args = parser.parse_args(argv)
+    if not 1 <= (args.win_length or args.size) <= args.size:
+        parser.error("--win-length must be between 1 and --size")
+    if args.ai_time <= 0 or args.ai_workers < 1:
+        parser.error("--ai-time must be positive and --ai-workers at least 1")
+    server = None
+    if args.connect:
+        if args.ai:
+            parser.error("--ai and --connect cannot be combined")
+        if args.record_input:
+            parser.error("online sessions cannot be recorded for replay")
+        host, _, port = args.connect.rpartition(':')
+        if not port.isdigit():
+            parser.error("--connect expects HOST:PORT")
+        server = (host or '127.0.0.1', int(port))
+
+    if args.record and args.size * args.size > records.MAX_CELLS:
+        parser.error(f"--record supports boards of at most {records.MAX_CELLS} cells")
+
+    game = TicTacToe(ai_player=args.ai, size=args.size, win_length=args.win_length, server=server,
+                     record_path=args.record, profile_path=args.profile,
+                     show_profile=args.show_profile, ai_budget=args.ai_time,
+                     ai_workers=args.ai_workers, leaderboard_path=args.leaderboard,
+                     input_path=args.record_input)
+    timer = game.start()
+    if args.startup_report:
+        print(timer.report(args.startup_budget), file=sys.stderr)
+    game.run()
+
+
+if __name__ == "__main__":
+    main()
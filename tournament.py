@@ -0,0 +1,212 @@
+"""
+Round-robin tournament between move policies with Elo ratings.
+
+Every pair of bots plays the same number of games, half with each bot as 'x',
+spread across a process pool in batches. Ratings are fitted to all results at
+once with the Bradley-Terry model (a draw counts half a win for each side) and
+converted to the Elo scale, and their 95% confidence intervals come from
+refitting bootstrap resamples of every pairing's results.
+
+Example:
+    python tournament.py --bots random heuristic solver mcts --games 2000
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import engine
+import policies
+import tablebase
+from simulate import play_batch
+from stats import percentile
+
+MEAN_RATING = 1500  # Ratings are shifted so the field averages this
+PRIOR_DRAWS = 1  # Virtual draws per pairing, so a bot that never scores still gets a finite rating
+BOOTSTRAP_SAMPLES = 200  # Resamples behind each confidence interval
+DEFAULT_BOTS = ['random', 'heuristic', 'solver', 'mcts']  # Bots that need no generated files
+
+
+def schedule(bots, games, size, win_length, batch_size, rng):
+    """
+    Return the pool jobs for a round robin: games per pairing, half with each bot as 'x'.
+    """
+    jobs = []
+    for a, b in itertools.combinations(bots, 2):
+        for x_name, o_name, count in ((a, b, games - games // 2), (b, a, games // 2)):
+            while count > 0:
+                batch = min(batch_size, count)
+                jobs.append((x_name, o_name, batch, size, win_length, rng.getrandbits(64), None))
+                count -= batch
+    return jobs
+
+
+def fit_ratings(bots, results, prior=PRIOR_DRAWS):
+    """
+    Fit Bradley-Terry strengths to {(a, b): [a wins, draws, b wins]} and return
+    Elo ratings by bot, averaging MEAN_RATING.
+    """
+    index = {bot: i for i, bot in enumerate(bots)}
+    n = len(bots)
+    played = [[0.0] * n for _ in range(n)]
+    score = [0.0] * n
+    for (a, b), (wins, draws, losses) in results.items():
+        i, j = index[a], index[b]
+        games = wins + draws + losses + prior
+        played[i][j] += games
+        played[j][i] += games
+        score[i] += wins + (draws + prior) / 2
+        score[j] += losses + (draws + prior) / 2
+
+    # Minorization-maximization updates (Hunter, 2004) converge from any start
+    strength = [1.0] * n
+    for _ in range(1000):
+        updated = []
+        for i in range(n):
+            denominator = sum(played[i][j] / (strength[i] + strength[j]) for j in range(n) if played[i][j])
+            updated.append(score[i] / denominator if denominator else strength[i])
+        scale = math.exp(sum(math.log(s) for s in updated) / n)  # Fix the geometric mean at 1
+        updated = [s / scale for s in updated]
+        change = max(abs(u - s) / s for u, s in zip(updated, strength))
+        strength = updated
+        if change < 1e-10:
+            break
+    return {bot: MEAN_RATING + 400 * math.log10(strength[index[bot]]) for bot in bots}
+
+
+def resample(counts, rng):
+    """
+    Return a bootstrap resample of [wins, draws, losses] with the same number of games.
+    """
+    total = sum(counts)
+    if not total:
+        return [0, 0, 0]
+    drawn = rng.choices(range(3), weights=counts, k=total)
+    return [drawn.count(0), drawn.count(1), drawn.count(2)]
+
+
+def confidence_intervals(bots, results, samples=BOOTSTRAP_SAMPLES, seed=None):
+    """
+    Return {bot: (low, high)}, the 95% bootstrap interval of each rating.
+    """
+    rng = random.Random(seed)
+    ratings = {bot: [] for bot in bots}
+    for _ in range(samples):
+        sample = {pair: resample(counts, rng) for pair, counts in results.items()}
+        for bot, rating in fit_ratings(bots, sample).items():
+            ratings[bot].append(rating)
+    intervals = {}
+    for bot, values in ratings.items():
+        values.sort()
+        intervals[bot] = (percentile(values, 0.025), percentile(values, 0.975))
+    return intervals
+
+
+def run_tournament(bots, games, size=engine.SIZE, win_length=None, workers=None,
+                   batch_size=100, seed=None):
+    """
+    Play the round robin across a process pool and return a summary dict.
+    """
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    jobs = schedule(bots, games, size, win_length, batch_size, rng)
+    # Results per pairing from the first bot's side: [wins, draws, losses]
+    results = {pair: [0, 0, 0] for pair in itertools.combinations(bots, 2)}
+
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        for (x_name, o_name, *_), (counts, *_) in zip(jobs, pool.imap(play_batch, jobs)):
+            if (x_name, o_name) in results:
+                pair = results[x_name, o_name]
+                pair[0] += counts['x']
+                pair[2] += counts['o']
+            else:
+                pair = results[o_name, x_name]
+                pair[0] += counts['o']
+                pair[2] += counts['x']
+            pair[1] += counts['draw']
+    elapsed = time.perf_counter() - start
+
+    ratings = fit_ratings(bots, results)
+    intervals = confidence_intervals(bots, results, seed=rng.getrandbits(64))
+    standings = []
+    for bot in sorted(bots, key=ratings.get, reverse=True):
+        played = scored = 0
+        for (a, b), (wins, draws, losses) in results.items():
+            if bot in (a, b):
+                played += wins + draws + losses
+                scored += (wins if bot == a else losses) + draws / 2
+        standings.append({'bot': bot, 'elo': ratings[bot], 'low': intervals[bot][0],
+                          'high': intervals[bot][1], 'games': played,
+                          'score': scored / played if played else 0.0})
+    total = sum(sum(counts) for counts in results.values())
+    return {
+        'games': total,
+        'workers': workers,
+        'seconds': elapsed,
+        'games_per_second': total / elapsed if elapsed else 0.0,
+        'standings': standings,
+        'pairings': [{'a': a, 'b': b, 'a_wins': wins, 'draws': draws, 'b_wins': losses}
+                     for (a, b), (wins, draws, losses) in results.items()],
+    }
+
+
+def print_report(summary):
+    """
+    Print the standings and the results of every pairing.
+    """
+    print(f"{summary['games']} games on {summary['workers']} workers in {summary['seconds']:.2f}s "
+          f"({summary['games_per_second']:.0f} games/s)")
+    print(f"{'bot':<12} {'elo':>7} {'95% interval':>17} {'games':>8} {'score':>7}")
+    for row in summary['standings']:
+        print(f"{row['bot']:<12} {row['elo']:7.0f} {row['low']:8.0f} - {row['high']:<6.0f} "
+              f"{row['games']:8d} {row['score']:7.1%}")
+    print()
+    for pairing in summary['pairings']:
+        print(f"{pairing['a']} vs {pairing['b']}: +{pairing['a_wins']} ={pairing['draws']} -{pairing['b_wins']}")
+
+
+def main(argv=None):
+    """
+    Run a tournament from the command line and print the standings.
+    """
+    parser = argparse.ArgumentParser(description="Round-robin tournament between Tic-Tac-Toe bots")
+    parser.add_argument("--bots", nargs="+", default=DEFAULT_BOTS,
+                        choices=sorted(policies.POLICIES), help="policies taking part")
+    parser.add_argument("--games", type=int, default=1000, help="games per pairing, half with each side as x")
+    parser.add_argument("--size", type=int, default=engine.SIZE, help="cells per side of the board")
+    parser.add_argument("--win-length", type=int, help="pieces in a row needed to win (default: size)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--batch-size", type=int, default=100, help="games per worker task")
+    parser.add_argument("--seed", type=int, help="seed for reproducible runs")
+    parser.add_argument("--output", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args(argv)
+    bots = list(dict.fromkeys(args.bots))
+    if len(bots) < 2:
+        parser.error("a tournament needs at least two different bots")
+    if 'solver' in bots and (args.size != engine.SIZE or (args.win_length or args.size) != engine.SIZE):
+        parser.error("the solver bot only plays the 3x3 board")
+    if 'tablebase' in bots and not os.path.exists(tablebase.default_path(args.size, args.win_length)):
+        parser.error(f"the tablebase bot needs {tablebase.default_path(args.size, args.win_length)}, "
+                     "generate it with tablebase.py")
+    if 'qlearn' in bots:
+        import qlearn  # Needs NumPy, so only loaded when the bot plays
+        if not os.path.exists(qlearn.default_path(args.size, args.win_length)):
+            parser.error(f"the qlearn bot needs {qlearn.default_path(args.size, args.win_length)}, "
+                         "train it with qlearn.py")
+
+    summary = run_tournament(bots, args.games, args.size, args.win_length, args.workers,
+                             args.batch_size, args.seed)
+    print_report(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
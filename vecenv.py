@@ -0,0 +1,166 @@
+"""
+Vectorized game environments for training.
+
+VecEnv steps thousands of independent games at once. Every game is a row of an
+(N, size*size) int8 array in the cell layout of batch.py (EMPTY, X, O), and a
+step takes one action per game as an array, so nothing loops over games in
+Python. Win detection is incremental as in engine.Board.make: every game keeps
+the signed piece count of each winning line, a move adds the mover's sign to
+only the lines through its cell, and the game is won when one of those reaches
+the win length. Requires NumPy, which the game itself does not need.
+
+Observations are from the point of view of the side to move (its pieces 1, the
+opponent's -1), so one learner can play both sides. A step rewards the side
+that moved with 1 for a win and 0 otherwise; a game that ends is reset in the
+same step, so every game always has a legal move.
+
+Example:
+    env = vecenv.VecEnv(4096, seed=1)
+    obs = env.reset()
+    reward, done, status = env.step(env.sample())
+
+    python vecenv.py --envs 4096 --steps 2000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import engine
+from batch import EMPTY, X
+from records import DRAW, O_WINS, UNFINISHED, X_WINS
+
+
+class VecEnv():
+    """
+    count independent games of a size x size board with win_length in a row.
+    """
+
+    def __init__(self, count, size=engine.SIZE, win_length=None, seed=None):
+        geometry = engine.geometry(size, win_length)
+        self.count = count
+        self.size = geometry.size
+        self.win_length = geometry.win_length
+        self.cells = geometry.cells
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(count)
+
+        # Lines through each cell, padded with a spare line that is never counted
+        lines = len(geometry.lines)
+        width = max(len(through) for through in geometry.lines_through)
+        self.through = np.full((self.cells, width), lines, dtype=np.intp)
+        for cell, through in enumerate(geometry.lines_through):
+            self.through[cell, :len(through)] = through
+        self.spare = lines
+
+        self.boards = np.zeros((count, self.cells), dtype=np.int8)
+        self.line_sums = np.zeros((count, lines + 1), dtype=np.int8 if self.win_length < 128 else np.int16)
+        self.turn = np.full(count, X, dtype=np.int8)  # Side to move per game
+        self.moves = np.zeros(count, dtype=np.int16)  # Pieces on each board
+        self.games = 0  # Games finished since construction
+        self.steps = 0  # Moves played since construction
+
+    def reset(self, which=None):
+        """
+        Clear the games selected by a boolean mask (all of them by default) and
+        return the observations of every game.
+        """
+        if which is None:
+            which = slice(None)
+        self.boards[which] = EMPTY
+        self.line_sums[which] = 0
+        self.turn[which] = X
+        self.moves[which] = 0
+        return self.observe()
+
+    def observe(self):
+        """
+        Return the boards from the side to move's point of view: its pieces 1, the opponent's -1.
+        """
+        return self.boards * self.turn[:, None]
+
+    def legal(self):
+        """
+        Return an (N, cells) mask of the empty cells, the legal actions of every game.
+        """
+        return self.boards == EMPTY
+
+    def sample(self, legal=None):
+        """
+        Return a uniformly random legal action for every game.
+        """
+        if legal is None:
+            legal = self.legal()
+        # The largest random key among the empty cells picks one of them uniformly.
+        # Empty cells' keys are lifted into [1, 2), so a taken cell never wins, even
+        # against an empty cell whose key came out exactly 0
+        keys = self.rng.random(legal.shape, dtype=np.float32)
+        keys += legal
+        return np.argmax(keys, axis=1)
+
+    def step(self, actions):
+        """
+        Play one action (a cell index) in every game.
+
+        Returns (reward, done, status): reward (N,) float32 is 1 for the side
+        that just moved if it won and 0 otherwise, done (N,) marks the games
+        that ended (and have been reset), and status (N,) holds their result
+        code from the records module, UNFINISHED for games still in progress.
+        Raises ValueError, changing nothing, if an action is not an empty cell.
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        rows = self.rows
+        if actions.shape != (self.count,) or actions.min() < 0 or actions.max() >= self.cells:
+            raise ValueError(f"expected {self.count} actions between 0 and {self.cells - 1}")
+        if self.boards[rows, actions].any():
+            raise ValueError(f"cell {actions[np.flatnonzero(self.boards[rows, actions])[0]]} is already taken")
+
+        turn = self.turn
+        self.boards[rows, actions] = turn
+        # Only the lines through the new piece can have been completed
+        through = self.through[actions]
+        sums = self.line_sums[rows[:, None], through] + turn[:, None]
+        self.line_sums[rows[:, None], through] = sums
+        self.line_sums[:, self.spare] = 0
+        won = (sums == self.win_length * turn[:, None]).any(axis=1)
+        self.moves += 1
+        full = self.moves == self.cells
+        done = won | full
+
+        status = np.full(self.count, UNFINISHED, dtype=np.int8)
+        status[full] = DRAW
+        status[won] = np.where(turn[won] == X, X_WINS, O_WINS)
+        reward = won.astype(np.float32)
+        self.turn = -turn
+        self.steps += self.count
+        if done.any():
+            self.games += int(done.sum())
+            self.reset(done)
+        return reward, done, status
+
+
+def main(argv=None):
+    """
+    Step random games in one process and report environment steps per second.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized Tic-Tac-Toe environment")
+    parser.add_argument("--envs", type=int, default=4096, help="games stepped together")
+    parser.add_argument("--steps", type=int, default=2000, help="steps of every game")
+    parser.add_argument("--size", type=int, default=engine.SIZE)
+    parser.add_argument("--win-length", type=int)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    env = VecEnv(args.envs, args.size, args.win_length, args.seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.step(env.sample())
+    elapsed = time.perf_counter() - start
+    print(f"{env.steps} steps ({env.games} games) of {args.envs} {env.size}x{env.size} games "
+          f"in {elapsed:.2f}s: {env.steps / elapsed:,.0f} steps/s")
+
+
+if __name__ == "__main__":
+    main()